@@ -0,0 +1,7 @@
+"""
+Бенчмарки qManager: генератор синтетического корпуса и воспроизводимые замеры.
+
+    python -m benchmarks generate bench_corpus --documents 500 --pages-per-document 4
+    python -m benchmarks run bench_corpus --output results.json
+    python -m benchmarks compare baseline.json results.json
+"""
@@ -0,0 +1,60 @@
+import os
+import sys
+import argparse
+
+from benchmarks.corpus import generate_corpus
+from benchmarks.runner import (DEFAULT_REPEAT, DEFAULT_THRESHOLD, BENCHMARKS, SUITES, run_benchmarks,
+                               compare_results, format_comparison, save_results, load_results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description="Бенчмарки qManager")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="сгенерировать синтетический корпус")
+    generate.add_argument('corpus', help="папка корпуса")
+    generate.add_argument('--documents', type=int, default=500, help="документов в скане")
+    generate.add_argument('--pages-per-document', type=int, default=4,
+                          help="страниц в документе, включая лист-разделитель")
+    generate.add_argument('--registry-rows', type=int, default=5000, help="строк в реестре Excel")
+    generate.add_argument('--containers-per-unit', type=int, default=3, help="контейнеров в заказе")
+    generate.add_argument('--large-unit-files', type=int, default=10,
+                          help="файлов в крупном unit со сканами страниц (0 — не создавать)")
+    generate.add_argument('--large-unit-mb', type=float, default=8, help="размер файла крупного unit, МБ")
+    generate.add_argument('--seed', type=int, default=42)
+
+    run = commands.add_parser('run', help="выполнить замеры")
+    run.add_argument('corpus', help="папка корпуса")
+    run.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="повторов каждого замера")
+    run.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS) + list(SUITES),
+                     help="выполнить только указанные замеры или наборы")
+    run.add_argument('--output', help="JSON с результатами")
+
+    compare = commands.add_parser('compare', help="сравнить два JSON с результатами")
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                         help="допустимый относительный рост медианы (0.1 = 10%%)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        manifest = generate_corpus(args.corpus, args.documents, args.pages_per_document, args.registry_rows,
+                                   args.containers_per_unit, args.seed, args.large_unit_files, args.large_unit_mb)
+        print(f"Корпус создан: {os.path.abspath(args.corpus)} — документов {manifest['params']['documents']}, "
+              f"страниц {manifest['total_pages']}, строк реестра {manifest['params']['registry_rows']}")
+        return 0
+
+    if args.command == 'run':
+        results = run_benchmarks(args.corpus, args.repeat, args.only)
+        if args.output:
+            save_results(results, args.output)
+            print(f"Результаты сохранены: {args.output}")
+        return 0
+
+    rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+    print(format_comparison(rows))
+    # Ненулевой код возврата позволяет использовать сравнение как проверку в CI
+    return 1 if any(status == 'регрессия' for *_, status in rows) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
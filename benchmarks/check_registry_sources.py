@@ -0,0 +1,130 @@
+"""
+Проверка удалённых источников реестра (utils_registry_sources.HttpSource) на локальном http.server.
+
+Проверяется:
+- первая загрузка через перенаправление: 302 → 200, снимок скачан и разбирается DataManager;
+- повторная загрузка: 302 → 304 (условный запрос по ETag), используется снимок;
+- все запросы идут по одному соединению пула;
+- ответ 5xx и недоступный сервер: используется последний снимок;
+- недоступный сервер без снимка: ошибка OSError.
+
+Запуск:
+    python -m benchmarks.check_registry_sources
+Код завершения 0 — все проверки пройдены, 1 — есть ошибки.
+"""
+import os
+import sys
+import hashlib
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+REGISTRY_CSV = (
+    "Номер конт / тс;Номер заказа (заказ);Судно / номер ТС (поставка);"
+    "Факт дата прибытия порт/свх (поставка);Коносамент / CMR (поставка)\n"
+    "MSCU1234567;Z-1;VESSEL;01.02.2024;B1\n"
+    "TGHU7654321;Z-2;;;B2\n"
+).encode('cp1251')
+ETAG = '"%s"' % hashlib.sha1(REGISTRY_CSV).hexdigest()
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    """
+    Экспорт таблицы: /redirect → 302 на /export?format=csv; /export отдаёт CSV с ETag
+    и отвечает 304 на условный запрос. Если server.fail_status задан, все запросы получают этот код.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *_):
+        pass
+
+    def _reply(self, status, headers=(), body=b''):
+        self.server.statuses.append(status)
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.connections.add(self.client_address)
+        if self.server.fail_status:
+            self._reply(self.server.fail_status)
+        elif self.path == '/redirect':
+            self._reply(302, [('Location', '/export?format=csv')])
+        elif self.headers.get('If-None-Match') == ETAG:
+            self._reply(304, [('ETag', ETAG)])
+        else:
+            self._reply(200, [('Content-Type', 'text/csv; charset=windows-1251'), ('ETag', ETAG)], REGISTRY_CSV)
+
+def _start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ExportHandler)
+    server.statuses = []
+    server.connections = set()
+    server.fail_status = None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_checks():
+    """
+    Выполняет проверки.
+    Возвращает:
+        list: Пары (название проверки, пройдена ли).
+    """
+    # Снимки и кэш реестра — во временной папке, а не в %APPDATA% пользователя
+    os.environ['APPDATA'] = tempfile.mkdtemp(prefix='qmanager_sources_')
+    from src.utils_data_manager import DataManager
+    from src.utils_registry_sources import CONNECTION_POOL, HttpSource
+
+    results = []
+
+    def check(name, passed):
+        results.append((name, bool(passed)))
+        print(f"{'ОК    ' if passed else 'ОШИБКА'} {name}")
+
+    server = _start_server()
+    url = f"http://127.0.0.1:{server.server_port}/redirect"
+    CONNECTION_POOL.close()
+    try:
+        source = HttpSource(url)
+        snapshot = source.fetch()
+        check("первая загрузка: 302 → 200", server.statuses == [302, 200] and source.status == 'downloaded')
+
+        data_manager = DataManager(registry_path='')
+        data_manager._log = lambda message: None
+        data_manager.load_excel_data(url, use_cache=False)
+        check("снимок разобран DataManager",
+              set(data_manager.latest_container_data) == {'MSCU1234567', 'TGHU7654321'})
+        check("повторная загрузка: 302 → 304", server.statuses[2:] == [302, 304])
+
+        source = HttpSource(url)
+        check("условный запрос возвращает тот же снимок",
+              source.fetch() == snapshot and source.status == 'not_modified')
+        check("все запросы по одному соединению", len(server.connections) == 1)
+
+        server.fail_status = 503
+        source = HttpSource(url)
+        check("ответ 503: используется снимок", source.fetch() == snapshot and source.status == 'offline')
+    finally:
+        server.shutdown()
+        server.server_close()
+        CONNECTION_POOL.close()
+
+    source = HttpSource(url)
+    check("сервер недоступен: используется снимок", source.fetch() == snapshot and source.status == 'offline')
+    try:
+        HttpSource(url + '?missing').fetch()
+        check("сервер недоступен без снимка: OSError", False)
+    except OSError:
+        check("сервер недоступен без снимка: OSError", True)
+    return results
+
+def main():
+    results = run_checks()
+    failed = [name for name, passed in results if not passed]
+    print(f"Проверок: {len(results)}, с ошибкой: {len(failed)}")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+Генератор синтетического корпуса для бенчмарков.
+
+Корпус повторяет реальные входные данные:
+- scan.pdf — многостраничный скан: каждый документ начинается с зелёного листа-разделителя,
+  на котором в области распознавания (pdf_renamer.CROP_BOX) напечатаны номера контейнеров;
+- renamer_input/ — те же документы по отдельности (как после разделения);
+- organizer_input/ — документы, уже названные по номерам контейнеров (как после переименования);
+- large_unit/ — крупный unit из PDF со сканами страниц (несжимаемые изображения по несколько МБ на файл)
+  для сравнения способов объединения по памяти;
+- registry.xlsx — реестр контейнеров с колонками, которые ищет DataManager;
+- manifest.json — параметры генерации и ожидаемые значения.
+"""
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+CONTAINER_PREFIXES = ('MSCU', 'TGHU', 'CMAU', 'SEGU', 'TCNU')
+VESSELS = ('MAERSK ALTAIR', 'MSC ORION', 'CMA CGM RIGEL', 'COSCO VEGA', 'EVER DENEB')
+
+# Цвет листа-разделителя (средний цвет страницы должен проходить is_greenish_hue)
+SEPARATOR_RGB = (0.55, 0.85, 0.55)
+# Область номеров контейнеров: CROP_BOX (0, 700, 1600, 1000) пикселей при 200 DPI
+# соответствует полосе 252–360 pt от верхнего края страницы
+CONTAINER_TEXT_TOP_PT = 252
+CONTAINER_TEXT_BOTTOM_PT = 360
+# Сторона «скана» страницы крупного unit, пикселей (RGB-шум: около 1,4 МБ на страницу после сжатия)
+LARGE_PAGE_PIXELS = 700
+
+def generate_containers(count, rng):
+    """
+    Генерирует уникальные номера контейнеров.
+    Аргументы:
+        count (int): Количество номеров.
+        rng (random.Random): Генератор случайных чисел.
+    Возвращает:
+        list: Номера вида MSCU1234567 (уникальные по последним 7 цифрам).
+    """
+    suffixes = rng.sample(range(1000000, 10000000), count)
+    return [f"{rng.choice(CONTAINER_PREFIXES)}{suffix}" for suffix in suffixes]
+
+def build_registry(containers, containers_per_unit):
+    """
+    Распределяет контейнеры по заказам, судам и датам прибытия
+    (все контейнеры одного заказа приходят одним судном в один день).
+    Возвращает:
+        list: Строки реестра (dict) в порядке контейнеров.
+    """
+    base_date = datetime(2024, 1, 1)
+    rows = []
+    for index, container in enumerate(containers):
+        unit = index // containers_per_unit
+        rows.append({
+            'Номер конт / тс': container,
+            'Номер заказа (заказ)': f"ORD-{unit + 1:05d}",
+            'Судно / номер ТС (поставка)': VESSELS[unit % len(VESSELS)],
+            'Факт дата прибытия порт/свх (поставка)': base_date + timedelta(days=unit * 37 % 90),
+            'Коносамент / CMR (поставка)': f"BL{unit + 1:07d}",
+            'Прочее': f"Строка {index + 1}",
+        })
+    return rows
+
+def _draw_separator(c, containers):
+    width, height = A4
+    c.setFillColorRGB(*SEPARATOR_RGB)
+    c.rect(0, 0, width, height, stroke=0, fill=1)
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont('Helvetica-Bold', 22)
+    band = CONTAINER_TEXT_BOTTOM_PT - CONTAINER_TEXT_TOP_PT
+    line_height = min(32, band / max(1, len(containers)))
+    for index, container in enumerate(containers):
+        y = height - CONTAINER_TEXT_TOP_PT - line_height * (index + 0.8)
+        c.drawString(40, y, container)
+    c.showPage()
+
+def _draw_content_page(c, document_index, page_index):
+    width, height = A4
+    c.setFont('Helvetica', 11)
+    c.drawString(60, height - 60, f"Document {document_index + 1}, page {page_index + 1}")
+    for line in range(40):
+        c.drawString(60, height - 100 - line * 16, "Lorem ipsum dolor sit amet " * 3)
+    c.showPage()
+
+def _draw_document(c, document_index, containers, content_pages):
+    _draw_separator(c, containers)
+    for page_index in range(content_pages):
+        _draw_content_page(c, document_index, page_index)
+
+def generate_large_unit(output_dir, files, megabytes_per_file, rng):
+    """
+    Генерирует крупный unit: PDF, каждая страница которого — несжимаемое изображение (как скан).
+    Аргументы:
+        output_dir (str): Папка unit (создаётся при необходимости).
+        files (int): Количество файлов.
+        megabytes_per_file (float): Примерный размер одного файла, МБ.
+        rng (random.Random): Генератор случайных чисел.
+    Возвращает:
+        list: Имена файлов в порядке объединения.
+    """
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+
+    os.makedirs(output_dir, exist_ok=True)
+    page_bytes = LARGE_PAGE_PIXELS * LARGE_PAGE_PIXELS * 3
+    pages = max(1, round(megabytes_per_file * 1024 * 1024 / page_bytes))
+    width, height = A4
+    names = []
+    for index in range(files):
+        name = f"large_{index + 1:03d}.pdf"
+        c = canvas.Canvas(os.path.join(output_dir, name), pagesize=A4)
+        for page_index in range(pages):
+            image = Image.frombytes('RGB', (LARGE_PAGE_PIXELS, LARGE_PAGE_PIXELS), rng.randbytes(page_bytes))
+            c.drawImage(ImageReader(image), 40, 120, width - 80, width - 80)
+            c.setFont('Helvetica', 11)
+            c.drawString(40, 60, f"Scan {index + 1}, page {page_index + 1}")
+            c.showPage()
+        c.save()
+        names.append(name)
+    return names
+
+def generate_corpus(output_dir, documents=500, pages_per_document=4, registry_rows=5000,
+                    containers_per_unit=3, seed=42, large_unit_files=10, large_unit_mb=8):
+    """
+    Генерирует корпус для бенчмарков.
+    Аргументы:
+        output_dir (str): Папка корпуса (создаётся при необходимости).
+        documents (int): Количество документов в скане.
+        pages_per_document (int): Страниц в документе, включая лист-разделитель.
+        registry_rows (int): Строк в реестре (не меньше числа контейнеров в документах).
+        containers_per_unit (int): Контейнеров в одном заказе.
+        seed (int): Зерно генератора — один и тот же seed даёт один и тот же корпус.
+        large_unit_files (int): Файлов в крупном unit (0 — не создавать large_unit/).
+        large_unit_mb (float): Примерный размер одного файла крупного unit, МБ.
+    Возвращает:
+        dict: Манифест корпуса (он же сохраняется в manifest.json).
+    """
+    rng = random.Random(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    content_pages = max(0, pages_per_document - 1)
+
+    # Документы: 1–2 контейнера одного заказа; реестр дополняется контейнерами без документов
+    document_containers = []
+    containers = generate_containers(max(registry_rows, documents * 2), rng)
+    cursor = 0
+    while len(document_containers) < documents and cursor < len(containers):
+        unit_start = cursor - cursor % containers_per_unit
+        take = 2 if rng.random() < 0.2 and cursor + 1 < unit_start + containers_per_unit else 1
+        document_containers.append(containers[cursor:cursor + take])
+        cursor += take
+    registry = build_registry(containers[:max(registry_rows, cursor)], containers_per_unit)
+    pd.DataFrame(registry).to_excel(os.path.join(output_dir, 'registry.xlsx'), index=False)
+
+    scan = canvas.Canvas(os.path.join(output_dir, 'scan.pdf'), pagesize=A4)
+    renamer_dir = os.path.join(output_dir, 'renamer_input')
+    organizer_dir = os.path.join(output_dir, 'organizer_input')
+    os.makedirs(renamer_dir, exist_ok=True)
+    os.makedirs(organizer_dir, exist_ok=True)
+    for index, doc_containers in enumerate(document_containers):
+        _draw_document(scan, index, doc_containers, content_pages)
+
+        single = canvas.Canvas(os.path.join(renamer_dir, f"output_{index + 1}.pdf"), pagesize=A4)
+        _draw_document(single, index, doc_containers, content_pages)
+        single.save()
+
+        named = canvas.Canvas(os.path.join(organizer_dir, f"{', '.join(doc_containers)}.pdf"), pagesize=A4)
+        for page_index in range(max(1, content_pages)):
+            _draw_content_page(named, index, page_index)
+        named.save()
+    scan.save()
+
+    large_unit = generate_large_unit(os.path.join(output_dir, 'large_unit'), large_unit_files, large_unit_mb,
+                                     rng) if large_unit_files > 0 else []
+
+    manifest = {
+        'params': {
+            'documents': len(document_containers),
+            'pages_per_document': pages_per_document,
+            'registry_rows': len(registry),
+            'containers_per_unit': containers_per_unit,
+            'seed': seed,
+            'large_unit_files': len(large_unit),
+            'large_unit_mb': large_unit_mb if large_unit else 0,
+        },
+        'total_pages': len(document_containers) * (1 + content_pages),
+        'units': -(-cursor // containers_per_unit),
+        'documents': [{'file': f"output_{index + 1}.pdf", 'containers': doc_containers}
+                      for index, doc_containers in enumerate(document_containers)],
+        'large_unit': large_unit,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def load_manifest(corpus_dir):
+    """
+    Загружает manifest.json корпуса.
+    """
+    with open(os.path.join(corpus_dir, 'manifest.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,497 @@
+"""
+Запуск бенчмарков и сравнение результатов.
+
+Замеры:
+- end_to_end.* — split_pdf_by_green_pages, process_pdfs, organize_pdfs целиком (в том числе
+  с объединением unit в одном процессе — organize_serial), а также полный
+  конвейер по этапам с промежуточными файлами и совмещённый (pdf_pipeline.process_scan)
+  (каждый повтор на свежей копии входных данных, копирование не входит в замер);
+- hot.* — горячие функции: анализ цвета страницы, рендеринг, OCR, поиск номеров контейнеров,
+  загрузка реестра и память на запись реестра (registry_memory), разбор и объединение PDF (в том числе крупного unit из сканов — *_large),
+  выделение имён файлов;
+- startup.gui — холодный запуск интерфейса до первого цикла событий (start.py --measure-startup).
+
+Замеры, которым не хватает внешних программ (poppler, Tesseract), попадают в skipped с причиной.
+Результат — JSON, пригодный для сравнения между версиями (команда compare).
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+
+from benchmarks.corpus import load_manifest
+
+SUITES = ('end_to_end', 'hot', 'startup')
+DEFAULT_REPEAT = 3
+# Порог регрессии для compare: рост медианы более чем на 10%
+DEFAULT_THRESHOLD = 0.10
+
+class SkipBenchmark(Exception):
+    """Замер невозможен в текущем окружении."""
+
+def _noop(*_):
+    pass
+
+def measure(function, repeat=DEFAULT_REPEAT, setup=None, units=None, unit=None):
+    """
+    Выполняет функцию repeat раз и собирает времена.
+    Аргументы:
+        function (callable): Замеряемая функция; принимает результат setup (если он задан).
+        repeat (int): Число повторов.
+        setup (callable, optional): Подготовка перед каждым повтором (не входит в замер).
+        units (int, optional): Число единиц работы за один вызов (страниц, файлов) — для скорости.
+        unit (str, optional): Название единицы.
+    Возвращает:
+        dict: times_s, min_s, median_s, mean_s и, если задано units, rate (единиц/с по медиане).
+    """
+    times = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function(argument) if setup else function()
+            times.append(time.perf_counter() - start)
+    result = {
+        'times_s': times,
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'mean_s': statistics.fmean(times),
+    }
+    if units:
+        result['units'] = units
+        result['unit'] = unit
+        result['rate'] = units / result['median_s'] if result['median_s'] > 0 else None
+    return result
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _environment():
+    import PyPDF2
+    import pandas
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'revision': _git_revision(),
+        'PyPDF2': PyPDF2.__version__,
+        'pandas': pandas.__version__,
+    }
+
+def _fresh_copy(source, workdir):
+    """
+    Возвращает функцию подготовки: копирует source в новую папку внутри workdir.
+    """
+    counter = iter(range(1, 1 << 30))
+
+    def setup():
+        target = os.path.join(workdir, f"{os.path.basename(source)}_{next(counter)}")
+        if os.path.isdir(source):
+            shutil.copytree(source, target)
+        else:
+            os.makedirs(target)
+            shutil.copy2(source, target)
+            target = os.path.join(target, os.path.basename(source))
+        return target
+    return setup
+
+def _require_poppler():
+    from reportlab.pdfgen import canvas
+    from src.pdf_splitter import extract_page_as_image
+    from src.utils_toolchain import get_poppler_path
+    with tempfile.TemporaryDirectory() as directory:
+        probe = os.path.join(directory, 'probe.pdf')
+        c = canvas.Canvas(probe)
+        c.showPage()
+        c.save()
+        try:
+            extract_page_as_image(probe, 0, get_poppler_path())
+        except Exception as e:
+            raise SkipBenchmark(f"poppler недоступен: {e}")
+
+def _import_renamer():
+    import src.pdf_renamer as renamer
+    try:
+        renamer.ensure_tesseract()
+        renamer.pytesseract.get_tesseract_version()
+    except Exception as e:
+        raise SkipBenchmark(f"Tesseract недоступен: {e}")
+    return renamer
+
+def bench_split(corpus, manifest, workdir, repeat):
+    from src.pdf_splitter import split_pdf_by_green_pages
+    from src.utils_toolchain import get_poppler_path
+    _require_poppler()
+    poppler_path = get_poppler_path()
+    return measure(
+        lambda pdf: split_pdf_by_green_pages(pdf, pdf + '_out', poppler_path, log_callback=_noop),
+        repeat, _fresh_copy(os.path.join(corpus, 'scan.pdf'), workdir),
+        manifest['total_pages'], 'стр.')
+
+def bench_rename(corpus, manifest, workdir, repeat):
+    renamer = _import_renamer()
+    _require_poppler()
+    excel = os.path.join(corpus, 'registry.xlsx')
+    return measure(
+        lambda folder: renamer.process_pdfs(folder, folder + '_out', excel, _noop, _noop),
+        repeat, _fresh_copy(os.path.join(corpus, 'renamer_input'), workdir),
+        manifest['params']['documents'], 'файлов')
+
+def bench_organize(corpus, manifest, workdir, repeat, workers=None):
+    from src.pdf_organizer import organize_pdfs
+    excel = os.path.join(corpus, 'registry.xlsx')
+    source = os.path.join(corpus, 'organizer_input')
+    counter = iter(range(1, 1 << 30))
+    return measure(
+        lambda output: organize_pdfs(source, output, excel, _noop, _noop, workers=workers),
+        repeat, lambda: os.path.join(workdir, f"organized_{next(counter)}"),
+        manifest['params']['documents'], 'файлов')
+
+def bench_organize_serial(corpus, manifest, workdir, repeat):
+    return bench_organize(corpus, manifest, workdir, repeat, workers=1)
+
+def bench_pipeline_staged(corpus, manifest, workdir, repeat):
+    from src.core_pipeline import run_pipeline
+    _import_renamer()
+    _require_poppler()
+    excel = os.path.join(corpus, 'registry.xlsx')
+    return measure(
+        lambda pdf: run_pipeline(pdf, pdf + '_out', excel, log_callback=_noop, fused=False),
+        repeat, _fresh_copy(os.path.join(corpus, 'scan.pdf'), workdir),
+        manifest['total_pages'], 'стр.')
+
+def bench_pipeline_fused(corpus, manifest, workdir, repeat):
+    from src.pdf_pipeline import process_scan
+    _import_renamer()
+    _require_poppler()
+    excel = os.path.join(corpus, 'registry.xlsx')
+    return measure(
+        lambda pdf: process_scan(pdf, pdf + '_out', excel, log_callback=_noop),
+        repeat, _fresh_copy(os.path.join(corpus, 'scan.pdf'), workdir),
+        manifest['total_pages'], 'стр.')
+
+def bench_color_check(corpus, manifest, workdir, repeat):
+    from PIL import Image
+    from src.pdf_splitter import get_average_color_rgb, is_greenish_hue
+    # Страница A4 при 200 DPI, как её отдаёт convert_from_path
+    image = Image.new('RGB', (1654, 2339), (140, 217, 140))
+    pages = 20
+    return measure(lambda: [is_greenish_hue(get_average_color_rgb(image), 2.3) for _ in range(pages)],
+                   repeat, units=pages, unit='стр.')
+
+def bench_render_page(corpus, manifest, workdir, repeat):
+    from src.pdf_splitter import extract_page_as_image
+    from src.utils_toolchain import get_poppler_path
+    _require_poppler()
+    scan = os.path.join(corpus, 'scan.pdf')
+    pages = min(10, manifest['total_pages'])
+    poppler_path = get_poppler_path()
+    return measure(lambda: [extract_page_as_image(scan, i, poppler_path) for i in range(pages)],
+                   repeat, units=pages, unit='стр.')
+
+def bench_ocr(corpus, manifest, workdir, repeat):
+    renamer = _import_renamer()
+    _require_poppler()
+    documents = manifest['documents'][:5]
+    images = [renamer.render_first_page(os.path.join(corpus, 'renamer_input', doc['file']))
+              for doc in documents]
+    return measure(lambda: [renamer.ocr_container_region(image) for image in images],
+                   repeat, units=len(images), unit='стр.')
+
+def bench_extract_containers(corpus, manifest, workdir, repeat):
+    from src.utils_data_manager import DataManager
+    from src.pdf_renamer import extract_container_numbers
+    data_manager = DataManager()
+    with redirect_stdout(io.StringIO()):
+        data_manager.load_excel_data(os.path.join(corpus, 'registry.xlsx'))
+    container_suffixes = data_manager.containers_by_suffix
+    # Текст, похожий на результат OCR области номеров
+    texts = [f"CONTAINER NO\n{' '.join(doc['containers'])}\nSEAL 12345 GROSS 24000 KG"
+             for doc in manifest['documents'][:200]]
+    return measure(lambda: [extract_container_numbers(text, container_suffixes=container_suffixes) for text in texts],
+                   repeat, units=len(texts), unit='текстов')
+
+def bench_load_excel(corpus, manifest, workdir, repeat, engine=None):
+    from src.utils_data_manager import DataManager
+    excel = os.path.join(corpus, 'registry.xlsx')
+    return measure(lambda: DataManager().load_excel_data(excel, engine, use_cache=False), repeat,
+                   units=manifest['params']['registry_rows'], unit='строк')
+
+def bench_load_excel_cached(corpus, manifest, workdir, repeat):
+    from src.utils_data_manager import DataManager
+    excel = os.path.join(corpus, 'registry.xlsx')
+    # Первая загрузка заполняет кэш, замеряются повторные
+    with redirect_stdout(io.StringIO()):
+        DataManager().load_excel_data(excel)
+    return measure(lambda: DataManager().load_excel_data(excel), repeat,
+                   units=manifest['params']['registry_rows'], unit='строк')
+
+def bench_load_excel_pandas(corpus, manifest, workdir, repeat):
+    return bench_load_excel(corpus, manifest, workdir, repeat, engine='pandas')
+
+def bench_load_excel_openpyxl(corpus, manifest, workdir, repeat):
+    return bench_load_excel(corpus, manifest, workdir, repeat, engine='openpyxl')
+
+def bench_process_data(corpus, manifest, workdir, repeat):
+    from src.utils_data_manager import DataManager
+    data_manager = DataManager()
+    with redirect_stdout(io.StringIO()):
+        data_manager.load_excel_data(os.path.join(corpus, 'registry.xlsx'))
+    return measure(data_manager.process_data, repeat,
+                   units=len(data_manager.latest_container_data), unit='контейнеров')
+
+def bench_registry_memory(corpus, manifest, workdir, repeat):
+    """
+    Память, которую удерживает загруженный реестр (tracemalloc, после сборки мусора),
+    в пересчёте на запись: bytes_per_record = удержанные байты / len(latest_container_data).
+    """
+    import gc
+    import tracemalloc
+    from src.utils_data_manager import DataManager
+    excel = os.path.join(corpus, 'registry.xlsx')
+    # Первая загрузка импортирует модули чтения — они не должны попасть в замер
+    result = measure(lambda: DataManager().load_excel_data(excel, use_cache=False), repeat,
+                     units=manifest['params']['registry_rows'], unit='строк')
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        data_manager = DataManager()
+        with redirect_stdout(io.StringIO()):
+            data_manager.load_excel_data(excel, use_cache=False)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    records = len(data_manager.latest_container_data)
+    result['records'] = records
+    result['retained_mb'] = retained / (1024 * 1024)
+    result['bytes_per_record'] = retained / records if records else None
+    return result
+
+def bench_pdf_reader(corpus, manifest, workdir, repeat):
+    from PyPDF2 import PdfReader
+    scan = os.path.join(corpus, 'scan.pdf')
+    return measure(lambda: len(PdfReader(scan).pages), repeat,
+                   units=manifest['total_pages'], unit='стр.')
+
+def _peak_memory_mb(function):
+    """
+    Пик памяти Python-объектов (tracemalloc) за один вызов функции, МБ.
+    """
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+def _bench_merge_unit(files, engine, workdir, repeat):
+    """
+    Замеряет объединение файлов одного unit через pdf_merge.merge_unit заданным способом.
+    Результат пишется в файл в workdir (как в organize_pdfs): в BytesIO он целиком вошёл бы в пик памяти.
+    """
+    from src.pdf_merge import merge_unit
+    target = os.path.join(workdir, f"merged_{engine}.pdf")
+
+    def merge():
+        merge_unit(files, target, engine=engine)
+    result = measure(merge, repeat, units=len(files), unit='файлов')
+    result['peak_mb'] = _peak_memory_mb(merge)
+    result['input_mb'] = sum(os.path.getsize(path) for path in files) / (1024 * 1024)
+    return result
+
+def _organizer_files(corpus):
+    source = os.path.join(corpus, 'organizer_input')
+    return [os.path.join(source, name) for name in sorted(os.listdir(source))[:100]]
+
+def _large_unit_files(corpus, manifest):
+    if not manifest.get('large_unit'):
+        raise SkipBenchmark("в корпусе нет крупного unit (generate --large-unit-files)")
+    return [os.path.join(corpus, 'large_unit', name) for name in manifest['large_unit']]
+
+def bench_pdf_merge(corpus, manifest, workdir, repeat):
+    return _bench_merge_unit(_organizer_files(corpus), 'pypdf2', workdir, repeat)
+
+def bench_pdf_merge_streaming(corpus, manifest, workdir, repeat):
+    return _bench_merge_unit(_organizer_files(corpus), 'streaming', workdir, repeat)
+
+def bench_pdf_merge_large(corpus, manifest, workdir, repeat):
+    return _bench_merge_unit(_large_unit_files(corpus, manifest), 'pypdf2', workdir, repeat)
+
+def bench_pdf_merge_streaming_large(corpus, manifest, workdir, repeat):
+    return _bench_merge_unit(_large_unit_files(corpus, manifest), 'streaming', workdir, repeat)
+
+def bench_filename_registry(corpus, manifest, workdir, repeat):
+    from src.utils_filename_registry import FilenameRegistry
+    names = [f"MSCU{1000000 + i % 500}.pdf" for i in range(5000)]
+    counter = iter(range(1, 1 << 30))
+
+    def setup():
+        directory = os.path.join(workdir, f"registry_{next(counter)}")
+        os.makedirs(directory)
+        return directory
+
+    def allocate(directory):
+        registry = FilenameRegistry()
+        for name in names:
+            registry.allocate(directory, name)
+    return measure(allocate, repeat, setup, units=len(names), unit='имён')
+
+def bench_startup(corpus, manifest, workdir, repeat):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    if os.name != 'nt' and not env.get('DISPLAY') and not env.get('WAYLAND_DISPLAY'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    startup_ms = []
+
+    def start():
+        completed = subprocess.run([sys.executable, os.path.join(root, 'start.py'), '--measure-startup'],
+                                   capture_output=True, text=True, env=env, cwd=root, timeout=120)
+        if completed.returncode != 0:
+            raise SkipBenchmark(f"интерфейс не запустился: {completed.stderr.strip()[-200:]}")
+        startup_ms.append(json.loads(completed.stdout.strip().splitlines()[-1])['startup_ms'])
+    result = measure(start, repeat)
+    # Время от импорта main.py до первого кадра (без запуска интерпретатора)
+    result['startup_ms'] = statistics.median(startup_ms)
+    return result
+
+BENCHMARKS = {
+    'end_to_end.split': bench_split,
+    'end_to_end.rename': bench_rename,
+    'end_to_end.organize': bench_organize,
+    'end_to_end.organize_serial': bench_organize_serial,
+    'end_to_end.pipeline_staged': bench_pipeline_staged,
+    'end_to_end.pipeline_fused': bench_pipeline_fused,
+    'hot.color_check': bench_color_check,
+    'hot.render_page': bench_render_page,
+    'hot.ocr_container_region': bench_ocr,
+    'hot.extract_container_numbers': bench_extract_containers,
+    'hot.load_excel_data': bench_load_excel,
+    'hot.load_excel_data_pandas': bench_load_excel_pandas,
+    'hot.load_excel_data_openpyxl': bench_load_excel_openpyxl,
+    'hot.load_excel_data_cached': bench_load_excel_cached,
+    'hot.process_data': bench_process_data,
+    'hot.registry_memory': bench_registry_memory,
+    'hot.pdf_reader': bench_pdf_reader,
+    'hot.pdf_merge': bench_pdf_merge,
+    'hot.pdf_merge_streaming': bench_pdf_merge_streaming,
+    'hot.pdf_merge_large': bench_pdf_merge_large,
+    'hot.pdf_merge_streaming_large': bench_pdf_merge_streaming_large,
+    'hot.filename_registry': bench_filename_registry,
+    'startup.gui': bench_startup,
+}
+
+def run_benchmarks(corpus, repeat=DEFAULT_REPEAT, selected=None, log=print):
+    """
+    Выполняет бенчмарки на корпусе.
+    Аргументы:
+        corpus (str): Папка корпуса (см. benchmarks.corpus.generate_corpus).
+        repeat (int): Число повторов каждого замера.
+        selected (list, optional): Имена замеров или наборов (end_to_end, hot); по умолчанию все.
+        log (callable): Функция вывода хода выполнения.
+    Возвращает:
+        dict: {'environment', 'corpus', 'repeat', 'results', 'skipped'}.
+    """
+    manifest = load_manifest(corpus)
+    names = [name for name in BENCHMARKS
+             if not selected or name in selected or name.split('.')[0] in selected]
+    results, skipped = {}, {}
+    workdir = tempfile.mkdtemp(prefix='qmanager_bench_')
+    # Журналы задач и настройки бенчмарка не должны смешиваться с пользовательскими
+    previous_appdata = os.environ.get('APPDATA')
+    os.environ['APPDATA'] = os.path.join(workdir, 'appdata')
+    try:
+        for name in names:
+            log(f"{name}...")
+            try:
+                results[name] = BENCHMARKS[name](corpus, manifest, workdir, repeat)
+                log(f"  медиана {results[name]['median_s']:.3f} с")
+            except SkipBenchmark as e:
+                skipped[name] = str(e)
+                log(f"  пропущен: {e}")
+    finally:
+        if previous_appdata is None:
+            os.environ.pop('APPDATA', None)
+        else:
+            os.environ['APPDATA'] = previous_appdata
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'environment': _environment(),
+        'corpus': {**manifest['params'], 'total_pages': manifest['total_pages'], 'units': manifest['units']},
+        'repeat': repeat,
+        'results': results,
+        'skipped': skipped,
+    }
+
+# Показатели памяти, которые compare сравнивает наряду с медианой, если они есть в обоих запусках
+MEMORY_METRICS = ('peak_mb', 'bytes_per_record')
+
+def _compare_value(label, old, new, threshold, faster='ускорение'):
+    ratio = new / old if old else None
+    if ratio is None:
+        status = 'нет пары'
+    elif ratio > 1 + threshold:
+        status = 'регрессия'
+    elif ratio < 1 - threshold:
+        status = faster
+    else:
+        status = 'без изменений'
+    return label, old, new, ratio, status
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Сравнивает медианы двух запусков, а также показатели памяти (MEMORY_METRICS), если они есть в обоих.
+    Аргументы:
+        baseline (dict): Результат run_benchmarks базовой версии.
+        current (dict): Результат run_benchmarks новой версии.
+        threshold (float): Допустимый относительный рост медианы или показателя памяти.
+    Возвращает:
+        list: Строки (имя, базовое значение, новое значение, отношение, статус); для показателей памяти
+            имя — «замер:показатель».
+    """
+    rows = []
+    for name in sorted(set(baseline['results']) | set(current['results'])):
+        old = baseline['results'].get(name)
+        new = current['results'].get(name)
+        if old is None or new is None:
+            rows.append((name, old and old['median_s'], new and new['median_s'], None, 'нет пары'))
+            continue
+        rows.append(_compare_value(name, old['median_s'], new['median_s'], threshold))
+        for metric in MEMORY_METRICS:
+            if old.get(metric) is not None and new.get(metric) is not None:
+                rows.append(_compare_value(f"{name}:{metric}", old[metric], new[metric], threshold, 'улучшение'))
+    return rows
+
+def format_comparison(rows):
+    """
+    Форматирует результат compare_results в виде таблицы.
+    """
+    lines = [f"{'Замер':<44}{'База':>11}{'Новая':>11}{'Отношение':>11}  Статус"]
+    for name, old, new, ratio, status in rows:
+        old_text = f"{old:.3f}" if old is not None else '—'
+        new_text = f"{new:.3f}" if new is not None else '—'
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else '—'
+        lines.append(f"{name:<44}{old_text:>11}{new_text:>11}{ratio_text:>11}  {status}")
+    return "\n".join(lines)
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,10 @@
+"""
+Запуск консольного интерфейса: python -m src <команда> ...
+Графический интерфейс запускается через start.py.
+"""
+import sys
+
+from src.cli import main
+
+if __name__ == '__main__':
+    sys.exit(main())
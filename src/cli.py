@@ -0,0 +1,365 @@
+"""
+Консольный интерфейс qManager без Qt — для пакетной обработки на серверах без дисплея.
+
+    python -m src split scan.pdf out/
+    python -m src rename in/ out/ --excel registry.xlsx
+    python -m src organize in/ out/ --excel registry.xlsx
+    python -m src pipeline scan.pdf out/ --excel registry.xlsx
+    python -m src watch incoming/ --output out/ --excel registry.xlsx
+
+Сообщения и прогресс выводятся в stderr, итоговая сводка — одним JSON-объектом в stdout.
+Режим watch работает до Ctrl+C и обрабатывает PDF по мере поступления (см. core_watch).
+Коды возврата: 0 — успешно, 1 — ошибка, 2 — неверные аргументы, 130 — остановлено (Ctrl+C).
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+from contextlib import redirect_stdout
+
+from src.core_settings import SettingsManager
+from src.core_cancellation import CancellationToken
+from src.core_telemetry import JobTelemetry, format_snapshot
+from src.core_tracing import trace_job
+from src.core_profiling import profile_options, profile_job
+from src.utils_registry_sources import is_remote_source
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+# Минимальный интервал перерисовки строки прогресса, с
+PROGRESS_INTERVAL = 0.1
+
+class ConsoleProgress:
+    def __init__(self, stream=sys.stderr, telemetry=None, enabled=True):
+        """
+        Строка прогресса в консоли. В терминале перерисовывается на месте,
+        при перенаправлении вывода печатается не чаще раза в 10% прогресса.
+        Аргументы:
+            stream (file): Поток вывода.
+            telemetry (JobTelemetry, optional): Телеметрия для скорости и ETA.
+            enabled (bool): Выводить ли прогресс.
+        """
+        self.stream = stream
+        self.telemetry = telemetry
+        self.enabled = enabled
+        self.interactive = stream.isatty()
+        self.stage = None
+        self._last_draw = 0.0
+        self._last_decile = -1
+        self._line_open = False
+
+    def set_stage(self, name):
+        self.finish_line()
+        self.stage = name
+        self._last_decile = -1
+
+    def update(self, current, total):
+        if self.telemetry is not None:
+            self.telemetry.set_progress(current, total)
+        if not self.enabled or not total:
+            return
+        prefix = f"[{self.stage}] " if self.stage else ""
+        if self.interactive:
+            now = time.monotonic()
+            if now - self._last_draw < PROGRESS_INTERVAL and current < total:
+                return
+            self._last_draw = now
+            status = format_snapshot({**self.telemetry.snapshot(), 'stages': {}}) if self.telemetry else ""
+            line = f"{prefix}{current}/{total} ({current * 100 // total}%)" + (f" · {status}" if status else "")
+            self.stream.write("\r" + line.ljust(100)[:160])
+            self.stream.flush()
+            self._line_open = True
+        else:
+            decile = current * 10 // total
+            if decile != self._last_decile:
+                self._last_decile = decile
+                self.stream.write(f"{prefix}{current}/{total} ({current * 100 // total}%)\n")
+
+    def finish_line(self):
+        if self._line_open:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._line_open = False
+
+def _add_common_arguments(parser):
+    parser.add_argument('-q', '--quiet', action='store_true', help="не выводить сообщения и прогресс")
+    parser.add_argument('--trace', action='store_true', default=None,
+                        help="сохранить трассировку горячих вызовов (см. core_tracing)")
+    parser.add_argument('--profile-cpu', action='store_true', default=None, help="профилировать cProfile")
+    parser.add_argument('--profile-memory', action='store_true', default=None, help="профилировать tracemalloc")
+    parser.add_argument('--profile-top-n', type=int, default=None, help="мест выделения памяти в отчёте")
+
+EXCEL_HELP = ("реестр Excel: книга, папка книг, «книга::лист», CSV-файл или адрес http(s)://; "
+              "можно указать несколько раз — источники объединяются")
+
+def _excel_sources(args):
+    """
+    Источники реестра из --excel: одна книга передаётся строкой (первый лист), несколько — списком.
+    """
+    if not args.excel:
+        return None
+    return args.excel[0] if len(args.excel) == 1 else args.excel
+
+def _add_registry_argument(parser):
+    parser.add_argument('--registry', default=None,
+                        help="накопительный реестр SQLite: книга --excel добавляется к ранее загруженным "
+                             "(по умолчанию из настроек, registry_db)")
+
+def _use_registry(args, settings):
+    """
+    Включает накопительный реестр SQLite для всех задач процесса, если он задан.
+    """
+    registry = getattr(args, 'registry', None) or settings.get('registry_db')
+    if registry:
+        from src.utils_data_manager import DataManager
+        DataManager.REGISTRY_PATH = registry
+
+def build_parser():
+    """
+    Создаёт парсер аргументов командной строки.
+    """
+    parser = argparse.ArgumentParser(prog='python -m src', description="qManager: пакетная обработка PDF без GUI")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    split = commands.add_parser('split', help="разделить PDF по зелёным страницам")
+    split.add_argument('input_pdf')
+    split.add_argument('output_dir')
+    split.add_argument('--threshold', type=float, default=None, help="порог зелёного (по умолчанию из настроек)")
+
+    rename = commands.add_parser('rename', help="переименовать PDF по номерам контейнеров (OCR)")
+    rename.add_argument('input_dir')
+    rename.add_argument('output_dir')
+    rename.add_argument('--excel', required=True, action='append', help=EXCEL_HELP)
+
+    organize = commands.add_parser('organize', help="объединить PDF по заказам и разложить по папкам")
+    organize.add_argument('input_dir')
+    organize.add_argument('output_dir')
+    organize.add_argument('--excel', required=True, action='append', help=EXCEL_HELP)
+
+    pipeline = commands.add_parser('pipeline', help="разделение → переименование → организация")
+    pipeline.add_argument('input_pdf', help="скан PDF (или папка, если первый этап — не split)")
+    pipeline.add_argument('output_dir')
+    pipeline.add_argument('--excel', required=True, action='append', help=EXCEL_HELP)
+    pipeline.add_argument('--threshold', type=float, default=None, help="порог зелёного (по умолчанию из настроек)")
+    pipeline.add_argument('--work-dir', help="папка промежуточных файлов (по умолчанию <output_dir>/_pipeline)")
+    pipeline.add_argument('--stages', help="этапы подряд через запятую (по умолчанию split,rename,organize)")
+    pipeline.add_argument('--staged', action='store_true',
+                          help="выполнять этапы по отдельности с промежуточными файлами в --work-dir")
+
+    for subparser in (split, rename, organize, pipeline):
+        _add_common_arguments(subparser)
+    for subparser in (rename, organize, pipeline):
+        _add_registry_argument(subparser)
+
+    watch = commands.add_parser('watch', help="обрабатывать PDF по мере поступления во входные папки")
+    watch.add_argument('input_dirs', nargs='+', help="входные папки")
+    watch.add_argument('--output', dest='output_dir', required=True, help="папка итоговых файлов")
+    watch.add_argument('--excel', action='append', help=EXCEL_HELP + " (нужен для переименования и организации)")
+    watch.add_argument('--stages', help="этапы подряд через запятую (по умолчанию из настроек)")
+    watch.add_argument('--threshold', type=float, default=None, help="порог зелёного (по умолчанию из настроек)")
+    watch.add_argument('--workers', type=int, default=None, help="файлов одновременно")
+    watch.add_argument('--stable-seconds', type=float, default=None,
+                       help="сколько секунд файл не должен меняться, чтобы считаться дописанным")
+    watch.add_argument('--poll-interval', type=float, default=None, help="интервал опроса, с")
+    watch.add_argument('--poll', action='store_true', help="только опрос, без уведомлений файловой системы")
+    watch.add_argument('--state', help="файл состояния (по умолчанию в %%APPDATA%%/qManager/watch)")
+    watch.add_argument('--staged', action='store_true', help="выполнять этапы по отдельности с промежуточными файлами")
+    watch.add_argument('--keep-work', action='store_true', help="не удалять промежуточные файлы")
+    watch.add_argument('--once', action='store_true', help="обработать уже лежащие файлы и завершиться")
+    watch.add_argument('-q', '--quiet', action='store_true', help="не выводить сообщения")
+    _add_registry_argument(watch)
+    return parser
+
+def _build_job(args, settings):
+    """
+    Возвращает функцию задачи с аргументами log_callback, progress_callback, stage_callback,
+    cancel_token, telemetry.
+    """
+    threshold = args.threshold if getattr(args, 'threshold', None) is not None else settings.get('threshold', 2.3)
+
+    if args.command == 'split':
+        from src.pdf_splitter import split_pdf_by_green_pages
+        from src.utils_toolchain import get_poppler_path
+        return lambda stage_callback, **controls: split_pdf_by_green_pages(
+            args.input_pdf, args.output_dir, get_poppler_path(), threshold, **controls)
+    if args.command == 'rename':
+        from src.pdf_renamer import process_pdfs
+        return lambda stage_callback, **controls: process_pdfs(
+            args.input_dir, args.output_dir, _excel_sources(args), ocr_profile=settings.get('ocr_profile'), **controls)
+    if args.command == 'organize':
+        from src.pdf_organizer import organize_pdfs
+        return lambda stage_callback, **controls: organize_pdfs(
+            args.input_dir, args.output_dir, _excel_sources(args), **controls)
+    from src.core_pipeline import run_pipeline, PIPELINE_STAGES
+    stages = args.stages or PIPELINE_STAGES
+    return lambda stage_callback, **controls: run_pipeline(
+        args.input_pdf, args.output_dir, _excel_sources(args), args.work_dir, threshold, settings.get('ocr_profile'),
+        stage_callback=stage_callback, stages=stages, fused=not args.staged, **controls)
+
+def _exit_code(result):
+    if result['status'] == 'failed':
+        return EXIT_FAILED
+    if result['status'] == 'cancelled':
+        return EXIT_CANCELLED
+    return EXIT_OK
+
+def run(args):
+    """
+    Выполняет команду и печатает JSON-сводку.
+    Аргументы:
+        args (argparse.Namespace): Разобранные аргументы.
+    Возвращает:
+        int: Код возврата.
+    """
+    settings = SettingsManager().load_settings()
+    # Флаги командной строки имеют приоритет над настройками
+    for key in ('profile_cpu', 'profile_memory', 'profile_top_n'):
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    trace_enabled = args.trace if args.trace is not None else settings.get('trace_enabled', False)
+    _use_registry(args, settings)
+
+    def log(message):
+        if not args.quiet:
+            progress.finish_line()
+            print(message, file=sys.stderr, flush=True)
+
+    telemetry = JobTelemetry()
+    progress = ConsoleProgress(sys.stderr, telemetry, enabled=not args.quiet)
+    cancel_token = CancellationToken()
+
+    def on_interrupt(signum, frame):
+        if cancel_token.cancelled:
+            raise KeyboardInterrupt
+        log("Получен сигнал остановки: задача завершится на ближайшей контрольной точке "
+            "(повторный Ctrl+C — немедленный выход)")
+        cancel_token.cancel()
+    previous_handler = signal.signal(signal.SIGINT, on_interrupt)
+
+    output_dir = args.output_dir
+    started = time.monotonic()
+    error = None
+    result = None
+    try:
+        job = _build_job(args, settings)
+        # Модули обработки печатают служебные сообщения в stdout — он зарезервирован под JSON-сводку
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull if args.quiet else sys.stderr), \
+                profile_job(profile_options(settings, args.command, output_dir), log), \
+                trace_job(args.command, output_dir, trace_enabled, log):
+            result = job(stage_callback=progress.set_stage, log_callback=log, progress_callback=progress.update,
+                         cancel_token=cancel_token, telemetry=telemetry)
+    except KeyboardInterrupt:
+        result = {'status': 'cancelled'}
+    except Exception as e:
+        error = str(e)
+        log(f"Ошибка: {e}")
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        progress.finish_line()
+
+    code = EXIT_FAILED if error else _exit_code(result)
+    summary = {
+        'command': args.command,
+        'status': {EXIT_OK: 'completed', EXIT_CANCELLED: 'cancelled'}.get(code, 'failed'),
+        'exit_code': code,
+        'elapsed_s': round(time.monotonic() - started, 3),
+        'result': result,
+        'error': error or (result or {}).get('error'),
+        'telemetry': telemetry.snapshot(),
+    }
+    print(json.dumps(summary, ensure_ascii=False, default=str))
+    return code
+
+def run_watch(args):
+    """
+    Наблюдает за входными папками до Ctrl+C (или до обработки имеющихся файлов с --once)
+    и печатает JSON-сводку.
+    Аргументы:
+        args (argparse.Namespace): Разобранные аргументы.
+    Возвращает:
+        int: Код возврата.
+    """
+    from src.core_watch import HotFolderWatcher
+
+    settings = SettingsManager().load_settings()
+    _use_registry(args, settings)
+
+    def option(name, key):
+        value = getattr(args, name)
+        return value if value is not None else settings.get(key)
+
+    def log(message):
+        if not args.quiet:
+            print(f"{time.strftime('%H:%M:%S')} {message}", file=sys.stderr, flush=True)
+
+    try:
+        watcher = HotFolderWatcher(
+            args.input_dirs, args.output_dir, _excel_sources(args), option('stages', 'watch_stages'),
+            threshold=option('threshold', 'threshold'), ocr_profile=settings.get('ocr_profile'),
+            workers=option('workers', 'watch_workers'), stable_seconds=option('stable_seconds', 'watch_stable_seconds'),
+            poll_interval=option('poll_interval', 'watch_poll_interval'), use_notifications=not args.poll,
+            state_path=args.state, keep_work=args.keep_work, fused=not args.staged, log_callback=log)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    def on_interrupt(signum, frame):
+        if watcher.cancel_token.cancelled:
+            raise KeyboardInterrupt
+        log("Получен сигнал остановки: дожидаемся контрольной точки выполняющихся задач "
+            "(повторный Ctrl+C — немедленный выход)")
+        watcher.stop()
+    previous_handlers = {signum: signal.signal(signum, on_interrupt) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+    started = time.monotonic()
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull if args.quiet else sys.stderr):
+            counters = watcher.run(once=args.once)
+    finally:
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+    code = EXIT_FAILED if counters['failed'] else EXIT_OK
+    print(json.dumps({
+        'command': 'watch',
+        'status': 'failed' if code else 'completed',
+        'exit_code': code,
+        'elapsed_s': round(time.monotonic() - started, 3),
+        'result': counters,
+        'state': watcher.state.path,
+    }, ensure_ascii=False))
+    return code
+
+def main(argv=None):
+    """
+    Точка входа консольного интерфейса.
+    Возвращает:
+        int: Код возврата.
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+    # Лист книги («книга::лист») и удалённые источники не проверяются — ошибку сообщит загрузка реестра
+    excel_paths = [source.partition('::')[0] for source in getattr(args, 'excel', None) or []
+                   if not is_remote_source(source)]
+    for path in filter(None, [getattr(args, 'input_pdf', None), getattr(args, 'input_dir', None),
+                              *excel_paths, *getattr(args, 'input_dirs', [])]):
+        if not os.path.exists(path):
+            print(f"Ошибка: путь не найден: {path}", file=sys.stderr)
+            return EXIT_USAGE
+    if args.command == 'watch':
+        return run_watch(args)
+    if getattr(args, 'stages', None):
+        from src.core_pipeline import parse_stages
+        try:
+            parse_stages(args.stages)
+        except ValueError as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    return run(args)
@@ -0,0 +1,78 @@
+"""
+Токены кооперативной отмены и паузы для длительных операций.
+Функции обработки проверяют токены между страницами или файлами и, получив отмену,
+корректно завершают работу и возвращают сводку по частичному результату.
+Модуль не зависит от Qt и используется как в GUI, так и без него.
+"""
+import threading
+
+class CancellationToken:
+    def __init__(self):
+        """
+        Инициализация токена отмены.
+        """
+        self._event = threading.Event()
+
+    def cancel(self):
+        """
+        Запрашивает отмену операции.
+        """
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        """
+        bool: True, если запрошена отмена.
+        """
+        return self._event.is_set()
+
+class PauseToken:
+    def __init__(self):
+        """
+        Инициализация токена паузы (изначально операция не приостановлена).
+        """
+        self._running = threading.Event()
+        self._running.set()
+
+    def pause(self):
+        """
+        Приостанавливает операцию на ближайшей контрольной точке.
+        """
+        self._running.clear()
+
+    def resume(self):
+        """
+        Возобновляет приостановленную операцию.
+        """
+        self._running.set()
+
+    @property
+    def paused(self):
+        """
+        bool: True, если операция приостановлена.
+        """
+        return not self._running.is_set()
+
+    def wait(self, cancel_token=None, poll_interval=0.2):
+        """
+        Блокирует поток, пока операция приостановлена. Ожидание прерывается отменой.
+        Аргументы:
+            cancel_token (CancellationToken, optional): Токен отмены.
+            poll_interval (float): Период проверки отмены, с.
+        """
+        while not self._running.wait(poll_interval):
+            if cancel_token is not None and cancel_token.cancelled:
+                return
+
+def checkpoint(cancel_token=None, pause_token=None):
+    """
+    Контрольная точка между единицами работы: ждёт снятия паузы и сообщает об отмене.
+    Аргументы:
+        cancel_token (CancellationToken, optional): Токен отмены.
+        pause_token (PauseToken, optional): Токен паузы.
+    Возвращает:
+        bool: True, если операцию нужно прервать.
+    """
+    if pause_token is not None:
+        pause_token.wait(cancel_token)
+    return cancel_token is not None and cancel_token.cancelled
@@ -0,0 +1,136 @@
+"""
+Журнал задач для возобновления после сбоя или остановки.
+Каждая задача (разделение, переименование, организация) ведёт append-only журнал
+в %APPDATA%/qManager/journal, куда записываются завершённые единицы работы.
+При повторном запуске с теми же параметрами задача пропускает уже выполненное.
+Запись результатов выполняется через временный файл и атомарное переименование.
+"""
+import os
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from src.core_settings import get_app_data_dir
+from src.core_tracing import span
+
+@contextmanager
+def atomic_write(path):
+    """
+    Открывает временный файл рядом с path и после успешной записи атомарно заменяет им path.
+    При ошибке временный файл удаляется, а path остаётся нетронутым.
+    Аргументы:
+        path (str): Итоговый путь к файлу.
+    Возвращает:
+        file: Бинарный файловый объект для записи.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    temp_path = os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        with span('os.replace', path=path):
+            os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class JobJournal:
+    def __init__(self, stage, params, journal_dir=None):
+        """
+        Открывает журнал задачи; если журнал с такими параметрами уже есть, загружает его записи.
+        Аргументы:
+            stage (str): Этап ('split', 'rename', 'organize').
+            params (dict): Параметры, однозначно определяющие задачу (пути, порог и т.п.).
+            journal_dir (str, optional): Папка журналов; по умолчанию %APPDATA%/qManager/journal.
+        """
+        key = json.dumps({'stage': stage, **params}, sort_keys=True, ensure_ascii=False, default=str)
+        job_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(journal_dir or get_app_data_dir('journal'), f"{stage}_{job_id}.jsonl")
+        self._records = {}
+        self._lock = threading.Lock()
+        self._load()
+        self.resumed = bool(self._records)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _load(self):
+        """
+        Загружает записи журнала; неполная последняя строка (сбой во время записи) игнорируется.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._records.setdefault(entry['kind'], {})[entry['key']] = entry.get('data', {})
+
+    def record(self, kind, key, **data):
+        """
+        Добавляет запись о завершённой единице работы и сбрасывает её на диск.
+        Аргументы:
+            kind (str): Тип единицы ('page', 'segment', 'ocr', 'renamed', 'merged', ...).
+            key (str | int): Идентификатор единицы в пределах типа.
+            **data: Данные, необходимые для возобновления.
+        """
+        key = str(key)
+        line = json.dumps({'kind': kind, 'key': key, 'data': data}, ensure_ascii=False, default=str)
+        with self._lock:
+            self._records.setdefault(kind, {})[key] = data
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def is_done(self, kind, key):
+        """
+        Проверяет, записана ли единица работы.
+        """
+        return str(key) in self._records.get(kind, {})
+
+    def get(self, kind, key, default=None):
+        """
+        Возвращает данные записанной единицы работы или default.
+        """
+        return self._records.get(kind, {}).get(str(key), default)
+
+    def entries(self, kind):
+        """
+        Возвращает все записи заданного типа.
+        Возвращает:
+            dict: {ключ: данные}.
+        """
+        return dict(self._records.get(kind, {}))
+
+    def pending_reservations(self):
+        """
+        Возвращает пути файлов, имена которых были закреплены, но запись которых не завершилась.
+        Возвращает:
+            list: Список путей.
+        """
+        committed = self._records.get('committed', {})
+        return [path for path in self._records.get('reserved', {}) if path not in committed]
+
+    def close(self):
+        """
+        Закрывает журнал, сохраняя его для возобновления.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def finish(self):
+        """
+        Закрывает и удаляет журнал после успешного завершения задачи.
+        """
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,100 @@
+"""
+Асинхронный конвейер логирования приложения.
+Сообщения попадают в очередь через QueueHandler, а отдельный поток QueueListener
+раскладывает их в ограниченный кольцевой буфер в памяти, ротируемый файл журнала
+в %APPDATA%/qManager/logs и консоль. Поток GUI не ждёт файловых операций.
+"""
+import os
+import sys
+import queue
+import logging
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from src.core_settings import get_app_data_dir
+
+LOGGER_NAME = 'qManager'
+RING_BUFFER_SIZE = 5000
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+class RingBufferHandler(logging.Handler):
+    def __init__(self, capacity=RING_BUFFER_SIZE):
+        """
+        Обработчик, хранящий последние capacity отформатированных сообщений.
+        Аргументы:
+            capacity (int): Размер буфера.
+        """
+        super().__init__()
+        self._buffer = deque(maxlen=capacity)
+        self._buffer_lock = threading.Lock()
+
+    def emit(self, record):
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._buffer_lock:
+            self._buffer.append(message)
+
+    def lines(self, count=None):
+        """
+        Возвращает последние сообщения.
+        Аргументы:
+            count (int, optional): Сколько сообщений вернуть; по умолчанию все.
+        Возвращает:
+            list: Список строк.
+        """
+        with self._buffer_lock:
+            items = list(self._buffer)
+        return items[-count:] if count else items
+
+class LogPipeline:
+    def __init__(self, log_dir=None, capacity=RING_BUFFER_SIZE, console=True):
+        """
+        Создаёт и запускает конвейер логирования.
+        Аргументы:
+            log_dir (str, optional): Папка файлов журнала; по умолчанию %APPDATA%/qManager/logs.
+            capacity (int): Размер кольцевого буфера.
+            console (bool): Дублировать сообщения в stdout.
+        """
+        log_dir = log_dir or get_app_data_dir('logs')
+        self.log_path = os.path.join(log_dir, 'qmanager.log')
+
+        self.ring = RingBufferHandler(capacity)
+        self.ring.setFormatter(logging.Formatter('%(message)s'))
+        file_handler = RotatingFileHandler(self.log_path, maxBytes=LOG_FILE_MAX_BYTES,
+                                           backupCount=LOG_FILE_BACKUPS, encoding='utf-8', delay=True)
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers = [self.ring, file_handler]
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter('%(message)s'))
+            handlers.append(console_handler)
+
+        self._queue = queue.SimpleQueue()
+        self._listener = QueueListener(self._queue, *handlers, respect_handler_level=True)
+        self._queue_handler = QueueHandler(self._queue)
+
+        self.logger = logging.getLogger(LOGGER_NAME)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(self._queue_handler)
+        self._listener.start()
+
+    def recent(self, count=None):
+        """
+        Возвращает последние сообщения из кольцевого буфера.
+        """
+        return self.ring.lines(count)
+
+    def stop(self):
+        """
+        Дописывает оставшиеся сообщения и останавливает поток конвейера.
+        """
+        self.logger.removeHandler(self._queue_handler)
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
@@ -0,0 +1,130 @@
+"""
+Конвейер полной обработки скана: разделение → переименование → организация
+(или часть этапов подряд). Все три этапа по умолчанию выполняются совмещённо, без промежуточных
+файлов (pdf_pipeline.process_scan); иначе каждый этап — существующая функция обработки,
+а промежуточные файлы лежат в рабочей папке.
+Модуль не зависит от Qt.
+"""
+import os
+import logging
+
+from src.pdf_splitter import split_pdf_by_green_pages
+from src.pdf_renamer import process_pdfs
+from src.pdf_organizer import organize_pdfs
+from src.pdf_pipeline import process_scan
+from src.utils_toolchain import get_poppler_path
+
+PIPELINE_STAGES = ('split', 'rename', 'organize')
+STAGE_TITLES = {
+    'split': "разделение",
+    'rename': "переименование",
+    'organize': "организация",
+}
+# Папки промежуточных результатов этапов внутри рабочей папки
+STAGE_DIRS = {
+    'split': 'split',
+    'rename': 'renamed',
+    'organize': 'organized',
+}
+
+def parse_stages(value):
+    """
+    Разбирает список этапов ('split,rename' или итерируемое) и проверяет, что этапы идут подряд
+    в порядке конвейера.
+    Возвращает:
+        tuple: Этапы в порядке выполнения.
+    Исключения:
+        ValueError: Неизвестный этап или этапы с пропуском.
+    """
+    names = [name.strip() for name in (value.split(',') if isinstance(value, str) else value) if name.strip()]
+    unknown = [name for name in names if name not in PIPELINE_STAGES]
+    if unknown or not names:
+        raise ValueError(f"Неизвестные этапы: {', '.join(unknown) or '(пусто)'}; допустимы: {', '.join(PIPELINE_STAGES)}")
+    start = PIPELINE_STAGES.index(names[0])
+    if tuple(names) != PIPELINE_STAGES[start:start + len(names)]:
+        raise ValueError(f"Этапы должны идти подряд в порядке {' → '.join(PIPELINE_STAGES)}")
+    return tuple(names)
+
+def run_pipeline(input_path, output_folder, excel_path, work_dir=None, threshold=2.3, ocr_profile=None,
+                 log_callback=None, progress_callback=None, stage_callback=None,
+                 cancel_token=None, pause_token=None, telemetry=None, stages=PIPELINE_STAGES, fused=True):
+    """
+    Выполняет этапы конвейера последовательно: результат каждого этапа — вход следующего,
+    результат последнего записывается в output_folder.
+    Аргументы:
+        input_path (str): Исходный многостраничный PDF, если первый этап — разделение,
+            иначе папка с PDF.
+        output_folder (str): Папка итоговых файлов.
+        excel_path (str | list): Реестр Excel (для переименования и организации): книга, папка книг
+            или список источников (см. DataManager.load_excel_sources).
+        work_dir (str, optional): Рабочая папка для промежуточных файлов;
+            по умолчанию <output_folder>/_pipeline.
+        threshold (float): Порог определения зелёных страниц.
+        ocr_profile (dict, optional): Профиль OCR.
+        log_callback (callable, optional): Функция для логирования.
+        progress_callback (callable, optional): Прогресс текущего этапа (current, total).
+        stage_callback (callable, optional): Вызывается с именем этапа при его начале.
+        cancel_token (CancellationToken, optional): Токен отмены.
+        pause_token (PauseToken, optional): Токен паузы.
+        telemetry (JobTelemetry, optional): Телеметрия задачи.
+        stages (iterable): Этапы (см. parse_stages); по умолчанию все.
+        fused (bool): Выполнять все три этапа совмещённо, без промежуточных файлов.
+    Возвращает:
+        dict: status ('completed' | 'cancelled' | 'failed'), failed_stage, work_dir
+            и stages — сводки этапов (при совмещённой обработке — одна сводка 'pipeline');
+            при status 'failed' — также error этапа.
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            logging.info(message)
+
+    stages = parse_stages(stages)
+    controls = {'log_callback': log_callback, 'progress_callback': progress_callback,
+                'cancel_token': cancel_token, 'pause_token': pause_token, 'telemetry': telemetry}
+    if fused and stages == PIPELINE_STAGES:
+        if stage_callback:
+            stage_callback('pipeline')
+        summary = process_scan(input_path, output_folder, excel_path, threshold, ocr_profile, **controls)
+        if summary['status'] == 'failed':
+            log("Конвейер остановлен: обработка завершилась с ошибкой")
+            return {'status': 'failed', 'failed_stage': 'pipeline', 'work_dir': None, 'error': summary.get('error'),
+                    'stages': {'pipeline': summary}}
+        return {'status': summary['status'], 'failed_stage': None, 'work_dir': None, 'stages': {'pipeline': summary}}
+
+    work_dir = work_dir or os.path.join(output_folder, '_pipeline')
+    # Вход этапа — выход предыдущего; последний этап пишет в output_folder
+    targets = {name: os.path.join(work_dir, STAGE_DIRS[name]) for name in stages[:-1]}
+    targets[stages[-1]] = output_folder
+    for target in targets.values():
+        os.makedirs(target, exist_ok=True)
+    if len(stages) > 1:
+        log(f"Рабочая папка конвейера: {work_dir}")
+
+    runners = {
+        'split': lambda source, target: split_pdf_by_green_pages(
+            source, target, get_poppler_path(), threshold, **controls),
+        'rename': lambda source, target: process_pdfs(
+            source, target, excel_path, ocr_profile=ocr_profile, **controls),
+        'organize': lambda source, target: organize_pdfs(source, target, excel_path, **controls),
+    }
+
+    summaries = {}
+    source = input_path
+    for index, name in enumerate(stages, 1):
+        log(f"Этап {index}/{len(stages)}: {STAGE_TITLES[name]}")
+        if stage_callback:
+            stage_callback(name)
+        summary = runners[name](source, targets[name])
+        summaries[name] = summary
+        if summary['status'] == 'failed':
+            log(f"Конвейер остановлен: этап «{STAGE_TITLES[name]}» завершился с ошибкой")
+            return {'status': 'failed', 'failed_stage': name, 'work_dir': work_dir, 'error': summary.get('error'),
+                    'stages': summaries}
+        if summary['status'] == 'cancelled':
+            return {'status': 'cancelled', 'failed_stage': None, 'work_dir': work_dir, 'stages': summaries}
+        source = targets[name]
+
+    log("Конвейер завершён")
+    return {'status': 'completed', 'failed_stage': None, 'work_dir': work_dir, 'stages': summaries}
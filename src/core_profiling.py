@@ -0,0 +1,226 @@
+"""
+Профилирование задач: cProfile (время) и tracemalloc (память).
+Если профилирование выключено, задача выполняется без обёрток и без накладных расходов.
+Результаты сохраняются рядом с выходными файлами задачи:
+- profile_<задача>_<время>.prof — статистика cProfile (pstats, snakeviz);
+- profile_<задача>_<время>_memory.txt — пиковое потребление и top-N мест выделения памяти
+  по снимку, сделанному вблизи пика.
+"""
+import os
+import sys
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextvars import ContextVar
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.core_settings import get_app_data_dir
+
+DEFAULT_TOP_N = 25
+# Период опроса объёма памяти для снимка вблизи пика, с
+PEAK_SAMPLE_INTERVAL = 0.5
+# Глубина трассировки выделений: больше — точнее отчёт, но выше накладные расходы
+TRACEMALLOC_FRAMES = 1
+
+# tracemalloc глобален для процесса, поэтому учитываем число задач, которые его используют
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+# Профилируется ли задача текущего контекста (потока)
+_profiling = ContextVar('qmanager_profiling', default=False)
+
+def is_profiling():
+    """
+    Проверяет, профилируется ли задача текущего контекста. Работа, вынесенная в дочерние процессы,
+    в отчёт не попадает, поэтому при профилировании её следует выполнять в потоке задачи.
+    """
+    return _profiling.get()
+
+def profile_options(settings, job_name, output_dir=None):
+    """
+    Собирает параметры профилирования задачи из настроек.
+    Аргументы:
+        settings (dict): Настройки приложения (profile_cpu, profile_memory, profile_top_n).
+        job_name (str): Имя задачи (префикс файлов).
+        output_dir (str, optional): Папка результатов задачи.
+    Возвращает:
+        dict | None: Параметры для profile_job или None, если профилирование выключено.
+    """
+    cpu = bool(settings.get('profile_cpu'))
+    memory = bool(settings.get('profile_memory'))
+    if not (cpu or memory):
+        return None
+    return {
+        'name': job_name,
+        'output_dir': output_dir,
+        'cpu': cpu,
+        'memory': memory,
+        'top_n': int(settings.get('profile_top_n') or DEFAULT_TOP_N),
+    }
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+        _tracemalloc_users += 1
+
+class PeakSampler(threading.Thread):
+    def __init__(self, interval=PEAK_SAMPLE_INTERVAL):
+        """
+        Фоновый поток, сохраняющий снимок tracemalloc при каждом новом максимуме
+        занятой памяти: к концу задачи временные буферы (изображения страниц,
+        содержимое PDF) уже освобождены и в итоговом снимке не видны.
+        Аргументы:
+            interval (float): Период опроса, с.
+        """
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.snapshot = None
+        self.snapshot_size = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_size:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_size = current
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def _stop_tracemalloc():
+    """
+    Снимает снимок памяти и останавливает tracemalloc, если задача была последней.
+    Возвращает:
+        tuple: (снимок, текущий объём, пиковый объём).
+    """
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+    return snapshot, current, peak
+
+def format_memory_report(snapshot, current, peak, top_n=DEFAULT_TOP_N, shared=False, snapshot_size=None):
+    """
+    Формирует отчёт о выделениях памяти.
+    Аргументы:
+        snapshot (tracemalloc.Snapshot): Снимок вблизи пика или на момент завершения задачи.
+        current (int): Объём памяти под трассировкой на момент завершения, байт.
+        peak (int): Пиковый объём, байт.
+        top_n (int): Сколько мест выделения показать.
+        shared (bool): Одновременно профилировались другие задачи.
+        snapshot_size (int, optional): Объём памяти в момент снимка, если он сделан до завершения.
+    Возвращает:
+        str: Текст отчёта.
+    """
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ))
+    stats = snapshot.statistics('lineno')
+    lines = [
+        f"Пиковый объём: {peak / (1024 * 1024):.1f} МБ",
+        f"Удерживается на момент завершения: {current / (1024 * 1024):.1f} МБ",
+    ]
+    if shared:
+        lines.append("Внимание: одновременно профилировались другие задачи, их выделения тоже учтены")
+    lines.append("")
+    if snapshot_size is not None:
+        lines.append(f"Top-{top_n} мест выделения памяти (снимок при {snapshot_size / (1024 * 1024):.1f} МБ):")
+    else:
+        lines.append(f"Top-{top_n} мест выделения памяти (удерживается на момент завершения):")
+    for index, stat in enumerate(stats[:top_n], 1):
+        frame = stat.traceback[0]
+        lines.append(f"{index:>3}. {frame.filename}:{frame.lineno}: "
+                     f"{stat.size / 1024:.1f} КБ в {stat.count} блоках")
+    return "\n".join(lines)
+
+def _profile_directory(output_dir):
+    if output_dir and os.path.isdir(output_dir) and os.access(output_dir, os.W_OK):
+        return output_dir
+    return get_app_data_dir('profiles')
+
+@contextmanager
+def profile_job(options, log_callback=None):
+    """
+    Профилирует блок кода согласно options и сохраняет отчёты по его завершении (в том числе с ошибкой).
+    cProfile измеряет только текущий поток, поэтому блок должен выполняться в потоке задачи.
+    Аргументы:
+        options (dict | None): Результат profile_options(); None — профилирование выключено.
+        log_callback (callable, optional): Функция для логирования.
+    """
+    if not options:
+        yield
+        return
+
+    profiler = cProfile.Profile() if options['cpu'] else None
+    token = _profiling.set(True)
+    sampler = None
+    if options['memory']:
+        _start_tracemalloc()
+        sampler = PeakSampler()
+        sampler.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        _profiling.reset(token)
+        if profiler is not None:
+            profiler.disable()
+        memory = None
+        if sampler is not None:
+            sampler.stop()
+            with _tracemalloc_lock:
+                shared = _tracemalloc_users > 1
+            snapshot, current, peak = _stop_tracemalloc()
+            if sampler.snapshot is not None and sampler.snapshot_size > current:
+                memory = (sampler.snapshot, current, peak, shared, sampler.snapshot_size)
+            else:
+                memory = (snapshot, current, peak, shared, None)
+
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(_profile_directory(options['output_dir']), f"profile_{options['name']}_{stamp}")
+        try:
+            if profiler is not None:
+                profiler.dump_stats(base + '.prof')
+                if log_callback:
+                    log_callback(f"Профиль cProfile сохранён: {base}.prof")
+            if memory is not None:
+                snapshot, current, peak, shared, snapshot_size = memory
+                with open(base + '_memory.txt', 'w', encoding='utf-8') as f:
+                    f.write(format_memory_report(snapshot, current, peak, options['top_n'], shared,
+                                                 snapshot_size) + "\n")
+                if log_callback:
+                    log_callback(f"Отчёт о памяти сохранён: {base}_memory.txt "
+                                 f"(пик {peak / (1024 * 1024):.1f} МБ)")
+        except OSError as e:
+            if log_callback:
+                log_callback(f"Не удалось сохранить отчёт профилирования: {e}")
+
+def main(argv=None):
+    """
+    Печатает самые затратные функции из файла .prof.
+    Использование: python -m src.core_profiling profile_split_20240101_120000.prof [N]
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not 1 <= len(argv) <= 2:
+        print("Использование: python -m src.core_profiling <profile.prof> [N]")
+        return 2
+    top_n = int(argv[1]) if len(argv) == 2 else DEFAULT_TOP_N
+    pstats.Stats(argv[0]).strip_dirs().sort_stats('cumulative').print_stats(top_n)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
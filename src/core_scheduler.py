@@ -0,0 +1,178 @@
+import os
+from itertools import count
+
+from PySide6.QtCore import QObject, Signal
+
+from src.core_worker import WorkerThread
+
+# Классы ресурсов: рендеринг и OCR нагружают процессор, объединение PDF — диск
+RESOURCE_CPU = 'cpu'
+RESOURCE_IO = 'io'
+
+DEFAULT_LIMITS = {
+    RESOURCE_CPU: max(1, (os.cpu_count() or 2) // 2),
+    RESOURCE_IO: 2,
+}
+
+class Job:
+    def __init__(self, job_id, title, function, resource, profile=None):
+        """
+        Описание задачи в очереди.
+        Аргументы:
+            job_id (int): Идентификатор задачи.
+            title (str): Название для отображения.
+            function (callable): Функция, выполняемая в WorkerThread.
+            resource (str): Класс ресурса (RESOURCE_CPU или RESOURCE_IO).
+            profile (dict, optional): Параметры профилирования задачи.
+        """
+        self.id = job_id
+        self.title = title
+        self.function = function
+        self.resource = resource
+        self.profile = profile
+        self.worker = None
+        self.state = 'queued'  # queued, running, paused, completed, cancelled, failed
+        self.result = None
+
+class JobScheduler(QObject):
+    job_added = Signal(int)
+    job_state_changed = Signal(int, str)
+    job_progress = Signal(int, int, int)  # задача, текущий, всего
+    job_log = Signal(int, list)  # задача, пакет сообщений
+    job_result = Signal(int, object)
+    job_telemetry = Signal(int, dict)  # задача, снимок телеметрии
+
+    def __init__(self, limits=None, parent=None):
+        """
+        Планировщик задач: очередь задач всех вкладок с параллельным выполнением
+        в пределах лимитов на каждый класс ресурсов.
+        Аргументы:
+            limits (dict, optional): Максимум одновременно выполняемых задач по классу ресурса.
+            parent (QObject, optional): Родительский объект.
+        """
+        super().__init__(parent)
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.jobs = {}
+        self._ids = count(1)
+
+    def submit(self, title, function, resource=RESOURCE_CPU, profile=None):
+        """
+        Ставит задачу в очередь и запускает её, если есть свободный слот.
+        Аргументы:
+            title (str): Название задачи.
+            function (callable): Функция с аргументами log_callback, progress_callback, cancel_token,
+                pause_token, telemetry.
+            resource (str): Класс ресурса.
+            profile (dict, optional): Параметры профилирования (см. core_profiling.profile_options).
+        Возвращает:
+            int: Идентификатор задачи.
+        """
+        job = Job(next(self._ids), title, function, resource, profile)
+        self.jobs[job.id] = job
+        self.job_added.emit(job.id)
+        self._dispatch()
+        return job.id
+
+    def _running_count(self, resource):
+        return sum(1 for job in self.jobs.values()
+                   if job.resource == resource and job.state in ('running', 'paused'))
+
+    def _set_state(self, job, state):
+        job.state = state
+        self.job_state_changed.emit(job.id, state)
+
+    def _dispatch(self):
+        """
+        Запускает задачи из очереди в порядке поступления, пока есть свободные слоты.
+        """
+        for job in list(self.jobs.values()):
+            if job.state != 'queued':
+                continue
+            if self._running_count(job.resource) >= self.limits.get(job.resource, 1):
+                continue
+            self._start(job)
+
+    def _start(self, job):
+        worker = WorkerThread(job.function, profile=job.profile)
+        worker.progress.connect(lambda current, total, job_id=job.id: self.job_progress.emit(job_id, current, total))
+        worker.log_batch.connect(lambda messages, job_id=job.id: self.job_log.emit(job_id, messages))
+        worker.telemetry_updated.connect(
+            lambda snapshot, job_id=job.id: self.job_telemetry.emit(job_id, snapshot))
+        worker.error.connect(lambda message, job_id=job.id: self._on_error(job_id, message))
+        worker.result.connect(lambda result, job_id=job.id: self._on_result(job_id, result))
+        worker.finished.connect(lambda job_id=job.id: self._on_finished(job_id))
+        job.worker = worker
+        self._set_state(job, 'running')
+        worker.start()
+
+    def _on_error(self, job_id, message):
+        job = self.jobs[job_id]
+        self.job_log.emit(job_id, [message])
+        self._set_state(job, 'failed')
+
+    def _on_result(self, job_id, result):
+        job = self.jobs[job_id]
+        job.result = result
+        self.job_result.emit(job_id, result)
+        status = result.get('status') if isinstance(result, dict) else None
+        if status in ('cancelled', 'failed'):
+            self._set_state(job, status)
+        else:
+            self._set_state(job, 'completed')
+
+    def _on_finished(self, job_id):
+        job = self.jobs[job_id]
+        # finished приходит и от QThread, поэтому обрабатываем только первый раз
+        if job.worker is None or job.worker.isRunning():
+            return
+        job.worker = None
+        if job.state in ('running', 'paused'):
+            self._set_state(job, 'completed')
+        self._dispatch()
+
+    def cancel(self, job_id):
+        """
+        Отменяет задачу: из очереди удаляется сразу, выполняющаяся останавливается на контрольной точке.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if job.state == 'queued':
+            self._set_state(job, 'cancelled')
+        elif job.worker is not None:
+            job.worker.cancel()
+
+    def pause(self, job_id):
+        """
+        Приостанавливает выполняющуюся задачу.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and job.worker is not None and job.state == 'running':
+            job.worker.pause()
+            self._set_state(job, 'paused')
+
+    def resume(self, job_id):
+        """
+        Возобновляет приостановленную задачу.
+        """
+        job = self.jobs.get(job_id)
+        if job is not None and job.worker is not None and job.state == 'paused':
+            job.worker.resume()
+            self._set_state(job, 'running')
+
+    def cancel_all(self, wait=False):
+        """
+        Отменяет все задачи; при wait=True дожидается завершения потоков.
+        """
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+        if wait:
+            for job in list(self.jobs.values()):
+                if job.worker is not None:
+                    job.worker.wait()
+
+    def has_active_jobs(self):
+        """
+        Возвращает True, если есть задачи в очереди или в работе.
+        """
+        return any(job.state in ('queued', 'running', 'paused') for job in self.jobs.values())
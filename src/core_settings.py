@@ -1,6 +1,18 @@
 import os
 import json
 
+def get_app_data_dir(*parts):
+    """
+    Возвращает путь к папке приложения в %APPDATA% (или подпапке в ней), создавая её при необходимости.
+    Аргументы:
+        *parts (str): Имена вложенных папок.
+    Возвращает:
+        str: Абсолютный путь к папке.
+    """
+    path = os.path.join(os.getenv('APPDATA', os.path.expanduser('~')), 'qManager', *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
 class SettingsManager:
     def __init__(self):
         """
@@ -16,10 +28,27 @@ class SettingsManager:
             'renamer_output': '',
             'organizer_input': '',
             'organizer_output': '',
+            'pipeline_input': '',
+            'pipeline_output': '',
+            'pipeline_excel_file': '',
             'threshold': 2.3,
             'excel_file': '',
             'organizer_excel_file': '',
+            'ocr_profile': None,
+            'max_cpu_jobs': 0,  # 0 — половина ядер, не меньше 1 (max(1, cpu_count // 2), см. core_scheduler)
+            'max_io_jobs': 0,  # 0 — 2 задачи
+            'trace_enabled': False,  # трассировка горячих вызовов (см. core_tracing)
+            'profile_cpu': False,  # cProfile для каждой задачи (см. core_profiling)
+            'profile_memory': False,  # tracemalloc для каждой задачи
+            'profile_top_n': 25,
+            'watch_stages': 'split,rename,organize',  # режим наблюдения (см. core_watch)
+            'watch_workers': 2,
+            'watch_stable_seconds': 5.0,
+            'watch_poll_interval': 2.0,
+            'registry_db': '',  # накопительный реестр SQLite для консольного режима (см. utils_container_registry)
         }
+        # Настройки на момент последней загрузки/сохранения — для записи только изменённых ключей
+        self._saved_settings = None
 
     @staticmethod
     def _get_settings_path():
@@ -39,20 +68,63 @@ class SettingsManager:
         """
         try:
             if os.path.exists(self.settings_path):
-                with open(self.settings_path, 'r', encoding='utf-8') as f:
-                    return {**self.default_settings, **json.load(f)}
+                settings = self._read_file()
+                self._saved_settings = json.loads(json.dumps(settings))
+                return settings
+        except Exception as e:
+            print(f"[ERROR] Ошибка загрузки настроек: {e}")
+        return dict(self.default_settings)
+
+    def _read_file(self):
+        with open(self.settings_path, 'r', encoding='utf-8') as f:
+            return {**self.default_settings, **json.load(f)}
+
+    def load_setting(self, key):
+        """
+        Читает одну настройку из файла, не затрагивая сохранённое состояние менеджера.
+        Нужна задачам, чьи настройки может изменить другой процесс (например, ocr_profile —
+        бенчмарк OCR с флагом --save).
+        Аргументы:
+            key (str): Имя настройки.
+        Возвращает:
+            Значение из файла или значение по умолчанию.
+        """
+        try:
+            if os.path.exists(self.settings_path):
+                return self._read_file().get(key)
         except Exception as e:
             print(f"[ERROR] Ошибка загрузки настроек: {e}")
-        return self.default_settings
+        return self.default_settings.get(key)
 
     def save_settings(self, settings):
         """
-        Сохраняет настройки в файл settings.json.
+        Сохраняет настройки в файл settings.json, если они изменились с последней загрузки/сохранения.
+        В файл переносятся только изменённые ключи: значения, записанные в файл другим процессом
+        (например, ocr_profile из бенчмарка OCR), сохраняются и попадают в settings.
+        Запись идёт во временный файл, который затем атомарно заменяет settings.json.
         Аргументы:
-            settings (dict): Словарь с настройками для сохранения.
+            settings (dict): Словарь с настройками для сохранения; дополняется значениями из файла.
+        Возвращает:
+            bool: True, если файл был перезаписан.
         """
         try:
-            with open(self.settings_path, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, indent=4, ensure_ascii=False)
+            previous = self._saved_settings or {}
+            changed = {key: value for key, value in json.loads(json.dumps(settings)).items()
+                       if key not in previous or previous[key] != value}
+            if self._saved_settings is not None and not changed:
+                return False
+            merged = self._read_file() if os.path.exists(self.settings_path) else dict(self.default_settings)
+            merged.update(changed)
+            data = json.dumps(merged, indent=4, ensure_ascii=False)
+            temp_path = self.settings_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.settings_path)
+            self._saved_settings = json.loads(data)
+            settings.update(merged)
+            return True
         except Exception as e:
             print(f"[ERROR] Ошибка сохранения настроек: {e}")
+            return False
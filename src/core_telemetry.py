@@ -0,0 +1,173 @@
+"""
+Телеметрия выполнения задачи: пропускная способность по этапам (страницы/с, файлы/с, МБ/с),
+ETA по скользящему среднему прогресса и текущее узкое место.
+Модуль не зависит от Qt: снимок доступен и в GUI, и при запуске без интерфейса.
+"""
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Окно скользящего среднего, с
+WINDOW_SECONDS = 30.0
+
+STAGE_LABELS = {
+    'excel': "загрузка Excel",
+    'render': "рендеринг",
+    'ocr': "OCR",
+    'move': "перемещение",
+    'merge': "объединение",
+    'write': "запись",
+}
+
+class JobTelemetry:
+    def __init__(self, window_seconds=WINDOW_SECONDS, clock=time.monotonic):
+        """
+        Инициализация телеметрии задачи.
+        Аргументы:
+            window_seconds (float): Окно скользящего среднего, с.
+            clock (callable): Источник времени (для тестов и бенчмарков).
+        """
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        self._stages = {}
+        self._samples = deque()  # (время, этап, единицы, байты, занятость)
+        self._progress = deque()  # (время, текущий)
+        self._current = 0
+        self._total = 0
+
+    def _trim(self, now):
+        limit = now - self.window_seconds
+        while self._samples and self._samples[0][0] < limit:
+            self._samples.popleft()
+        # Для прогресса оставляем хотя бы одну точку до окна, чтобы считать скорость
+        while len(self._progress) > 2 and self._progress[1][0] < limit:
+            self._progress.popleft()
+
+    def add(self, name, units=1, nbytes=0, busy_seconds=0.0, unit='файлов'):
+        """
+        Учитывает обработанные единицы этапа.
+        Аргументы:
+            name (str): Этап (ключ STAGE_LABELS).
+            units (int): Количество единиц (страниц, файлов).
+            nbytes (int): Объём обработанных данных, байт.
+            busy_seconds (float): Время, затраченное этапом.
+            unit (str): Название единицы для отображения.
+        """
+        now = self._clock()
+        with self._lock:
+            stats = self._stages.setdefault(name, {'unit': unit, 'units': 0, 'bytes': 0, 'busy_s': 0.0})
+            stats['units'] += units
+            stats['bytes'] += nbytes
+            stats['busy_s'] += busy_seconds
+            self._samples.append((now, name, units, nbytes, busy_seconds))
+            self._trim(now)
+
+    @contextmanager
+    def stage(self, name, units=1, nbytes=0, unit='файлов'):
+        """
+        Контекстный менеджер, измеряющий время этапа и учитывающий его единицы.
+        Возвращает словарь {'units', 'nbytes'}, который можно уточнить внутри блока
+        (например, когда размер результата известен только после записи).
+        """
+        counters = {'units': units, 'nbytes': nbytes}
+        start = self._clock()
+        try:
+            yield counters
+        finally:
+            self.add(name, counters['units'], counters['nbytes'], self._clock() - start, unit)
+
+    def set_progress(self, current, total):
+        """
+        Обновляет общий прогресс задачи (для ETA).
+        """
+        now = self._clock()
+        with self._lock:
+            self._current, self._total = current, total
+            self._progress.append((now, current))
+            self._trim(now)
+
+    def snapshot(self):
+        """
+        Возвращает снимок телеметрии.
+        Возвращает:
+            dict: elapsed_s, current, total, rate (единиц прогресса/с), eta_s (или None),
+                stages ({этап: unit, units, rate, mb_s, busy_s, share}), bottleneck (этап или None).
+        """
+        now = self._clock()
+        with self._lock:
+            self._trim(now)
+            samples = list(self._samples)
+            progress = list(self._progress)
+            stages = {name: dict(stats) for name, stats in self._stages.items()}
+            current, total = self._current, self._total
+
+        span = max(min(self.window_seconds, now - self._started), 1e-9)
+        window = {}
+        for _, name, units, nbytes, busy in samples:
+            w = window.setdefault(name, [0, 0, 0.0])
+            w[0] += units
+            w[1] += nbytes
+            w[2] += busy
+        busy_total = sum(w[2] for w in window.values())
+        for name, stats in stages.items():
+            units, nbytes, busy = window.get(name, (0, 0, 0.0))
+            stats['rate'] = units / span
+            stats['mb_s'] = nbytes / span / (1024 * 1024)
+            stats['share'] = busy / busy_total if busy_total else 0.0
+
+        rate = 0.0
+        if len(progress) >= 2 and progress[-1][0] > progress[0][0]:
+            rate = (progress[-1][1] - progress[0][1]) / (progress[-1][0] - progress[0][0])
+        eta = (total - current) / rate if rate > 0 and total >= current else None
+        bottleneck = max(window, key=lambda name: window[name][2]) if busy_total else None
+        return {
+            'elapsed_s': now - self._started,
+            'current': current,
+            'total': total,
+            'rate': rate,
+            'eta_s': eta,
+            'stages': stages,
+            'bottleneck': bottleneck,
+        }
+
+def stage(telemetry, name, units=1, nbytes=0, unit='файлов'):
+    """
+    Возвращает контекст измерения этапа или пустой контекст, если телеметрия не используется.
+    """
+    if telemetry is None:
+        return nullcontext({'units': units, 'nbytes': nbytes})
+    return telemetry.stage(name, units, nbytes, unit)
+
+def format_duration(seconds):
+    """
+    Форматирует длительность как ЧЧ:ММ:СС или ММ:СС.
+    """
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+def format_snapshot(snapshot):
+    """
+    Краткое текстовое описание снимка: скорость этапов, ETA и узкое место.
+    Аргументы:
+        snapshot (dict): Результат JobTelemetry.snapshot().
+    Возвращает:
+        str: Строка для прогресс-бара или лога.
+    """
+    parts = []
+    for name, stats in snapshot['stages'].items():
+        if stats['rate'] <= 0:
+            continue
+        text = f"{STAGE_LABELS.get(name, name)}: {stats['rate']:.1f} {stats['unit']}/с"
+        if stats['mb_s'] >= 0.01:
+            text += f", {stats['mb_s']:.1f} МБ/с"
+        parts.append(text)
+    if snapshot['eta_s'] is not None:
+        parts.append(f"осталось ~{format_duration(snapshot['eta_s'])}")
+    if snapshot['bottleneck']:
+        parts.append(f"узкое место: {STAGE_LABELS.get(snapshot['bottleneck'], snapshot['bottleneck'])}")
+    return " · ".join(parts)
@@ -0,0 +1,254 @@
+"""
+Опциональная трассировка горячих вызовов: рендеринг poppler, Tesseract, разбор и объединение PDF,
+загрузка Excel, перемещение файлов.
+Пока трассировщик не активирован, span() ничего не записывает. Активный трассировщик хранится
+в contextvar, поэтому функции обработки не передают его явно. По итогам запуска
+сохраняется временная шкала в формате Chrome trace (chrome://tracing, Perfetto)
+и сводная таблица с суммами и перцентилями по каждому участку.
+"""
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextvars import ContextVar
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.core_settings import get_app_data_dir
+
+_current_tracer = ContextVar('qmanager_tracer', default=None)
+
+PERCENTILES = (50, 90, 99)
+
+class Tracer:
+    def __init__(self, name='qManager'):
+        """
+        Инициализация трассировщика.
+        Аргументы:
+            name (str): Имя процесса во временной шкале.
+        """
+        self.name = name
+        self._events = []  # (участок, начало нс, длительность нс, поток, аргументы)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+
+    def add(self, name, start_ns, duration_ns, args=None):
+        """
+        Записывает завершённый участок.
+        Аргументы:
+            name (str): Название участка.
+            start_ns (int): Начало по time.perf_counter_ns().
+            duration_ns (int): Длительность, нс.
+            args (dict, optional): Дополнительные сведения (путь, страница и т.п.).
+        """
+        with self._lock:
+            self._events.append((name, start_ns - self._origin, duration_ns, threading.get_ident(), args or {}))
+
+    def events(self):
+        """
+        Возвращает копию записанных участков.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def summary(self):
+        """
+        Сводка по участкам.
+        Возвращает:
+            dict: {участок: {'count', 'total_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms'}}.
+        """
+        durations = {}
+        for name, _, duration_ns, _, _ in self.events():
+            durations.setdefault(name, []).append(duration_ns / 1e6)
+        result = {}
+        for name, values in durations.items():
+            values.sort()
+            stats = {
+                'count': len(values),
+                'total_ms': sum(values),
+                'mean_ms': sum(values) / len(values),
+                'max_ms': values[-1],
+            }
+            for p in PERCENTILES:
+                stats[f'p{p}_ms'] = percentile(values, p)
+            result[name] = stats
+        return dict(sorted(result.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+    def to_chrome_trace(self):
+        """
+        Возвращает временную шкалу в формате Chrome Trace Event.
+        Возвращает:
+            dict: Объект с ключами traceEvents и displayTimeUnit.
+        """
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': self.name}}]
+        for name, start_ns, duration_ns, tid, args in self.events():
+            events.append({
+                'name': name,
+                'cat': 'qmanager',
+                'ph': 'X',
+                'ts': start_ns / 1000,
+                'dur': duration_ns / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, directory, prefix='trace'):
+        """
+        Сохраняет временную шкалу (JSON) и сводную таблицу (TXT).
+        Аргументы:
+            directory (str): Папка для файлов.
+            prefix (str): Префикс имени файлов.
+        Возвращает:
+            tuple: (путь к JSON, путь к TXT).
+        """
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(directory, f"{prefix}_{stamp}")
+        trace = self.to_chrome_trace()
+        trace['summary'] = self.summary()
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False)
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(format_summary(trace['summary']) + "\n")
+        return base + '.json', base + '.txt'
+
+def percentile(sorted_values, p):
+    """
+    Перцентиль по методу ближайшего ранга.
+    Аргументы:
+        sorted_values (list): Отсортированные значения.
+        p (float): Перцентиль, 0–100.
+    Возвращает:
+        float: Значение перцентиля.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[min(int(rank), len(sorted_values)) - 1]
+
+def get_tracer():
+    """
+    Возвращает активный трассировщик текущего контекста или None.
+    """
+    return _current_tracer.get()
+
+@contextmanager
+def activate(tracer):
+    """
+    Делает трассировщик активным в текущем контексте (потоке) на время блока.
+    """
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+@contextmanager
+def span(name, **args):
+    """
+    Измеряет участок кода, если трассировка активна.
+    Аргументы:
+        name (str): Название участка.
+        **args: Дополнительные сведения для временной шкалы.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield
+        return
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        tracer.add(name, start, time.perf_counter_ns() - start, args)
+
+def traced(name):
+    """
+    Декоратор: оборачивает вызов функции в span(name).
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _current_tracer.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _trace_directory(output_dir):
+    if output_dir and os.path.isdir(output_dir) and os.access(output_dir, os.W_OK):
+        return output_dir
+    return get_app_data_dir('traces')
+
+@contextmanager
+def trace_job(job_name, output_dir=None, enabled=True, log_callback=None):
+    """
+    Трассирует задачу целиком и по завершении (в том числе с ошибкой) сохраняет результаты
+    рядом с выходными файлами задачи, а если папка недоступна — в %APPDATA%/qManager/traces.
+    Аргументы:
+        job_name (str): Имя задачи (префикс файлов).
+        output_dir (str, optional): Папка результатов задачи.
+        enabled (bool): Включена ли трассировка; при False блок выполняется без измерений.
+        log_callback (callable, optional): Функция для логирования.
+    Возвращает:
+        Tracer | None: Активный трассировщик.
+    """
+    if not enabled:
+        yield None
+        return
+    tracer = Tracer(f"qManager: {job_name}")
+    try:
+        with activate(tracer):
+            yield tracer
+    finally:
+        try:
+            json_path, summary_path = tracer.export(_trace_directory(output_dir), f"trace_{job_name}")
+            if log_callback:
+                log_callback(f"Трассировка сохранена: {json_path}")
+                log_callback(f"Сводка трассировки: {summary_path}")
+        except OSError as e:
+            if log_callback:
+                log_callback(f"Не удалось сохранить трассировку: {e}")
+
+def format_summary(summary):
+    """
+    Форматирует сводку Tracer.summary() в виде текстовой таблицы.
+    """
+    header = f"{'Участок':<28}{'Вызовов':>9}{'Всего, мс':>12}{'Сред., мс':>11}" \
+             + "".join(f"{f'p{p}, мс':>10}" for p in PERCENTILES) + f"{'Макс., мс':>11}"
+    lines = [header, '-' * len(header)]
+    for name, stats in summary.items():
+        lines.append(
+            f"{name:<28}{stats['count']:>9}{stats['total_ms']:>12.1f}{stats['mean_ms']:>11.1f}"
+            + "".join(f"{stats[f'p{p}_ms']:>10.1f}" for p in PERCENTILES)
+            + f"{stats['max_ms']:>11.1f}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    """
+    Печатает сводку по ранее сохранённому файлу трассировки.
+    Использование: python -m src.core_tracing trace_split_20240101_120000.json
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Использование: python -m src.core_tracing <trace.json>")
+        return 2
+    with open(argv[0], 'r', encoding='utf-8') as f:
+        trace = json.load(f)
+    summary = trace.get('summary')
+    if summary is None:
+        tracer = Tracer()
+        for event in trace.get('traceEvents', []):
+            if event.get('ph') == 'X':
+                tracer.add(event['name'], tracer._origin + int(event['ts'] * 1000), int(event['dur'] * 1000))
+        summary = tracer.summary()
+    print(format_summary(summary))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""
+Режим «горячей папки»: отслеживает входные папки, дожидается, пока сканер допишет файл,
+и сразу пропускает каждый новый PDF через выбранные этапы конвейера (core_pipeline).
+
+Новые файлы обнаруживаются уведомлениями файловой системы (пакет watchdog, если установлен)
+и периодическим обходом папок — он же единственный способ без watchdog и страховка
+для сетевых папок, где уведомления теряются. Файл считается дописанным, когда его размер
+и время изменения не меняются stable_seconds и он открывается на чтение.
+Обработанные файлы записываются в файл состояния: после перезапуска они не обрабатываются
+повторно, пока не изменятся. Файл, обработка которого не удалась, повторяется при обходе папок
+с нарастающей задержкой, не более MAX_ATTEMPTS раз.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # без watchdog остаётся только опрос
+    Observer = None
+    FileSystemEventHandler = object
+
+from src.core_cancellation import CancellationToken
+from src.core_journal import atomic_write
+from src.core_settings import get_app_data_dir
+from src.core_pipeline import parse_stages, run_pipeline
+
+DEFAULT_STABLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_WORKERS = 2
+# Полный обход папок при работающих уведомлениях — на случай пропущенных событий
+RESCAN_INTERVAL = 30.0
+# Повтор файлов, обработка которых не удалась: задержка удваивается с каждой попыткой
+RETRY_DELAY = 60.0
+RETRY_MAX_DELAY = 3600.0
+MAX_ATTEMPTS = 5
+STATE_VERSION = 1
+
+def file_signature(path):
+    """
+    Возвращает (размер, время изменения в нс) файла или None, если файла нет.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def is_readable(path):
+    """
+    Проверяет, что файл открывается на чтение (на Windows сканер держит дописываемый файл заблокированным).
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.read(1)
+        return True
+    except OSError:
+        return False
+
+def is_candidate_name(name):
+    """
+    PDF, кроме скрытых и временных файлов (в том числе создаваемых atomic_write).
+    """
+    return name.lower().endswith('.pdf') and not name.startswith(('.', '~'))
+
+class WatchState:
+    def __init__(self, path):
+        """
+        Файл состояния режима наблюдения: какие файлы (с каким размером и временем изменения)
+        уже обработаны и с каким результатом. Сохраняется атомарно после каждой записи.
+        Аргументы:
+            path (str): Путь к JSON-файлу состояния.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._files = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == STATE_VERSION:
+                self._files = data.get('files', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning(f"Файл состояния {path} не прочитан, начинаем заново: {e}")
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def is_handled(self, path, signature, now=None):
+        """
+        Проверяет, обработан ли файл в текущем виде (размер и время изменения совпадают).
+        Неудачно обработанный файл считается обработанным до времени следующей попытки
+        и окончательно — после MAX_ATTEMPTS попыток.
+        Аргументы:
+            path (str): Путь к файлу.
+            signature (tuple): (размер, время изменения в нс).
+            now (float, optional): Текущее время (time.time()).
+        """
+        record = self._files.get(self._key(path))
+        if record is None or (record['size'], record['mtime_ns']) != tuple(signature):
+            return False
+        if record['status'] != 'failed' or record.get('attempts', 1) >= MAX_ATTEMPTS:
+            return True
+        return (time.time() if now is None else now) < record.get('retry_at', 0)
+
+    def get(self, path):
+        return self._files.get(self._key(path))
+
+    def record(self, path, signature, status, **data):
+        """
+        Записывает результат обработки файла и сохраняет состояние на диск.
+        Аргументы:
+            path (str): Путь к входному файлу.
+            signature (tuple): (размер, время изменения в нс) обработанной версии файла.
+            status (str): 'completed' или 'failed'. Для 'failed' записываются номер попытки
+                и время следующей (attempts, retry_at).
+            **data: Дополнительные сведения (итоговая сводка, ошибка).
+        """
+        with self._lock:
+            key = self._key(path)
+            record = {
+                'size': signature[0],
+                'mtime_ns': signature[1],
+                'status': status,
+                'finished_at': datetime.now().isoformat(timespec='seconds'),
+                **data,
+            }
+            if status == 'failed':
+                previous = self._files.get(key)
+                attempts = 1
+                if previous and previous['status'] == 'failed' and \
+                        (previous['size'], previous['mtime_ns']) == tuple(signature):
+                    attempts = previous.get('attempts', 1) + 1
+                record['attempts'] = attempts
+                record['retry_at'] = time.time() + min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** (attempts - 1))
+            self._files[key] = record
+            payload = json.dumps({'version': STATE_VERSION, 'files': self._files},
+                                 ensure_ascii=False, indent=1, default=str)
+            with atomic_write(self.path) as f:
+                f.write(payload.encode('utf-8'))
+
+    def __len__(self):
+        return len(self._files)
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, notify):
+        super().__init__()
+        self._notify = notify
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._notify(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._notify(event.dest_path)
+
+class HotFolderWatcher:
+    def __init__(self, input_dirs, output_dir, excel_path=None, stages='split,rename,organize',
+                 threshold=2.3, ocr_profile=None, workers=DEFAULT_WORKERS,
+                 stable_seconds=DEFAULT_STABLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL,
+                 use_notifications=True, state_path=None, work_root=None, keep_work=False, fused=True,
+                 log_callback=None, result_callback=None):
+        """
+        Наблюдатель за входными папками.
+        Аргументы:
+            input_dirs (list): Папки, куда поступают PDF (без вложенных папок).
+            output_dir (str): Папка итоговых файлов. Если последний этап — разделение,
+                файлы каждого скана кладутся в подпапку с именем скана.
+            excel_path (str | list, optional): Реестр Excel (нужен для переименования и организации):
+                книга, папка книг или список источников.
+            stages (str | iterable): Этапы конвейера подряд, например 'split,rename,organize' или 'rename'.
+            threshold (float): Порог определения зелёных страниц.
+            ocr_profile (dict, optional): Профиль OCR.
+            workers (int): Сколько файлов обрабатывается одновременно.
+            stable_seconds (float): Сколько размер и время изменения файла должны не меняться.
+            poll_interval (float): Интервал проверки кандидатов (и обхода папок без уведомлений), с.
+            use_notifications (bool): Использовать уведомления watchdog, если он установлен.
+            state_path (str, optional): Файл состояния; по умолчанию в %APPDATA%/qManager/watch.
+            work_root (str, optional): Папка промежуточных файлов; по умолчанию рядом с файлом состояния.
+            keep_work (bool): Не удалять промежуточные файлы успешно обработанных сканов.
+            fused (bool): Все три этапа — совмещённо, без промежуточных файлов (см. core_pipeline).
+            log_callback (callable, optional): Функция для логирования.
+            result_callback (callable, optional): Вызывается с (путь, сводка) после обработки файла.
+        Исключения:
+            ValueError: Неверный список этапов или не указан реестр для этапов, которым он нужен.
+        """
+        self.input_dirs = [os.path.abspath(path) for path in input_dirs]
+        self.output_dir = os.path.abspath(output_dir)
+        self.stages = parse_stages(stages)
+        if self.stages != ('split',) and not excel_path:
+            raise ValueError("Для переименования и организации нужен реестр Excel")
+        self.excel_path = excel_path
+        self.threshold = threshold
+        self.ocr_profile = ocr_profile
+        self.workers = max(1, int(workers))
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.use_notifications = use_notifications and Observer is not None
+        self.keep_work = keep_work
+        self.fused = fused
+        self.log_callback = log_callback
+        self.result_callback = result_callback
+
+        watch_id = hashlib.sha1(json.dumps([sorted(self.input_dirs), self.output_dir]).encode('utf-8')).hexdigest()[:16]
+        self.state = WatchState(state_path or os.path.join(get_app_data_dir('watch'), f"state_{watch_id}.json"))
+        self.work_root = work_root or get_app_data_dir('watch', watch_id)
+
+        self.cancel_token = CancellationToken()
+        self._wake = threading.Event()
+        self._events_lock = threading.Lock()
+        self._events = set()
+        # Кандидаты: путь → [подпись, момент начала стабильности, число проверок]
+        self._candidates = {}
+        # Дописанные файлы в порядке обнаружения: путь → подпись
+        self._ready = {}
+        self._in_flight = {}
+        self._skipped = set()
+        self._finished = set()
+        self.counters = {'completed': 0, 'failed': 0, 'cancelled': 0}
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+        else:
+            logging.info(message)
+
+    def stop(self):
+        """
+        Останавливает наблюдение; выполняющиеся задачи отменяются на ближайшей контрольной точке.
+        """
+        self.cancel_token.cancel()
+        self._wake.set()
+
+    def _notify(self, path):
+        if is_candidate_name(os.path.basename(path)):
+            with self._events_lock:
+                self._events.add(os.path.abspath(path))
+            self._wake.set()
+
+    def _consider(self, path, now, signature=None):
+        """
+        Добавляет файл в кандидаты, если он не обработан и не обрабатывается.
+        """
+        if path in self._candidates or path in self._in_flight or path in self._ready:
+            return
+        signature = signature or file_signature(path)
+        if signature is None:
+            return
+        if self.state.is_handled(path, signature, now):
+            if path not in self._finished:
+                self._skipped.add(path)
+            return
+        # Отсчёт стабильности — от последнего изменения файла, но не раньше чем со второй проверки
+        self._candidates[path] = [signature, min(now, signature[1] / 1e9), 1]
+
+    def _scan(self, now):
+        for directory in self.input_dirs:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                self.log(f"Папка недоступна: {directory} ({e})")
+                continue
+            for entry in entries:
+                if is_candidate_name(entry.name) and entry.is_file():
+                    # На Windows scandir уже вернул размер и время изменения — без лишнего запроса к сетевой папке
+                    stat = entry.stat()
+                    self._consider(entry.path, now, (stat.st_size, stat.st_mtime_ns))
+
+    def _check_candidates(self, now):
+        """
+        Переносит дописанные файлы из кандидатов в очередь обработки.
+        """
+        for path, candidate in list(self._candidates.items()):
+            signature = file_signature(path)
+            if signature is None:
+                del self._candidates[path]
+                continue
+            if signature != candidate[0]:
+                self._candidates[path] = [signature, now, 1]
+                continue
+            candidate[2] += 1
+            if (candidate[2] >= 2 and signature[0] > 0 and now - candidate[1] >= self.stable_seconds
+                    and is_readable(path)):
+                del self._candidates[path]
+                self._ready[path] = signature
+
+    def _dispatch(self, pool):
+        while self._ready and len(self._in_flight) < self.workers and not self.cancel_token.cancelled:
+            path = next(iter(self._ready))
+            signature = self._ready.pop(path)
+            future = pool.submit(self._process, path, signature)
+            self._in_flight[path] = future
+            future.add_done_callback(lambda _: self._wake.set())
+
+    def _collect(self):
+        for path, future in list(self._in_flight.items()):
+            if future.done():
+                del self._in_flight[path]
+                self._finished.add(path)
+                self._skipped.discard(path)
+                try:
+                    status = future.result().get('status')
+                except Exception as e:
+                    self.log(f"[{os.path.basename(path)}] Ошибка обработки: {e}")
+                    status = 'failed'
+                self.counters[status if status in self.counters else 'failed'] += 1
+
+    def _process(self, path, signature):
+        """
+        Обрабатывает один файл в собственной рабочей папке и записывает результат в состояние.
+        Возвращает:
+            dict: Сводка конвейера (status, failed_stage, stages) или status 'failed' с error.
+        """
+        name = os.path.basename(path)
+        stem = os.path.splitext(name)[0]
+        job_id = f"{stem}_{hashlib.sha1(f'{path}|{signature}'.encode('utf-8')).hexdigest()[:8]}"
+        work_dir = os.path.join(self.work_root, job_id)
+        output_dir = os.path.join(self.output_dir, stem) if self.stages[-1] == 'split' else self.output_dir
+        log = lambda message: self.log(f"[{name}] {message}")
+        log("Файл дописан, начинаем обработку")
+        started = time.monotonic()
+        try:
+            if self.stages[0] == 'split':
+                source = path
+            else:
+                # Переименование и организация обрабатывают папку — даём им папку с одним файлом
+                source = os.path.join(work_dir, 'input')
+                os.makedirs(source, exist_ok=True)
+                shutil.copy2(path, os.path.join(source, name))
+            summary = run_pipeline(source, output_dir, self.excel_path, work_dir, self.threshold, self.ocr_profile,
+                                   log_callback=log, cancel_token=self.cancel_token, stages=self.stages,
+                                   fused=self.fused)
+        except Exception as e:
+            log(f"Ошибка обработки: {e}")
+            summary = {'status': 'failed', 'error': str(e)}
+        elapsed = round(time.monotonic() - started, 3)
+
+        status = summary.get('status')
+        if status == 'cancelled':
+            # Не записываем: после перезапуска файл будет обработан заново
+            log("Обработка остановлена")
+        elif file_signature(path) != signature:
+            log("Файл изменился во время обработки и будет обработан повторно")
+            summary = {**summary, 'status': 'cancelled'}
+            self._notify(path)
+        else:
+            self.state.record(path, signature, status, elapsed_s=elapsed, output_dir=output_dir,
+                              failed_stage=summary.get('failed_stage'), error=summary.get('error'))
+            if status == 'completed':
+                log(f"Готово за {elapsed:.1f} с")
+                if not self.keep_work:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+            else:
+                record = self.state.get(path)
+                if record['attempts'] < MAX_ATTEMPTS:
+                    retry_in = record['retry_at'] - time.time()
+                    log(f"Обработка не удалась (попытка {record['attempts']} из {MAX_ATTEMPTS}), "
+                        f"повтор не раньше чем через {retry_in:.0f} с; промежуточные файлы сохранены: {work_dir}")
+                else:
+                    log(f"Обработка не удалась после {MAX_ATTEMPTS} попыток, файл пропускается до изменения; "
+                        f"промежуточные файлы сохранены: {work_dir}")
+        if self.result_callback:
+            self.result_callback(path, summary)
+        return summary
+
+    def run(self, once=False):
+        """
+        Наблюдает за папками до вызова stop().
+        Аргументы:
+            once (bool): Обработать файлы, которые уже лежат в папках, и завершиться.
+        Возвращает:
+            dict: Счётчики completed, failed, cancelled и skipped (уже обработанные ранее).
+        """
+        for directory in self.input_dirs:
+            if not os.path.isdir(directory):
+                raise FileNotFoundError(f"Папка не найдена: {directory}")
+        observer = None
+        if self.use_notifications and not once:
+            observer = Observer()
+            handler = _EventHandler(self._notify)
+            for directory in self.input_dirs:
+                observer.schedule(handler, directory, recursive=False)
+            observer.start()
+        self.log(f"Наблюдение за {', '.join(self.input_dirs)}: этапы {' → '.join(self.stages)}, "
+                 f"{'уведомления и опрос' if observer else 'опрос'}, до {self.workers} файлов одновременно; "
+                 f"обработано ранее: {len(self.state)}")
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='watch')
+        next_rescan = 0.0
+        try:
+            while not self.cancel_token.cancelled:
+                now = time.time()
+                if observer is None or now >= next_rescan:
+                    self._scan(now)
+                    next_rescan = now + RESCAN_INTERVAL
+                # Сначала снимаем завершённые задачи: их файлы снова могут стать кандидатами
+                self._collect()
+                with self._events_lock:
+                    events, self._events = self._events, set()
+                for path in events:
+                    self._consider(path, now)
+                self._check_candidates(now)
+                self._dispatch(pool)
+                if once and not (self._candidates or self._ready or self._in_flight):
+                    break
+                # Кандидатов проверяем с интервалом опроса; без них ждём событий или следующего обхода
+                timeout = self.poll_interval if observer is None or self._candidates else next_rescan - now
+                self._wake.wait(max(0.05, timeout))
+                self._wake.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            pool.shutdown(wait=True)
+            self._collect()
+        self.log(f"Наблюдение остановлено: обработано {self.counters['completed']}, "
+                 f"с ошибкой {self.counters['failed']}, прервано {self.counters['cancelled']}")
+        return {**self.counters, 'skipped': len(self._skipped)}
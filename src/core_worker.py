@@ -1,24 +1,132 @@
-from PySide6.QtCore import QThread, Signal
+import threading
+
+from PySide6.QtCore import QThread, QTimer, Signal
 from src.core_settings import SettingsManager
+from src.core_cancellation import CancellationToken, PauseToken
+from src.core_telemetry import JobTelemetry
+from src.core_profiling import profile_job
+
+# Частота доставки прогресса и логов в GUI (~15 кадров в секунду)
+FLUSH_INTERVAL_MS = 66
+
+class EventBatcher:
+    def __init__(self):
+        """
+        Буфер событий потока-работника: прогресс схлопывается до последнего значения,
+        сообщения лога накапливаются до ближайшей доставки.
+        """
+        self._lock = threading.Lock()
+        self._logs = []
+        self._progress = None
+
+    def add_log(self, message):
+        """
+        Добавляет сообщение лога в буфер.
+        Аргументы:
+            message (str): Сообщение.
+        """
+        with self._lock:
+            self._logs.append(message)
+
+    def set_progress(self, current, total):
+        """
+        Запоминает последнее значение прогресса.
+        Аргументы:
+            current (int): Текущее значение.
+            total (int): Общее значение.
+        """
+        with self._lock:
+            self._progress = (current, total)
+
+    def drain(self):
+        """
+        Забирает накопленные события.
+        Возвращает:
+            tuple: (список сообщений, последний прогресс или None).
+        """
+        with self._lock:
+            logs, self._logs = self._logs, []
+            progress, self._progress = self._progress, None
+        return logs, progress
 
 class WorkerThread(QThread):
     progress = Signal(int, int)  # текущий, всего
     finished = Signal()
     error = Signal(str)
-    log = Signal(str)
+    log_batch = Signal(list)  # сообщения, накопленные за кадр
+    result = Signal(object)  # сводка, возвращённая функцией
+    telemetry_updated = Signal(dict)  # снимок JobTelemetry
 
-    def __init__(self, function, *args, **kwargs):
+    def __init__(self, function, *args, profile=None, **kwargs):
         """
         Инициализация потока-работника.
+        Прогресс и логи доставляются в GUI пачками по таймеру FLUSH_INTERVAL_MS,
+        поэтому нагрузка на цикл событий не зависит от скорости работы функции.
         Аргументы:
             function (callable): Функция, которую нужно выполнить в потоке.
             *args: Позиционные аргументы для функции.
+            profile (dict, optional): Параметры профилирования (см. core_profiling.profile_options).
             **kwargs: Именованные аргументы для функции.
         """
         super().__init__()
         self.function = function
         self.args = args
         self.kwargs = kwargs
+        self.profile = profile
+        self.cancel_token = CancellationToken()
+        self.pause_token = PauseToken()
+        self.telemetry = JobTelemetry()
+
+        # Таймер живёт в потоке GUI; финальная доставка подключается первой,
+        # чтобы накопленные сообщения пришли раньше result/error/finished
+        self._batcher = EventBatcher()
+        self._flush_timer = QTimer()
+        self._flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self._flush_timer.timeout.connect(self.flush)
+        self.result.connect(self.flush)
+        self.error.connect(self.flush)
+        self.finished.connect(self._on_finished)
+
+    def start(self, *args, **kwargs):
+        """
+        Запускает поток и таймер доставки событий.
+        """
+        self._flush_timer.start()
+        super().start(*args, **kwargs)
+
+    def flush(self, *_):
+        """
+        Доставляет накопленные сообщения, последний прогресс и снимок телеметрии одним пакетом сигналов.
+        """
+        logs, progress = self._batcher.drain()
+        if logs:
+            self.log_batch.emit(logs)
+        if progress is not None:
+            self.progress.emit(*progress)
+            self.telemetry_updated.emit(self.telemetry.snapshot())
+
+    def _on_finished(self):
+        self.flush()
+        if not self.isRunning():
+            self._flush_timer.stop()
+
+    def cancel(self):
+        """
+        Запрашивает кооперативную остановку: функция завершится на ближайшей контрольной точке.
+        """
+        self.cancel_token.cancel()
+
+    def pause(self):
+        """
+        Приостанавливает выполнение на ближайшей контрольной точке.
+        """
+        self.pause_token.pause()
+
+    def resume(self):
+        """
+        Возобновляет приостановленное выполнение.
+        """
+        self.pause_token.resume()
 
     def run(self):
         """
@@ -28,17 +136,23 @@ class WorkerThread(QThread):
         try:
             # Обработчик логов
             def log_handler(message):
-                self.log.emit(str(message))
+                self._batcher.add_log(str(message))
 
             # Обработчик прогресса
             def progress_handler(current, total):
-                self.progress.emit(current, total)
+                self.telemetry.set_progress(current, total)
+                self._batcher.set_progress(current, total)
 
-            # Добавляем обработчики в kwargs
+            # Добавляем обработчики и токены управления в kwargs
             self.kwargs['log_callback'] = log_handler
             self.kwargs['progress_callback'] = progress_handler
+            self.kwargs['cancel_token'] = self.cancel_token
+            self.kwargs['pause_token'] = self.pause_token
+            self.kwargs['telemetry'] = self.telemetry
 
-            self.function(*self.args, **self.kwargs)
+            with profile_job(self.profile, log_handler):
+                result = self.function(*self.args, **self.kwargs)
+            self.result.emit(result)
             self.finished.emit()
         except Exception as e:
             self.error.emit(str(e))
@@ -6,10 +6,16 @@
 а не напрямую через этот файл.
 """
 import sys
+import time
+import json
 import logging
 import os
 
+# Отсчёт времени запуска — до импорта Qt и окна
+STARTED = time.perf_counter()
+
 from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QTimer
 
 from src.ui_windows_main_window import MainWindow
 
@@ -32,6 +38,15 @@ def main():
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+
+    def on_first_frame():
+        startup_ms = window.report_startup(STARTED)
+        # --measure-startup: вывести время запуска и выйти (для замеров между версиями)
+        if '--measure-startup' in sys.argv:
+            print(json.dumps({'startup_ms': round(startup_ms, 1)}))
+            window.close()
+            app.quit()
+    QTimer.singleShot(0, on_first_frame)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
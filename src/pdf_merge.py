@@ -0,0 +1,218 @@
+"""
+Объединение PDF одного unit.
+Функции модуля выполняются и в дочерних процессах пула объединения (см. pdf_organizer),
+поэтому модуль не импортирует ни pandas, ни Qt: запуск процесса занимает доли секунды.
+
+Потоковое объединение (StreamingPdfMerger) не держит в памяти объединяемые документы целиком,
+в отличие от PdfMerger: входной файл читается по требованию, объекты каждой страницы
+(содержимое, ресурсы, аннотации) сразу переносятся в выходной файл с новыми номерами,
+а после переноса файла его объекты освобождаются. Если разобранных объектов текущего файла
+становится больше бюджета памяти, кэш разобранных объектов сбрасывается.
+"""
+import os
+import time
+from collections import deque
+
+from PyPDF2 import PdfMerger, PdfReader
+from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject,
+                            NumberObject, StreamObject)
+
+from src.core_journal import atomic_write
+from src.core_tracing import span
+
+# Способ объединения: 'streaming' (StreamingPdfMerger) или 'pypdf2' (PdfMerger)
+DEFAULT_ENGINE = 'streaming'
+# Бюджет памяти на разобранные объекты одного входного файла, байт
+DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+# Номера служебных объектов выходного файла
+_CATALOG_ID = 1
+_PAGES_ID = 2
+
+class EncryptedPdfError(Exception):
+    """Входной PDF зашифрован — потоковое объединение его не переносит."""
+
+class StreamingPdfMerger:
+    def __init__(self, stream, memory_budget=DEFAULT_MEMORY_BUDGET):
+        """
+        Потоковое объединение PDF: объекты пишутся в stream по мере переноса страниц.
+        :param stream: Бинарный файловый объект для записи результата
+        :param memory_budget: Бюджет памяти на разобранные объекты одного входного файла, байт
+        """
+        self.stream = stream
+        self.memory_budget = memory_budget
+        # Смещения объектов выходного файла по номеру (0 — свободная запись таблицы xref)
+        self._offsets = [None, None, None]
+        self._kids = []
+        # Сколько раз кэш разобранных объектов сбрасывался из-за бюджета памяти
+        self.cache_resets = 0
+        self._write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.stream.write(data)
+
+    def _allocate(self):
+        self._offsets.append(None)
+        return len(self._offsets) - 1
+
+    def _write_object(self, object_id, obj):
+        self._offsets[object_id] = self.stream.tell()
+        self._write(b"%d 0 obj\n" % object_id)
+        obj.write_to_stream(self.stream, None)
+        self._write(b"\nendobj\n")
+
+    def append(self, path):
+        """
+        Переносит все страницы файла в выходной файл.
+        :param path: Путь к входному PDF
+        :return: int — число перенесённых страниц
+        :raises EncryptedPdfError: Если файл зашифрован (ничего не записывается)
+        """
+        with open(path, 'rb') as source:
+            # Ридер над открытым файлом читает объекты по смещениям, не загружая файл в память
+            reader = PdfReader(source)
+            if reader.is_encrypted:
+                raise EncryptedPdfError(f"Файл зашифрован: {path}")
+            pages = list(reader.pages)
+            # Номера страниц выделяются заранее: ссылки на страницы (аннотации /P, переходы /Dest)
+            # указывают на перенесённые страницы, а не на их копии
+            ids = {}
+            page_ids = []
+            for page in pages:
+                page_id = self._allocate()
+                if page.indirect_reference is not None:
+                    ids[(page.indirect_reference.idnum, page.indirect_reference.generation)] = page_id
+                page_ids.append(page_id)
+            queue = deque()
+            loaded = 0
+
+            def remap(obj):
+                # Копия объекта со ссылками на номера выходного файла; новые ссылки ставятся в очередь
+                if isinstance(obj, IndirectObject):
+                    key = (obj.idnum, obj.generation)
+                    object_id = ids.get(key)
+                    if object_id is None:
+                        object_id = ids[key] = self._allocate()
+                        queue.append((obj, object_id))
+                    return IndirectObject(object_id, 0, None)
+                if isinstance(obj, StreamObject):
+                    copy = obj.__class__()
+                    copy._data = obj._data
+                    copy.update((key, remap(value)) for key, value in obj.items())
+                    return copy
+                if isinstance(obj, DictionaryObject):
+                    return DictionaryObject((key, remap(value)) for key, value in obj.items())
+                if isinstance(obj, ArrayObject):
+                    return ArrayObject(remap(value) for value in obj)
+                return obj
+
+            for page, page_id in zip(pages, page_ids):
+                # Наследуемые атрибуты (/Resources, /MediaBox, ...) уже перенесены в страницу ридером
+                copy = DictionaryObject((key, remap(value)) for key, value in page.items() if key != '/Parent')
+                copy[NameObject('/Parent')] = IndirectObject(_PAGES_ID, 0, None)
+                self._write_object(page_id, copy)
+                self._kids.append(IndirectObject(page_id, 0, None))
+                while queue:
+                    reference, object_id = queue.popleft()
+                    obj = reference.get_object()
+                    if obj is None or (isinstance(obj, DictionaryObject) and obj.get('/Type') == '/Pages'):
+                        # Узлы дерева страниц исходного файла не переносятся
+                        obj = NullObject()
+                    elif isinstance(obj, DictionaryObject) and obj.get('/Type') == '/Page':
+                        obj = DictionaryObject((key, value) for key, value in obj.items() if key != '/Parent')
+                    self._write_object(object_id, remap(obj))
+                    if isinstance(obj, StreamObject):
+                        loaded += len(obj._data or b'')
+                        if loaded > self.memory_budget:
+                            reader.resolved_objects.clear()
+                            self.cache_resets += 1
+                            loaded = 0
+            reader.resolved_objects.clear()
+        return len(pages)
+
+    def finish(self):
+        """
+        Записывает дерево страниц, каталог, таблицу xref и трейлер.
+        """
+        self._write_object(_PAGES_ID, DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(self._kids),
+            NameObject('/Count'): NumberObject(len(self._kids)),
+        }))
+        self._write_object(_CATALOG_ID, DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(_PAGES_ID, 0, None),
+        }))
+        xref_offset = self.stream.tell()
+        self._write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self._offsets))
+        self._write(b"".join(b"%010d 00000 n \n" % offset for offset in self._offsets[1:]))
+        self._write(b"trailer\n")
+        DictionaryObject({
+            NameObject('/Size'): NumberObject(len(self._offsets)),
+            NameObject('/Root'): IndirectObject(_CATALOG_ID, 0, None),
+        }).write_to_stream(self.stream, None)
+        self._write(b"\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+
+def _merge_streaming(file_paths, f, messages, memory_budget):
+    merger = StreamingPdfMerger(f, memory_budget)
+    for file_path in file_paths:
+        with span('StreamingPdfMerger.append', path=file_path):
+            merger.append(file_path)
+        messages.append(f"Файл {os.path.basename(file_path)} добавлен в объединенный PDF")
+    merger.finish()
+
+def merge_unit(file_paths, target_path, engine=None, memory_budget=None):
+    """
+    Объединяет PDF-файлы в target_path в заданном порядке. Запись атомарная: закреплённый
+    за unit пустой файл заменяется готовым только после успешной записи.
+    Если среди файлов есть зашифрованный, unit объединяется через PdfMerger.
+    :param file_paths: Список путей к входным PDF
+    :param target_path: Путь к итоговому файлу (имя уже закреплено в основном процессе)
+    :param engine: 'streaming' или 'pypdf2'; по умолчанию DEFAULT_ENGINE
+    :param memory_budget: Бюджет памяти потокового объединения, байт; по умолчанию DEFAULT_MEMORY_BUDGET
+    :return: dict — messages (сообщения журнала по порядку), input_bytes, nbytes (размер результата),
+        merge_s и write_s (время объединения и записи; при потоковом объединении запись входит в merge_s)
+    """
+    engine = engine or DEFAULT_ENGINE
+    memory_budget = memory_budget or DEFAULT_MEMORY_BUDGET
+    messages = []
+    input_bytes = sum(os.path.getsize(file_path) for file_path in file_paths)
+    started = time.perf_counter()
+    if engine == 'streaming':
+        try:
+            with atomic_write(target_path) as f:
+                _merge_streaming(file_paths, f, messages, memory_budget)
+                nbytes = f.tell()
+            return {
+                'messages': messages,
+                'input_bytes': input_bytes,
+                'nbytes': nbytes,
+                'merge_s': time.perf_counter() - started,
+                'write_s': 0.0,
+            }
+        except EncryptedPdfError as e:
+            messages = [f"{e}; объединение через PdfMerger"]
+            started = time.perf_counter()
+    elif engine != 'pypdf2':
+        raise ValueError(f"Неизвестный способ объединения PDF: {engine}")
+
+    merger = PdfMerger()
+    try:
+        for file_path in file_paths:
+            with span('PdfMerger.append', path=file_path):
+                merger.append(file_path)
+            messages.append(f"Файл {os.path.basename(file_path)} добавлен в объединенный PDF")
+        merged = time.perf_counter()
+        with atomic_write(target_path) as f:
+            with span('PdfMerger.write', files=len(file_paths)):
+                merger.write(f)
+            nbytes = f.tell()
+    finally:
+        merger.close()
+    return {
+        'messages': messages,
+        'input_bytes': input_bytes,
+        'nbytes': nbytes,
+        'merge_s': merged - started,
+        'write_s': time.perf_counter() - merged,
+    }
@@ -0,0 +1,324 @@
+"""
+Бенчмарк настроек OCR для переименования PDF.
+Прогоняет размеченный корпус PDF (область номеров контейнеров на первой странице)
+через матрицу параметров Tesseract (oem, модель, psm, DPI), измеряет задержку
+и точность по каждому файлу и позволяет сохранить самый быстрый профиль,
+удовлетворяющий целевой точности, как активный профиль переименователя.
+
+Прочитанные номера сверяются с разметкой независимо от неё: без реестра — все
+последовательности из 7 и более цифр в тексте OCR, с реестром (--excel) — номера,
+которые нашёл бы переименователь. Ошибочно прочитанные номера и лишние номера
+считаются отдельно; файл распознан верно, только если нет ни пропусков, ни ошибок, ни лишних.
+
+Запуск:
+    python -m src.pdf_ocr_benchmark <папка_корпуса> --psm 6 7 11 --dpi 150 200 300 --save
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+
+from src.pdf_renamer import (
+    DEFAULT_OCR_PROFILE, normalize_ocr_profile, render_first_page,
+    ocr_container_region, extract_container_numbers
+)
+from src.utils_toolchain import get_poppler_path
+from src.core_settings import SettingsManager
+from src.utils_data_manager import DataManager
+
+logger = logging.getLogger(__name__)
+
+# Номер, прочитанный OCR без сверки с реестром (распознаются только цифры)
+_DIGIT_RUN = re.compile(r'\d{7,}')
+# Наибольшее число правок, при котором прочитанный номер считается ошибочным прочтением ожидаемого
+MISREAD_MAX_EDITS = 2
+
+def _containers_from_filename(filename):
+    """
+    Извлекает ожидаемые номера контейнеров из имени файла в формате переименователя.
+    :param filename: str, например "MSCU1234567, TGHU7654321 (2).pdf"
+    :return: list[str]
+    """
+    base_name = os.path.splitext(filename)[0].split(' (')[0]
+    return [c.strip() for c in base_name.split(',') if c.strip()]
+
+def load_corpus(corpus_dir):
+    """
+    Загружает размеченный корпус.
+    Разметка берётся из labels.json ({"файл.pdf": ["MSCU1234567", ...]}) или labels.csv
+    (файл;контейнер1,контейнер2), иначе — из имён файлов.
+    :param corpus_dir: str
+    :return: list[tuple[str, list[str]]] — пары (путь к PDF, ожидаемые контейнеры)
+    """
+    labels = {}
+    json_path = os.path.join(corpus_dir, 'labels.json')
+    csv_path = os.path.join(corpus_dir, 'labels.csv')
+    if os.path.exists(json_path):
+        with open(json_path, 'r', encoding='utf-8') as f:
+            labels = {name: list(containers) for name, containers in json.load(f).items()}
+    elif os.path.exists(csv_path):
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f, delimiter=';'):
+                if len(row) >= 2:
+                    labels[row[0].strip()] = [c.strip() for c in row[1].split(',') if c.strip()]
+
+    corpus = []
+    for filename in sorted(os.listdir(corpus_dir)):
+        if not filename.lower().endswith('.pdf'):
+            continue
+        expected = labels.get(filename) or _containers_from_filename(filename)
+        if expected:
+            corpus.append((os.path.join(corpus_dir, filename), expected))
+    return corpus
+
+def build_profiles(oems, tessdata_dirs, langs, psms, dpis):
+    """
+    Строит матрицу профилей OCR.
+    :return: list[dict]
+    """
+    return [
+        normalize_ocr_profile({'oem': oem, 'tessdata_dir': tessdata_dir, 'lang': lang, 'psm': psm, 'dpi': dpi})
+        for oem, tessdata_dir, lang, psm, dpi in itertools.product(oems, tessdata_dirs, langs, psms, dpis)
+    ]
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def raw_candidates(text):
+    """
+    Номера, прочитанные OCR без сверки с реестром: последовательности из 7 и более цифр
+    в каждой строке текста (пробелы внутри строки убираются).
+    :param text: str
+    :return: list[str]
+    """
+    found = []
+    for line in text.splitlines():
+        for number in _DIGIT_RUN.findall(line.replace(' ', '')):
+            if number not in found:
+                found.append(number)
+    return found
+
+def _edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+def _read_key(number, expected):
+    # Цифровое прочтение сравнивается с последними 7 цифрами контейнера, номер из реестра — целиком
+    if number.isdigit():
+        return ''.join(c for c in expected if c.isdigit())[-7:]
+    return expected.upper()
+
+def score_reads(found, expected):
+    """
+    Сверяет прочитанные номера с разметкой файла.
+    Прочитанный номер без совпадения, отличающийся от непрочитанного ожидаемого
+    не более чем на MISREAD_MAX_EDITS символов, считается ошибочным прочтением, остальные — лишними.
+    :param found: list[str] — номера, прочитанные OCR (цифры) или найденные по реестру (полные номера)
+    :param expected: list[str] — ожидаемые контейнеры
+    :return: dict — matched, missing, misread (пары [прочитано, ожидалось]), extra
+    """
+    missing = list(expected)
+    unmatched = []
+    matched = []
+    for number in found:
+        hit = next((e for e in missing if _read_key(number, e) == number.upper()), None)
+        if hit is None:
+            unmatched.append(number)
+        else:
+            missing.remove(hit)
+            matched.append(hit)
+    misread = []
+    extra = []
+    for number in unmatched:
+        near = [(e, _edit_distance(number.upper(), _read_key(number, e))) for e in missing]
+        near = [item for item in near if item[1] <= MISREAD_MAX_EDITS]
+        if near:
+            closest = min(near, key=lambda item: item[1])[0]
+            missing.remove(closest)
+            misread.append([number, closest])
+        else:
+            extra.append(number)
+    return {'matched': matched, 'missing': missing, 'misread': misread, 'extra': extra}
+
+def run_benchmark(corpus, profiles, poppler_path=None, log_callback=None, container_suffixes=None):
+    """
+    Прогоняет корпус через все профили.
+    Рендеринг страницы выполняется один раз для каждой пары (файл, DPI) и входит в задержку каждого профиля.
+    :param corpus: list[tuple[str, list[str]]]
+    :param profiles: list[dict]
+    :param poppler_path: str | None
+    :param log_callback: callable | None
+    :param container_suffixes: Mapping | None — индекс реестра (DataManager.containers_by_suffix);
+        если не задан, сверяются все цифровые последовательности текста OCR
+    :return: list[dict] — результаты по профилям с задержкой и точностью по каждому файлу
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            logger.info(message)
+
+    if poppler_path is None:
+        poppler_path = get_poppler_path()
+
+    results = [{'profile': profile, 'files': []} for profile in profiles]
+    for pdf_path, expected in corpus:
+        filename = os.path.basename(pdf_path)
+        rendered = {}
+        for result in results:
+            profile = result['profile']
+            dpi = profile['dpi']
+            if dpi not in rendered:
+                start = time.perf_counter()
+                try:
+                    image = render_first_page(pdf_path, poppler_path, dpi)
+                except Exception as e:
+                    log(f"Не удалось отрендерить {filename} при DPI {dpi}: {e}")
+                    image = None
+                rendered[dpi] = (image, time.perf_counter() - start)
+            image, render_time = rendered[dpi]
+
+            found = []
+            ocr_time = 0.0
+            if image is not None:
+                start = time.perf_counter()
+                try:
+                    text = ocr_container_region(image, profile)
+                    if container_suffixes is None:
+                        found = raw_candidates(text)
+                    else:
+                        found = extract_container_numbers(text, container_suffixes=container_suffixes)
+                except Exception as e:
+                    log(f"Ошибка OCR {filename} ({profile}): {e}")
+                ocr_time = time.perf_counter() - start
+            score = score_reads(found, expected)
+            result['files'].append({
+                'file': filename,
+                'expected': expected,
+                'found': found,
+                **score,
+                'match': not (score['missing'] or score['misread'] or score['extra']),
+                'render_s': render_time,
+                'ocr_s': ocr_time,
+                'latency_s': render_time + ocr_time,
+            })
+        log(f"Обработан файл: {filename}")
+
+    for result in results:
+        files = result['files']
+        latencies = [f['latency_s'] for f in files]
+        result['accuracy'] = sum(f['match'] for f in files) / len(files) if files else 0.0
+        result['missing'] = sum(len(f['missing']) for f in files)
+        result['misread'] = sum(len(f['misread']) for f in files)
+        result['extra'] = sum(len(f['extra']) for f in files)
+        result['mean_latency_s'] = sum(latencies) / len(latencies) if latencies else 0.0
+        result['p95_latency_s'] = _percentile(latencies, 0.95)
+    return results
+
+def select_fastest(results, target_accuracy):
+    """
+    Выбирает самый быстрый профиль с точностью не ниже целевой.
+    :param results: list[dict]
+    :param target_accuracy: float, 0..1
+    :return: dict | None
+    """
+    eligible = [r for r in results if r['accuracy'] >= target_accuracy]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda r: r['mean_latency_s'])
+
+def format_report(results):
+    """
+    Формирует текстовую таблицу результатов, отсортированную по средней задержке.
+    Столбцы «пропуск», «ошибка» и «лишние» — число непрочитанных, ошибочно прочитанных и лишних номеров.
+    :param results: list[dict]
+    :return: str
+    """
+    lines = [f"{'oem':>3} {'psm':>3} {'dpi':>4} {'модель':<30} {'точность':>9} {'пропуск':>8} {'ошибка':>7} "
+             f"{'лишние':>7} {'средн., мс':>11} {'p95, мс':>9}"]
+    for r in sorted(results, key=lambda r: r['mean_latency_s']):
+        p = r['profile']
+        model = f"{p['lang']}@{p['tessdata_dir']}" if p['tessdata_dir'] else p['lang']
+        lines.append(
+            f"{p['oem']:>3} {p['psm']:>3} {p['dpi']:>4} {model[-30:]:<30} "
+            f"{r['accuracy']:>9.1%} {r['missing']:>8} {r['misread']:>7} {r['extra']:>7} "
+            f"{r['mean_latency_s'] * 1000:>11.1f} {r['p95_latency_s'] * 1000:>9.1f}"
+        )
+    return "\n".join(lines)
+
+def save_active_profile(profile, settings_manager=None):
+    """
+    Сохраняет профиль OCR как активный профиль переименователя.
+    :param profile: dict
+    :param settings_manager: SettingsManager | None
+    """
+    settings_manager = settings_manager or SettingsManager()
+    settings = settings_manager.load_settings()
+    settings['ocr_profile'] = normalize_ocr_profile(profile)
+    settings_manager.save_settings(settings)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк профилей OCR для переименования PDF")
+    parser.add_argument('corpus', help="Папка с размеченными PDF")
+    parser.add_argument('--oem', type=int, nargs='+', default=[DEFAULT_OCR_PROFILE['oem']])
+    parser.add_argument('--psm', type=int, nargs='+', default=[DEFAULT_OCR_PROFILE['psm']])
+    parser.add_argument('--dpi', type=int, nargs='+', default=[DEFAULT_OCR_PROFILE['dpi']])
+    parser.add_argument('--lang', nargs='+', default=[DEFAULT_OCR_PROFILE['lang']])
+    parser.add_argument('--tessdata-dir', nargs='+', default=[None],
+                        help="Каталоги моделей (например, tessdata, tessdata_fast, tessdata_best)")
+    parser.add_argument('--excel', help="Реестр контейнеров: номера сверяются так же, как при переименовании")
+    parser.add_argument('--target-accuracy', type=float, default=1.0, help="Целевая точность, 0..1")
+    parser.add_argument('--report', help="Путь для сохранения JSON-отчёта")
+    parser.add_argument('--save', action='store_true', help="Сохранить лучший профиль как активный")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        logger.error(f"В папке {args.corpus} нет размеченных PDF")
+        return 1
+
+    container_suffixes = None
+    if args.excel:
+        data_manager = DataManager()
+        data_manager.load_excel_data(args.excel)
+        container_suffixes = data_manager.containers_by_suffix
+        logger.info(f"Реестр загружен: {len(data_manager.latest_container_data)} контейнеров")
+
+    profiles = build_profiles(args.oem, args.tessdata_dir, args.lang, args.psm, args.dpi)
+    logger.info(f"Файлов в корпусе: {len(corpus)}, профилей: {len(profiles)}")
+    results = run_benchmark(corpus, profiles, container_suffixes=container_suffixes)
+    logger.info(format_report(results))
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+        logger.info(f"Отчёт сохранён: {args.report}")
+
+    best = select_fastest(results, args.target_accuracy)
+    if best is None:
+        logger.info(f"Ни один профиль не достиг точности {args.target_accuracy:.1%}")
+        return 2
+    logger.info(f"Лучший профиль: {best['profile']} (точность {best['accuracy']:.1%}, "
+                f"{best['mean_latency_s'] * 1000:.1f} мс/файл)")
+    if args.save:
+        save_active_profile(best['profile'])
+        logger.info("Профиль сохранён как активный для переименования")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,11 +5,19 @@
 import os
 import re
 import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import datetime
-from PyPDF2 import PdfMerger
 
-from src.utils_data_manager import DataManager
-from src.pdf_splitter import get_poppler_path
+from src.utils_data_manager import DataManager, registry_exists, registry_size, registry_key
+from src.utils_filename_registry import FilenameRegistry
+from src.core_journal import JobJournal
+from src.core_cancellation import checkpoint
+from src.core_telemetry import stage
+from src.core_tracing import get_tracer
+from src.core_profiling import is_profiling
+from src.pdf_merge import merge_unit, DEFAULT_ENGINE, DEFAULT_MEMORY_BUDGET
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,34 +26,91 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_unique_filename(base_path, original_name):
+# Процессов для объединения unit; 0 — по числу ядер, 1 — объединение в текущем процессе
+MERGE_WORKERS = 0
+# Меньший объём входных PDF объединяется в текущем процессе: запуск пула дольше самого объединения
+MERGE_PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+# Способ объединения ('streaming' или 'pypdf2') и бюджет памяти потокового объединения (см. pdf_merge)
+MERGE_ENGINE = DEFAULT_ENGINE
+MERGE_MEMORY_BUDGET = DEFAULT_MEMORY_BUDGET
+
+def parse_container_filename(filename):
+    """
+    Извлекает номера контейнеров из имени файла вида «A, B.pdf» или «A (2).pdf».
+    :param filename: Имя файла
+    :return: list — номера контейнеров; первый определяет unit
+    """
+    base_name = filename.split('.')[0]
+    # Удаляем возможные скобки и их содержимое, разделяем по запятой и удаляем пробелы
+    clean_name = base_name.split(' (')[0]
+    return [c.strip() for c in clean_name.split(',')]
+
+def get_unit_key(container_data):
     """
-    Генерирует уникальное имя файла, добавляя номер копии в скобках, если файл уже существует.
-    :param base_path: str
-    :param original_name: str
+    Возвращает ключ unit контейнера: заказ для GRAND-TRADE, иначе коносамент.
+    :param container_data: dict — данные контейнера из DataManager
     :return: str
     """
-    if not os.path.exists(base_path):
-        return original_name
-    
-    name, ext = os.path.splitext(original_name)
-    counter = 2
-    new_name = original_name
-    
-    while os.path.exists(os.path.join(base_path, new_name)):
-        new_name = f"{name} ({counter}){ext}"
-        counter += 1
-    
-    return new_name
+    if container_data["company"] == "GRAND-TRADE":
+        return container_data["order"] or "UNKNOWN_ORDER"
+    return container_data["bill"] or "UNKNOWN_BILL"
+
+def get_unit_folder_name(container_data):
+    """
+    Формирует имя папки «Судно ДД-ММ-ГГГГ» для контейнера.
+    :param container_data: dict — данные контейнера из DataManager
+    :return: str — имя папки без запрещённых символов
+    """
+    vessel_name = container_data["vessel"]
+    arrival_date = container_data["date"]
+    # Оставляем только дату, убираем время, приводим к формату DD-MM-YYYY
+    try:
+        # Попытка распарсить дату
+        date_obj = datetime.strptime(arrival_date.split()[0], "%d-%m-%Y")
+        arrival_date_str = date_obj.strftime("%d-%m-%Y")
+    except Exception:
+        # Если не удалось, просто убираем время и запрещённые символы
+        arrival_date_str = re.sub(r"[\\/:*?<>|\"]", "_", arrival_date.split()[0])
+    folder_name = f"{vessel_name} {arrival_date_str}"
+    return re.sub(r"[\\/:*?<>|\"]", "_", folder_name)
+
+def get_unit_filename(data_manager, unit_value, actual_containers):
+    """
+    Формирует имя объединённого PDF unit. Если в unit есть не все ожидаемые контейнеры,
+    фактические перечисляются в скобках.
+    :param data_manager: DataManager с обработанными данными (process_data)
+    :param unit_value: Ключ unit
+    :param actual_containers: Отсортированный список контейнеров, найденных в файлах unit
+    :return: str
+    """
+    expected_containers = sorted(data_manager.get_containers_by_unit(unit_value))
+    container_data = data_manager.get_container_data(actual_containers[0])
+    company = container_data["company"]
+    if company == "GRAND-TRADE":
+        display_value = container_data["order"]
+    else:
+        display_value = container_data["bill"]
+    if set(actual_containers) == set(expected_containers):
+        return f"{display_value} {company}.pdf"
+    return f"{display_value} {company} ({', '.join(actual_containers)}).pdf"
 
-def organize_pdfs(input_folder, output_folder, excel_path=None, log_callback=None, progress_callback=None):
+def organize_pdfs(input_folder, output_folder, excel_path=None, log_callback=None, progress_callback=None,
+                  cancel_token=None, pause_token=None, telemetry=None, workers=None):
     """
     Организует PDF-файлы по папкам на основе данных из Excel/Google Sheets.
+    Unit объединяются параллельно в пуле процессов; имена файлов, сообщения и прогресс
+    выдаются в порядке unit, как при последовательной обработке.
     :param input_folder: Путь к папке с входными PDF-файлами
     :param output_folder: Путь к папке для сохранения организованных файлов
-    :param excel_path: Путь к Excel-файлу (опционально)
+    :param excel_path: Путь к Excel-файлу, папке книг или список источников (опционально)
     :param log_callback: Функция для логирования сообщений
     :param progress_callback: Функция для отображения прогресса
+    :param cancel_token: Токен отмены (CancellationToken), опционально
+    :param pause_token: Токен паузы (PauseToken), опционально
+    :param telemetry: Телеметрия задачи (JobTelemetry), опционально
+    :param workers: Процессов для объединения; по умолчанию MERGE_WORKERS (0 — по числу ядер)
+    :return: dict — сводка: status ('completed' | 'cancelled'), files_scanned, units_merged, total_units;
+        status 'failed' и error, если не удалось загрузить реестр
     """
     def log(message):
         if log_callback:
@@ -57,20 +122,20 @@ def organize_pdfs(input_folder, output_folder, excel_path=None, log_callback=Non
     data_manager = DataManager()
 
     # Загрузка данных из источников
-    if excel_path and os.path.exists(excel_path):
+    if registry_exists(excel_path):
         log(f"Загрузка данных из Excel: {excel_path}")
         try:
-            data_manager.load_excel_data(excel_path)
+            with stage(telemetry, 'excel', nbytes=registry_size(excel_path)):
+                data_manager.load_excel_data(excel_path)
             log("Данные из Excel успешно загружены")
         except Exception as e:
             log(f"Ошибка при загрузке Excel: {e}")
-            return
+            return {'status': 'failed', 'error': f"Ошибка при загрузке Excel: {e}"}
     else:
         log("Не указан путь к Excel-файлу или файл не найден. Операция прервана.")
-        return
+        return {'status': 'failed', 'error': "Не указан путь к Excel-файлу или файл не найден"}
 
-    # Обработка загруженных данных
-    data_manager.process_data()
+    # Индексы unit строятся при загрузке данных (DataManager.process_data)
     log(f"Обработано {len(data_manager.latest_container_data)} уникальных контейнеров")
 
     # Обработка PDF-файлов
@@ -79,54 +144,27 @@ def organize_pdfs(input_folder, output_folder, excel_path=None, log_callback=Non
     total_files = len(pdf_files)
     
     for index, filename in enumerate(pdf_files, 1):
+        if checkpoint(cancel_token, pause_token):
+            log(f"Операция остановлена: просмотрено файлов {index - 1} из {total_files}")
+            return {'status': 'cancelled', 'files_scanned': index - 1, 'units_merged': 0, 'total_units': 0}
         log(f"Обнаружен файл: {filename}")
         file_path = os.path.join(input_folder, filename)
         
         # Извлекаем номера контейнеров из имени файла
-        base_name = filename.split('.')[0]
-        
-        # Получаем все контейнеры из имени файла
-        if ',' in base_name:
-            # Удаляем возможные скобки и их содержимое
-            clean_name = base_name.split(' (')[0]
-            # Разделяем по запятой и удаляем пробелы
-            all_containers = [c.strip() for c in clean_name.split(',')]
-            first_container = all_containers[0]
-        else:
-            # Если один контейнер
-            clean_name = base_name.split(' (')[0]
-            first_container = clean_name.strip()
-            all_containers = [first_container]
-            
+        all_containers = parse_container_filename(filename)
+        first_container = all_containers[0]
         log(f"Контейнеры в файле {filename}: {all_containers}")
         
         # Проверяем первый контейнер для определения unit
         container_data = data_manager.get_container_data(first_container)
         if container_data:
-            company = container_data["company"]
-            if company == "GRAND-TRADE":
-                unit_value = container_data["order"] or "UNKNOWN_ORDER"
-            else:
-                unit_value = container_data["bill"] or "UNKNOWN_BILL"
-            
+            unit_value = data_manager.get_unit(first_container)
             log(f"Файл {filename} связан с ключом: {unit_value}")
 
             if unit_value not in processed_units:
                 processed_units[unit_value] = []
 
-            vessel_name = container_data["vessel"]
-            arrival_date = container_data["date"]
-            # Оставляем только дату, убираем время, приводим к формату DD-MM-YYYY
-            try:
-                # Попытка распарсить дату
-                date_obj = datetime.strptime(arrival_date.split()[0], "%d-%m-%Y")
-                arrival_date_str = date_obj.strftime("%d-%m-%Y")
-            except Exception:
-                # Если не удалось, просто убираем время и запрещённые символы
-                arrival_date_str = re.sub(r"[\\/:*?<>|\"]", "_", arrival_date.split()[0])
-            folder_name = f"{vessel_name} {arrival_date_str}"
-            folder_name = re.sub(r"[\\/:*?<>|\"]", "_", folder_name)
-            folder_path = os.path.join(output_folder, folder_name)
+            folder_path = os.path.join(output_folder, get_unit_folder_name(container_data))
             if not os.path.exists(folder_path):
                 os.makedirs(folder_path)
                 log(f"Создана папка: {folder_path}")
@@ -139,59 +177,155 @@ def organize_pdfs(input_folder, output_folder, excel_path=None, log_callback=Non
 
     # Создание объединённых PDF
     total_units = len(processed_units)
+    journal = JobJournal('organize', {
+        'input_folder': os.path.abspath(input_folder),
+        'output_folder': os.path.abspath(output_folder),
+        'excel_path': registry_key(excel_path),
+    })
+    if journal.resumed:
+        log(f"Продолжение прерванной задачи: уже объединено {len(journal.entries('merged'))} unit")
+    filename_registry = FilenameRegistry(journal)
+
+    merge_plan = []
     for unit_index, (unit_value, files_info) in enumerate(processed_units.items(), 1):
         folders = {}
         for file_path, folder_path, containers in files_info:
             if folder_path not in folders:
                 folders[folder_path] = []
             folders[folder_path].append((file_path, containers))
-        
         for folder_path, files_data in folders.items():
-            # Собираем все контейнеры из файлов
-            actual_containers = []
-            for _, containers in files_data:
-                actual_containers.extend(containers)
-            actual_containers = sorted(list(set(actual_containers)))
-            
-            # Получаем все ожидаемые контейнеры для данного unit
-            expected_containers = sorted(data_manager.get_containers_by_unit(unit_value))
-
-            # Логируем для проверки
-            log(f"Обработка unit: {unit_value}")
-            log(f"Ожидаемые контейнеры: {expected_containers}")
-            log(f"Фактические контейнеры: {actual_containers}")
-            
-            # Получаем данные для формирования имени файла
-            if actual_containers:
-                container_data = data_manager.get_container_data(actual_containers[0])
-                company = container_data["company"]
-                if company == "GRAND-TRADE":
-                    display_value = container_data["order"]
-                else:
-                    display_value = container_data["bill"]
-            else:
+            merge_plan.append((unit_index, unit_value, folder_path, files_data))
+
+    workers = MERGE_WORKERS if workers is None else workers
+    workers = max(1, min(workers or os.cpu_count() or 1, len(merge_plan)))
+    if workers > 1 and (get_tracer() is not None or is_profiling()):
+        # Спаны и профиль дочерних процессов не попадают в отчёт задачи — объединяем в её потоке
+        log("Трассировка или профилирование включены: объединение unit в текущем процессе")
+        workers = 1
+    if workers > 1:
+        input_bytes = sum(os.path.getsize(file_path)
+                          for _, _, _, files_data in merge_plan for file_path, _ in files_data)
+        if input_bytes < MERGE_PARALLEL_MIN_BYTES:
+            workers = 1
+    # spawn: дочерние процессы не наследуют потоки и блокировки интерфейса
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn')) \
+        if workers > 1 else None
+    if executor is not None:
+        log(f"Объединение unit в {workers} процессах")
+
+    def submit(*args):
+        # Настройки модуля передаются явно: дочерние процессы их не наследуют
+        args += (MERGE_ENGINE, MERGE_MEMORY_BUDGET)
+        if executor is not None:
+            return executor.submit(merge_unit, *args)
+        future = Future()
+        try:
+            future.set_result(merge_unit(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def prepare(unit_index, unit_value, folder_path, files_data):
+        """
+        Готовит объединение: имя файла закрепляется здесь, в порядке unit, поэтому имена
+        не зависят от того, какой процесс закончит раньше. Сообщения копятся и выводятся по порядку.
+        """
+        entry = {'unit_index': unit_index, 'unit_value': unit_value, 'folder_path': folder_path,
+                 'files_data': files_data, 'future': None, 'progress': True}
+        merge_key = f"{unit_value}|{folder_path}"
+        if journal.is_done('merged', merge_key):
+            entry['messages'] = [f"Unit {unit_value} уже объединён: {journal.get('merged', merge_key)['name']}"]
+            return entry
+
+        # Собираем все контейнеры из файлов
+        actual_containers = []
+        for _, containers in files_data:
+            actual_containers.extend(containers)
+        actual_containers = sorted(list(set(actual_containers)))
+
+        # Логируем для проверки
+        entry['messages'] = [
+            f"Обработка unit: {unit_value}",
+            f"Ожидаемые контейнеры: {sorted(data_manager.get_containers_by_unit(unit_value))}",
+            f"Фактические контейнеры: {actual_containers}",
+        ]
+        if not actual_containers:
+            entry['progress'] = False
+            return entry
+        new_name = filename_registry.reserve(
+            folder_path, get_unit_filename(data_manager, unit_value, actual_containers))
+        entry.update(merge_key=merge_key, name=new_name, future=submit(
+            [file_path for file_path, _ in files_data], os.path.join(folder_path, new_name)))
+        return entry
+
+    # Окно заданий ограничено: в очереди пула не больше двух unit на процесс
+    window = workers * 2 if executor is not None else 1
+    pending = deque()
+    next_item = 0
+    units_merged = 0
+    units_done = 0
+    stopped = False
+    error = None
+    try:
+        while pending or (next_item < len(merge_plan) and not stopped and error is None):
+            while next_item < len(merge_plan) and len(pending) < window and not stopped and error is None:
+                if checkpoint(cancel_token, pause_token):
+                    stopped = True
+                    # Ещё не начатые объединения отменяются, начатые дописываются и учитываются
+                    for queued in pending:
+                        if queued['future'] is not None:
+                            queued['future'].cancel()
+                    break
+                pending.append(prepare(*merge_plan[next_item]))
+                next_item += 1
+            if not pending:
+                break
+
+            entry = pending.popleft()
+            future = entry['future']
+            if future is not None and future.cancelled():
+                filename_registry.release(entry['folder_path'], entry['name'])
                 continue
-            
-            # Формируем имя файла
-            if set(actual_containers) == set(expected_containers):
-                new_name = f"{display_value} {company}.pdf"
-            else:
-                new_name = f"{display_value} {company} ({', '.join(actual_containers)}).pdf"
-
-            new_name = get_unique_filename(folder_path, new_name)
-            new_path = os.path.join(folder_path, new_name)
-            
-            # Создаем объединенный PDF
-            merger = PdfMerger()
-            for file_path, _ in files_data:
-                merger.append(file_path)
-                log(f"Файл {os.path.basename(file_path)} добавлен в объединенный PDF")
-
-            merger.write(new_path)
-            merger.close()
-            log(f"Создан файл: {new_name}")
-            
-            if progress_callback:
-                progress_callback(unit_index, total_units)
-
-    log("Обработка завершена.")
\ No newline at end of file
+            for message in entry['messages']:
+                log(message)
+            if future is not None:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    filename_registry.release(entry['folder_path'], entry['name'])
+                    if error is None:
+                        error = e
+                        for queued in pending:
+                            if queued['future'] is not None:
+                                queued['future'].cancel()
+                    continue
+            units_done = entry['unit_index']
+            if future is not None:
+                for message in result['messages']:
+                    log(message)
+                if telemetry is not None:
+                    telemetry.add('merge', len(entry['files_data']), result['input_bytes'], result['merge_s'])
+                    telemetry.add('write', 1, result['nbytes'], result['write_s'])
+                filename_registry.commit(entry['folder_path'], entry['name'])
+                journal.record('merged', entry['merge_key'], name=entry['name'])
+                units_merged += 1
+                log(f"Создан файл: {entry['name']}")
+            if entry['progress'] and progress_callback:
+                progress_callback(entry['unit_index'], total_units)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        # Журнал сохраняется для возобновления; после успешного завершения его удаляет finish()
+        journal.close()
+
+    if error is not None:
+        raise error
+    if stopped:
+        log(f"Операция остановлена: обработано unit {units_done} из {total_units}")
+        return {'status': 'cancelled', 'files_scanned': total_files, 'units_merged': units_merged,
+                'total_units': total_units}
+
+    journal.finish()
+    log("Обработка завершена.")
+    return {'status': 'completed', 'files_scanned': total_files, 'units_merged': units_merged,
+            'total_units': total_units}
@@ -0,0 +1,229 @@
+"""
+Совмещённая обработка скана: разделение, распознавание и организация за один проход без промежуточных файлов.
+Скан разбирается один раз; первая страница каждого документа распознаётся из того же изображения,
+по которому определялся цвет страницы; страницы документов сразу собираются в итоговые PDF unit,
+и каждый итоговый файл записывается один раз.
+"""
+import os
+import logging
+from PyPDF2 import PdfReader, PdfWriter
+
+from src.utils_data_manager import DataManager, registry_exists, registry_size, registry_key
+from src.utils_filename_registry import FilenameRegistry
+from src.utils_toolchain import get_poppler_path
+from src.pdf_splitter import extract_page_as_image, get_average_color_rgb, is_greenish_hue
+from src.pdf_renamer import (ensure_tesseract, normalize_ocr_profile, get_ocr_config, ocr_container_region,
+                             extract_container_numbers)
+from src.pdf_organizer import get_unit_folder_name, get_unit_filename
+from src.core_journal import JobJournal
+from src.core_cancellation import checkpoint
+from src.core_telemetry import stage
+from src.core_tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Подпапка для документов, номера контейнеров которых не распознаны
+UNMATCHED_FOLDER = "Не распознано"
+
+class Segment:
+    def __init__(self, index, first_page, text):
+        """
+        Документ скана: страницы от листа-разделителя до следующего разделителя.
+        :param index: int — номер документа (с 1, как output_N.pdf при разделении)
+        :param first_page: int — номер первой страницы (с 0)
+        :param text: str | None — распознанный текст области номеров контейнеров
+        """
+        self.index = index
+        self.pages = [first_page]
+        self.text = text
+        self.containers = []
+
+    @property
+    def name(self):
+        return f"output_{self.index}.pdf"
+
+def process_scan(input_pdf, output_folder, excel_path=None, threshold=2.3, ocr_profile=None, log_callback=None,
+                 progress_callback=None, cancel_token=None, pause_token=None, telemetry=None):
+    """
+    Разделяет скан по зелёным страницам, распознаёт номера контейнеров и раскладывает документы
+    по unit и папкам так же, как последовательные разделение, переименование и организация.
+    Документы без распознанных контейнеров сохраняются в подпапку UNMATCHED_FOLDER.
+    :param input_pdf: Путь к многостраничному скану
+    :param output_folder: Папка итоговых файлов
+    :param excel_path: Путь к реестру Excel, папке книг или список источников
+    :param threshold: Порог определения зелёных страниц
+    :param ocr_profile: Профиль OCR (см. pdf_renamer.DEFAULT_OCR_PROFILE), опционально
+    :param log_callback: Функция для логирования сообщений
+    :param progress_callback: Функция для отображения прогресса
+    :param cancel_token: Токен отмены (CancellationToken), опционально
+    :param pause_token: Токен паузы (PauseToken), опционально
+    :param telemetry: Телеметрия задачи (JobTelemetry), опционально
+    :return: dict — сводка: status ('completed' | 'cancelled'), total_pages, segments, units_merged,
+        total_units, unmatched; status 'failed' и error, если не удалось загрузить реестр или найти Tesseract
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+        else:
+            logger.info(message)
+
+    try:
+        ensure_tesseract()
+    except RuntimeError as e:
+        log(f"Ошибка инициализации Tesseract: {e}")
+        return {'status': 'failed', 'error': f"Ошибка инициализации Tesseract: {e}"}
+    poppler_path = get_poppler_path()
+    ocr_profile = normalize_ocr_profile(ocr_profile)
+    log(f"Профиль OCR: {get_ocr_config(ocr_profile)}, DPI {ocr_profile['dpi']}")
+
+    data_manager = DataManager()
+    if registry_exists(excel_path):
+        log(f"Загрузка данных из Excel: {excel_path}")
+        try:
+            with stage(telemetry, 'excel', nbytes=registry_size(excel_path)):
+                data_manager.load_excel_data(excel_path)
+            log("Данные из Excel успешно загружены")
+        except Exception as e:
+            log(f"Ошибка при загрузке Excel: {e}")
+            return {'status': 'failed', 'error': f"Ошибка при загрузке Excel: {e}"}
+    else:
+        log("Не указан путь к Excel-файлу или файл не найден. Операция прервана.")
+        return {'status': 'failed', 'error': "Не указан путь к Excel-файлу или файл не найден"}
+    container_suffixes = data_manager.containers_by_suffix
+    log(f"Загружено {len(data_manager.latest_container_data)} валидных контейнеров")
+
+    os.makedirs(output_folder, exist_ok=True)
+    with span('PdfReader', path=input_pdf):
+        reader = PdfReader(input_pdf)
+    total_pages = len(reader.pages)
+
+    stat = os.stat(input_pdf)
+    journal = JobJournal('pipeline', {
+        'input_pdf': os.path.abspath(input_pdf),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'output_folder': os.path.abspath(output_folder),
+        'excel_path': registry_key(excel_path),
+        'threshold': threshold,
+        'ocr_profile': ocr_profile,
+    })
+    try:
+        if journal.resumed:
+            log(f"Продолжение прерванной задачи: страниц проанализировано {len(journal.entries('page'))} из {total_pages}")
+
+        if progress_callback:
+            progress_callback(0, total_pages)
+
+        # Анализ страниц: цвет каждой страницы и OCR первой страницы документа по одному изображению
+        log("Анализ страниц...")
+        segments = []
+        for i in range(total_pages):
+            if checkpoint(cancel_token, pause_token):
+                log(f"Операция остановлена: проанализировано страниц {i} из {total_pages}")
+                return {'status': 'cancelled', 'total_pages': total_pages, 'segments': len(segments),
+                        'units_merged': 0, 'total_units': 0, 'unmatched': []}
+
+            if progress_callback:
+                progress_callback(i + 1, total_pages)
+
+            done = journal.get('page', i)
+            if done is None:
+                with stage(telemetry, 'render', unit='стр.'):
+                    image = extract_page_as_image(input_pdf, i, poppler_path, ocr_profile['dpi'])
+                if image is None:
+                    log(f"Не удалось обработать страницу {i+1}")
+                    journal.record('page', i, green=False, ok=False, text=None)
+                    continue
+                is_green = bool(is_greenish_hue(get_average_color_rgb(image), threshold))
+                text = None
+                if is_green or not segments:
+                    try:
+                        with stage(telemetry, 'ocr'):
+                            text = ocr_container_region(image, ocr_profile)
+                    except Exception as e:
+                        log(f"Ошибка распознавания страницы {i+1}: {e}")
+                del image
+                done = {'green': is_green, 'ok': True, 'text': text}
+                journal.record('page', i, **done)
+                log(f"Страница {i+1}: {'зеленая' if is_green else 'обычная'}")
+            if not done['ok']:
+                continue
+            if done['green'] or not segments:
+                segments.append(Segment(len(segments) + 1, i, done['text']))
+            else:
+                segments[-1].pages.append(i)
+
+        # Распределение документов по unit и папкам (как в организации по именам файлов)
+        units = {}
+        unmatched = []
+        for segment in segments:
+            if segment.text and segment.text.strip():
+                segment.containers = extract_container_numbers(segment.text, container_suffixes=container_suffixes)
+            if not segment.containers:
+                log(f"Документ {segment.name} (страницы {segment.pages[0] + 1}–{segment.pages[-1] + 1}): "
+                    f"номера контейнеров не распознаны")
+                unmatched.append(segment)
+                continue
+            container_data = data_manager.get_container_data(segment.containers[0])
+            unit_value = data_manager.get_unit(segment.containers[0])
+            folder_path = os.path.join(output_folder, get_unit_folder_name(container_data))
+            log(f"Документ {segment.name}: контейнеры {segment.containers}, ключ {unit_value}")
+            units.setdefault((unit_value, folder_path), []).append(segment)
+
+        # Запись итоговых файлов: страницы берутся из уже разобранного скана
+        filename_registry = FilenameRegistry(journal)
+        outputs = [(unit_value, folder_path, unit_segments) for (unit_value, folder_path), unit_segments in units.items()]
+        outputs += [(None, os.path.join(output_folder, UNMATCHED_FOLDER), [segment]) for segment in unmatched]
+        total_units = len({unit_value for unit_value, _ in units})
+        units_merged = 0
+        log("Создание файлов...")
+        for output_index, (unit_value, folder_path, unit_segments) in enumerate(outputs, 1):
+            if checkpoint(cancel_token, pause_token):
+                log(f"Операция остановлена: создано файлов {output_index - 1} из {len(outputs)}")
+                return {'status': 'cancelled', 'total_pages': total_pages, 'segments': len(segments),
+                        'units_merged': units_merged, 'total_units': total_units,
+                        'unmatched': [segment.name for segment in unmatched]}
+            if unit_value is None:
+                merge_key = f"unmatched|{unit_segments[0].index}"
+                new_name = unit_segments[0].name
+            else:
+                merge_key = f"{unit_value}|{folder_path}"
+                actual_containers = sorted({c for segment in unit_segments for c in segment.containers})
+                new_name = get_unit_filename(data_manager, unit_value, actual_containers)
+                log(f"Обработка unit: {unit_value}")
+                log(f"Ожидаемые контейнеры: {sorted(data_manager.get_containers_by_unit(unit_value))}")
+                log(f"Фактические контейнеры: {actual_containers}")
+            if journal.is_done('merged', merge_key):
+                log(f"Файл уже создан: {journal.get('merged', merge_key)['name']}")
+            else:
+                if not os.path.exists(folder_path):
+                    os.makedirs(folder_path)
+                    log(f"Создана папка: {folder_path}")
+                writer = PdfWriter()
+                pages = [page for segment in unit_segments for page in segment.pages]
+                for page_num in pages:
+                    writer.add_page(reader.pages[page_num])
+                with stage(telemetry, 'write', units=len(unit_segments)) as counters, \
+                        filename_registry.write_atomic(folder_path, new_name) as (new_name, f):
+                    with span('PdfWriter.write', pages=len(pages)):
+                        writer.write(f)
+                    counters['nbytes'] = f.tell()
+                journal.record('merged', merge_key, name=new_name)
+                log(f"Создан файл: {os.path.join(folder_path, new_name)}")
+            if unit_value is not None:
+                units_merged += 1
+            if progress_callback:
+                progress_callback(output_index, len(outputs))
+
+        journal.finish()
+        if unmatched:
+            log(f"Не распознано документов: {len(unmatched)} из {len(segments)} "
+                f"(сохранены в папку «{UNMATCHED_FOLDER}»)")
+        log("Обработка завершена.")
+        return {'status': 'completed', 'total_pages': total_pages, 'segments': len(segments),
+                'units_merged': units_merged, 'total_units': total_units,
+                'unmatched': [segment.name for segment in unmatched]}
+    finally:
+        # Журнал сохраняется для возобновления (в том числе после ошибки записи);
+        # после успешного завершения его удаляет finish()
+        journal.close()
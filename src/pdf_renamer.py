@@ -2,14 +2,17 @@
 Модуль для переименования PDF файлов на основе извлеченного текста.
 """
 import os
-import sys
-import shutil
 import logging
 import pytesseract
 from pdf2image import convert_from_path
 from pytesseract import image_to_string
-from src.utils_data_manager import DataManager
-from src.pdf_splitter import get_poppler_path
+from src.utils_data_manager import DataManager, registry_exists, registry_size, registry_key
+from src.utils_toolchain import get_poppler_path, get_tesseract_path
+from src.utils_filename_registry import FilenameRegistry
+from src.core_journal import JobJournal
+from src.core_cancellation import checkpoint
+from src.core_telemetry import stage
+from src.core_tracing import span
 
 # Настройка логирования
 logging.basicConfig(
@@ -18,88 +21,124 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def check_tesseract_dependencies():
+def ensure_tesseract():
     """
-    Проверяет наличие всех необходимых DLL для Tesseract в нескольких местах и выводит путь для отладки.
+    Находит Tesseract (поиск кэшируется в utils_toolchain) и настраивает pytesseract.
     Возвращает:
-        str: Путь к tesseract.exe, если найден.
+        str: Путь к исполняемому файлу Tesseract.
     Исключения:
-        RuntimeError: Если не найдены необходимые файлы или языковые данные.
-    """
-    candidates = []
-    # 1. vendor/Tesseract-OCR относительно src
-    base_dir_src = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'vendor', 'Tesseract-OCR'))
-    candidates.append(base_dir_src)
-    # 2. vendor/Tesseract-OCR относительно корня проекта
-    base_dir_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'vendor', 'Tesseract-OCR'))
-    candidates.append(base_dir_root)
-    # 3. frozen exe
-    if getattr(sys, 'frozen', False):
-        exe_dir = os.path.dirname(sys.executable)
-        candidates.append(os.path.join(exe_dir, 'Tesseract-OCR'))
-    # 4. В системном PATH    if shutil.which('tesseract') or shutil.which('tesseract.exe'):
-        return shutil.which('tesseract')# Проверяем кандидатов
-    for tesseract_dir in candidates:
-        if os.path.exists(tesseract_dir) and os.path.isfile(os.path.join(tesseract_dir, 'tesseract.exe')):
-            # Добавляем путь к Tesseract в PATH
-            if tesseract_dir not in os.environ['PATH']:
-                os.environ['PATH'] = tesseract_dir + os.pathsep + os.environ['PATH']
-            # Проверяем наличие необходимых файлов
-            required_files = [
-                'tesseract.exe',
-                'libtesseract-5.dll',
-                'libpng16-16.dll',
-                'zlib1.dll',
-                'libleptonica-6.dll'
-            ]
-            missing_files = [file for file in required_files if not os.path.exists(os.path.join(tesseract_dir, file))]
-            if missing_files:
-                raise RuntimeError(f"Отсутствуют необходимые файлы Tesseract: {', '.join(missing_files)}")
-            tessdata_dir = os.path.join(tesseract_dir, 'tessdata')
-            if not os.path.exists(os.path.join(tessdata_dir, 'eng.traineddata')):
-                raise RuntimeError("Отсутствуют языковые данные для английского языка")
-            return tesseract_dir
-    raise RuntimeError('Tesseract не найден! Проверьте, что он установлен в vendor/Tesseract-OCR или добавлен в PATH.')
-
-# Инициализация Tesseract
-try:
-    TESSERACT_PATH = check_tesseract_dependencies()
-    pytesseract.tesseract_cmd = os.path.join(TESSERACT_PATH, 'tesseract.exe')
-except Exception as e:
-    logging.error(f"Ошибка инициализации Tesseract: {e}")
-    sys.exit(1)
-
-def extract_text_from_first_page(pdf_path, poppler_path=None):
+        RuntimeError: Если Tesseract не найден.
     """
-    Извлекает текст из фиксированной области первой страницы PDF (строго по координатам).
+    path = get_tesseract_path()
+    pytesseract.pytesseract.tesseract_cmd = path
+    return path
+
+# Область первой страницы с номерами контейнеров (в пикселях при CROP_DPI)
+CROP_BOX = (0, 700, 1600, 1000)
+CROP_DPI = 200
+
+# Профиль OCR по умолчанию; активный профиль хранится в настройках ('ocr_profile')
+DEFAULT_OCR_PROFILE = {
+    'oem': 3,
+    'psm': 6,
+    'dpi': 200,
+    'lang': 'eng',
+    'tessdata_dir': None,
+}
+
+def normalize_ocr_profile(profile=None):
+    """
+    Дополняет профиль OCR значениями по умолчанию.
+    Аргументы:
+        profile (dict, optional): Частичный профиль (oem, psm, dpi, lang, tessdata_dir).
+    Возвращает:
+        dict: Полный профиль OCR.
+    """
+    normalized = dict(DEFAULT_OCR_PROFILE)
+    if profile:
+        normalized.update({k: v for k, v in profile.items() if k in DEFAULT_OCR_PROFILE and v is not None})
+    normalized['oem'] = int(normalized['oem'])
+    normalized['psm'] = int(normalized['psm'])
+    normalized['dpi'] = int(normalized['dpi'])
+    return normalized
+
+def get_ocr_config(profile=None):
+    """
+    Формирует строку параметров Tesseract для профиля OCR.
+    Аргументы:
+        profile (dict, optional): Профиль OCR.
+    Возвращает:
+        str: Параметры командной строки Tesseract.
+    """
+    profile = normalize_ocr_profile(profile)
+    config = f"--oem {profile['oem']} --psm {profile['psm']}"
+    if profile['tessdata_dir']:
+        config += f' --tessdata-dir "{profile["tessdata_dir"]}"'
+    return config + " -c tessedit_char_whitelist=0123456789"
+
+def render_first_page(pdf_path, poppler_path=None, dpi=CROP_DPI):
+    """
+    Рендерит первую страницу PDF в изображение.
     Аргументы:
         pdf_path (str): Путь к PDF-файлу.
         poppler_path (str, optional): Путь к Poppler, если требуется.
+        dpi (int): Разрешение рендеринга.
     Возвращает:
-        str или None: Извлечённый текст или None при ошибке.
+        PIL.Image: Изображение первой страницы.
     Исключения:
         FileNotFoundError: Если PDF не найден.
         RuntimeError: Если не удалось получить изображение из PDF.
     """
-    try:
-        if poppler_path is None:
-            poppler_path = get_poppler_path()
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF файл не найден: {pdf_path}")
+    if poppler_path is None:
+        poppler_path = get_poppler_path()
+    if not os.path.exists(pdf_path):
+        raise FileNotFoundError(f"PDF файл не найден: {pdf_path}")
+    with span('convert_from_path', path=pdf_path, dpi=dpi):
         images = convert_from_path(
             pdf_path,
+            dpi=dpi,
             first_page=1,
             last_page=1,
             poppler_path=poppler_path
         )
-        if not images:
-            raise RuntimeError("Не удалось получить изображение из PDF")
-        image = images[0]
-        # Фиксированная область, как в вашей рабочей версии
-        left, top, right, bottom = 0, 700, 1600, 1000
-        cropped_image = image.crop((left, top, right, bottom))
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789'
-        text = image_to_string(cropped_image, lang="eng", config=custom_config)
+    if not images:
+        raise RuntimeError("Не удалось получить изображение из PDF")
+    return images[0]
+
+def ocr_container_region(image, profile=None):
+    """
+    Распознаёт цифры в области номеров контейнеров (координаты масштабируются под DPI профиля).
+    Аргументы:
+        image (PIL.Image): Изображение первой страницы, отрендеренное с DPI профиля.
+        profile (dict, optional): Профиль OCR.
+    Возвращает:
+        str: Распознанный текст.
+    """
+    ensure_tesseract()
+    profile = normalize_ocr_profile(profile)
+    scale = profile['dpi'] / CROP_DPI
+    box = tuple(round(coord * scale) for coord in CROP_BOX)
+    cropped_image = image.crop(box)
+    with span('image_to_string', psm=profile['psm'], oem=profile['oem']):
+        return image_to_string(cropped_image, lang=profile['lang'], config=get_ocr_config(profile))
+
+def extract_text_from_first_page(pdf_path, poppler_path=None, ocr_profile=None, telemetry=None):
+    """
+    Извлекает текст из фиксированной области первой страницы PDF (строго по координатам).
+    Аргументы:
+        pdf_path (str): Путь к PDF-файлу.
+        poppler_path (str, optional): Путь к Poppler, если требуется.
+        ocr_profile (dict, optional): Профиль OCR; по умолчанию DEFAULT_OCR_PROFILE.
+        telemetry (JobTelemetry, optional): Телеметрия задачи.
+    Возвращает:
+        str или None: Извлечённый текст или None при ошибке.
+    """
+    try:
+        profile = normalize_ocr_profile(ocr_profile)
+        with stage(telemetry, 'render', unit='стр.'):
+            image = render_first_page(pdf_path, poppler_path, profile['dpi'])
+        with stage(telemetry, 'ocr'):
+            text = ocr_container_region(image, profile)
         if not text.strip():
             logging.warning(f"Не удалось извлечь текст из {pdf_path}")
             return None
@@ -111,12 +150,14 @@ def extract_text_from_first_page(pdf_path, poppler_path=None):
         logging.error(f"Ошибка при обработке файла {pdf_path}: ({error_code}, '{str(e)}')")
         return None
 
-def extract_container_numbers(text, valid_containers):
+def extract_container_numbers(text, valid_containers=(), container_suffixes=None):
     """
     Ищет номера контейнеров в тексте.
     Аргументы:
         text (str): Текст для поиска.
-        valid_containers (list): Список валидных номеров контейнеров.
+        valid_containers (list): Список валидных номеров контейнеров (если не задан container_suffixes).
+        container_suffixes (Mapping, optional): Готовый индекс «последние 7 символов → контейнеры»
+            (DataManager.containers_by_suffix); если не задан, строится по valid_containers.
     Возвращает:
         list: Список найденных номеров контейнеров.
     """
@@ -124,17 +165,18 @@ def extract_container_numbers(text, valid_containers):
         text = text.replace(" ", "").replace("\n", "")
         found_containers = []
         
-        container_suffixes = {}
-        for container in valid_containers:
-            suffix = container[-7:]
-            if suffix not in container_suffixes:
-                container_suffixes[suffix] = []
-            container_suffixes[suffix].append(container)
+        if container_suffixes is None:
+            container_suffixes = {}
+            for container in valid_containers:
+                suffix = container[-7:]
+                if suffix not in container_suffixes:
+                    container_suffixes[suffix] = []
+                container_suffixes[suffix].append(container)
         
         for i in range(len(text) - 6):
             possible_suffix = text[i:i+7]
-            if possible_suffix.isdigit() and possible_suffix in container_suffixes:
-                for container in container_suffixes[possible_suffix]:
+            if possible_suffix.isdigit():
+                for container in container_suffixes.get(possible_suffix, ()):
                     if container not in found_containers:
                         found_containers.append(container)
     
@@ -143,82 +185,111 @@ def extract_container_numbers(text, valid_containers):
         logging.error(f"Ошибка при обработке текста: {e}")
         return []
 
-def get_unique_filename(base_path, original_name):
-    """Генерирует уникальное имя файла, добавляя индекс к дубликатам"""
-    if not os.path.exists(base_path):
-        return original_name
-    
-    name, ext = os.path.splitext(original_name)
-    counter = 2
-    new_name = original_name
-    
-    while os.path.exists(os.path.join(base_path, new_name)):
-        new_name = f"{name} ({counter}){ext}"
-        counter += 1
-    
-    return new_name
-
-def process_pdfs(input_folder, output_folder, excel_path=None, log_callback=None, progress_callback=None):
+def process_pdfs(input_folder, output_folder, excel_path=None, log_callback=None, progress_callback=None,
+                 ocr_profile=None, cancel_token=None, pause_token=None, telemetry=None):
     """
     Переименовывает PDF файлы на основе найденных номеров контейнеров
     
     Args:
         input_folder: исходная папка с PDF
         output_folder: папка для сохранения
-        excel_path: путь к Excel файлу (опционально)
+        excel_path: путь к Excel файлу, папке книг или список источников (опционально)
         log_callback: функция логирования
         progress_callback: функция отображения прогресса
+        ocr_profile: профиль OCR (см. DEFAULT_OCR_PROFILE), опционально
+        cancel_token: токен отмены (CancellationToken), опционально
+        pause_token: токен паузы (PauseToken), опционально
+        telemetry: телеметрия задачи (JobTelemetry), опционально
+
+    Returns:
+        dict: сводка — status ('completed' | 'cancelled'), processed, total, not_renamed;
+            status 'failed' и error, если не удалось найти Tesseract или загрузить реестр
     """
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
+    try:
+        ensure_tesseract()
+    except RuntimeError as e:
+        logging.error(f"Ошибка инициализации Tesseract: {e}")
+        if log_callback:
+            log_callback(f"Ошибка инициализации Tesseract: {e}")
+        return {'status': 'failed', 'error': f"Ошибка инициализации Tesseract: {e}"}
+
     data_manager = DataManager()
     poppler_path = get_poppler_path()
+    ocr_profile = normalize_ocr_profile(ocr_profile)
+    if log_callback:
+        log_callback(f"Профиль OCR: {get_ocr_config(ocr_profile)}, DPI {ocr_profile['dpi']}")
 
-    if excel_path and os.path.exists(excel_path):
+    if registry_exists(excel_path):
         if log_callback:
             log_callback(f"Загрузка данных из Excel: {excel_path}")
         try:
-            data_manager.load_excel_data(excel_path)
+            with stage(telemetry, 'excel', nbytes=registry_size(excel_path)):
+                data_manager.load_excel_data(excel_path)
             if log_callback:
                 log_callback("Данные из Excel успешно загружены")
         except Exception as e:
             if log_callback:
                 log_callback(f"Ошибка при загрузке Excel: {e}")
-            return
+            return {'status': 'failed', 'error': f"Ошибка при загрузке Excel: {e}"}
     else:
         if log_callback:
             log_callback("Не указан путь к Excel-файлу или файл не найден. Операция прервана.")
-        return
+        return {'status': 'failed', 'error': "Не указан путь к Excel-файлу или файл не найден"}
 
-    valid_containers = set(data_manager.latest_container_data.keys())
+    container_suffixes = data_manager.containers_by_suffix
     if log_callback:
-        log_callback(f"Загружено {len(valid_containers)} валидных контейнеров")
+        log_callback(f"Загружено {len(data_manager.latest_container_data)} валидных контейнеров")
+
+    journal = JobJournal('rename', {
+        'input_folder': os.path.abspath(input_folder),
+        'output_folder': os.path.abspath(output_folder),
+        'excel_path': registry_key(excel_path),
+        'ocr_profile': ocr_profile,
+    })
+    if journal.resumed and log_callback:
+        log_callback(f"Продолжение прерванной задачи: уже обработано файлов {len(journal.entries('renamed'))}")
 
     pdf_files = [f for f in os.listdir(input_folder) if f.lower().endswith(".pdf")]
     total_files = len(pdf_files)
     not_renamed_files = []
+    filename_registry = FilenameRegistry(journal)
+    status = 'completed'
+    processed = 0
     
     for index, filename in enumerate(pdf_files, 1):
+        if checkpoint(cancel_token, pause_token):
+            status = 'cancelled'
+            break
         file_path = os.path.join(input_folder, filename)
         if log_callback:
             log_callback(f"Обрабатывается: {filename}")
         
         try:
-            text = extract_text_from_first_page(file_path, poppler_path)
+            # Результат OCR берётся из журнала, если файл уже распознавался в прерванном запуске
+            stat = os.stat(file_path)
+            ocr_key = f"{filename}|{stat.st_size}|{stat.st_mtime_ns}"
+            cached = journal.get('ocr', ocr_key)
+            if cached is not None:
+                text = cached['text']
+            else:
+                text = extract_text_from_first_page(file_path, poppler_path, ocr_profile, telemetry)
+                journal.record('ocr', ocr_key, text=text)
             if text:
-                container_numbers = extract_container_numbers(text, valid_containers)
+                container_numbers = extract_container_numbers(text, container_suffixes=container_suffixes)
                 if container_numbers:
                     new_name = f"{', '.join(container_numbers)}.pdf"
-                    new_name = get_unique_filename(output_folder, new_name)
-                    new_path = os.path.join(output_folder, new_name)
-                    os.rename(file_path, new_path)
+                    with stage(telemetry, 'move', nbytes=stat.st_size):
+                        new_name = filename_registry.move_into(file_path, output_folder, new_name)
+                    journal.record('renamed', filename, name=new_name)
                     if log_callback:
                         log_callback(f"Файл переименован: {new_name}")
                 else:
-                    new_name = get_unique_filename(output_folder, filename)
-                    new_path = os.path.join(output_folder, new_name)
-                    os.rename(file_path, new_path)
+                    with stage(telemetry, 'move', nbytes=stat.st_size):
+                        new_name = filename_registry.move_into(file_path, output_folder, filename)
+                    journal.record('renamed', filename, name=new_name)
                     if log_callback:
                         log_callback(f"Файл перемещен без переименования: {new_name}")
                     not_renamed_files.append(filename)
@@ -231,14 +302,22 @@ def process_pdfs(input_folder, output_folder, excel_path=None, log_callback=None
                 log_callback(f"Ошибка обработки файла {filename}: {e}")
             not_renamed_files.append(filename)
         
+        processed = index
         if progress_callback:
             progress_callback(index, total_files)
     
-    if log_callback:
-        log_callback("Операция переименования PDF завершена")
-        if not_renamed_files:
-            log_callback(f"Не удалось переименовать {len(not_renamed_files)} файлов из {total_files}:")
-            for filename in not_renamed_files:
-                log_callback(f"- {filename}")
-        else:
-            log_callback("Все файлы успешно переименованы")
+    if status == 'cancelled':
+        journal.close()
+        if log_callback:
+            log_callback(f"Операция остановлена: обработано файлов {processed} из {total_files}")
+    else:
+        journal.finish()
+        if log_callback:
+            log_callback("Операция переименования PDF завершена")
+            if not_renamed_files:
+                log_callback(f"Не удалось переименовать {len(not_renamed_files)} файлов из {total_files}:")
+                for filename in not_renamed_files:
+                    log_callback(f"- {filename}")
+            else:
+                log_callback("Все файлы успешно переименованы")
+    return {'status': status, 'processed': processed, 'total': total_files, 'not_renamed': not_renamed_files}
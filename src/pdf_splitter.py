@@ -3,13 +3,16 @@
 Используется для автоматической нарезки документов на части.
 """
 import os
-import shutil
 import logging
 import numpy as np
 from PyPDF2 import PdfReader, PdfWriter
 from pdf2image import convert_from_path
-import sys
 from src.utils_data_manager import DataManager
+from src.core_journal import JobJournal, atomic_write
+from src.core_cancellation import checkpoint
+from src.core_telemetry import stage
+from src.core_tracing import span
+from src.utils_toolchain import get_poppler_path
 
 # Настройка логгирования
 logger = logging.getLogger(__name__)
@@ -54,25 +57,29 @@ def is_white_hue(avg_rgb):
     logging.debug(f"Проверка на белый цвет: RGB {r:.2f}, {g:.2f}, {b:.2f} -> {is_white}")
     return is_white
 
-def extract_page_as_image(pdf_path, page_number, poppler_path=None):
+def extract_page_as_image(pdf_path, page_number, poppler_path=None, dpi=200):
     """
     Конвертирует страницу PDF в изображение.
     :param pdf_path: str
     :param page_number: int (нумерация с 0)
     :param poppler_path: str | None
+    :param dpi: int — разрешение рендеринга
     :return: PIL.Image | None
     """
     if poppler_path is None:
         poppler_path = get_poppler_path()
-    images = convert_from_path(
-        pdf_path,
-        first_page=page_number + 1,
-        last_page=page_number + 1,
-        poppler_path=poppler_path
-    )
+    with span('convert_from_path', page=page_number + 1):
+        images = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_number + 1,
+            last_page=page_number + 1,
+            poppler_path=poppler_path
+        )
     return images[0] if images else None
 
-def split_pdf_by_green_pages(input_pdf, output_dir, poppler_path=None, threshold=2.3, log_callback=None, progress_callback=None):
+def split_pdf_by_green_pages(input_pdf, output_dir, poppler_path=None, threshold=2.3, log_callback=None, progress_callback=None,
+                             cancel_token=None, pause_token=None, telemetry=None):
     """
     Разделяет PDF по зелёным страницам (маркерным).
     :param input_pdf: str
@@ -81,6 +88,10 @@ def split_pdf_by_green_pages(input_pdf, output_dir, poppler_path=None, threshold
     :param threshold: float
     :param log_callback: callable | None
     :param progress_callback: callable | None
+    :param cancel_token: CancellationToken | None
+    :param pause_token: PauseToken | None
+    :param telemetry: JobTelemetry | None
+    :return: dict — сводка: status ('completed' | 'cancelled'), pages_analyzed, total_pages, files_created
     """
     def log(message):
         # Если есть callback - используем его, если нет - логируем через logging
@@ -90,91 +101,95 @@ def split_pdf_by_green_pages(input_pdf, output_dir, poppler_path=None, threshold
             logger.info(message)
 
     os.makedirs(output_dir, exist_ok=True)
-    reader = PdfReader(input_pdf)
+    with span('PdfReader', path=input_pdf):
+        reader = PdfReader(input_pdf)
     total_pages = len(reader.pages)
 
-    if progress_callback:
-        progress_callback(0, total_pages)
+    stat = os.stat(input_pdf)
+    journal = JobJournal('split', {
+        'input_pdf': os.path.abspath(input_pdf),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime_ns,
+        'output_dir': os.path.abspath(output_dir),
+        'threshold': threshold,
+    })
+    try:
+        if journal.resumed:
+            log(f"Продолжение прерванной задачи: страниц проанализировано {len(journal.entries('page'))} из {total_pages}")
 
-    page_info = []
-    log("Анализ страниц...")
-    
-    for i in range(total_pages):
         if progress_callback:
-            progress_callback(i + 1, total_pages)
-
-        image = extract_page_as_image(input_pdf, i, poppler_path)
-        if image is None:
-            log(f"Не удалось обработать страницу {i+1}")
-            page_info.append((False, None))
-            continue
-
-        avg_rgb = get_average_color_rgb(image)
-        is_green = is_greenish_hue(avg_rgb, threshold)
-        page_info.append((is_green, i))
-        del image
-        
-        log(f"Страница {i+1}: {'зеленая' if is_green else 'обычная'}")
+            progress_callback(0, total_pages)
 
-    log("Создание файлов...")
-    writer = None
-    file_index = 1
+        page_info = []
+        log("Анализ страниц...")
     
-    for i, (is_green, page_num) in enumerate(page_info):
-        if page_num is None:
-            continue
+        for i in range(total_pages):
+            if checkpoint(cancel_token, pause_token):
+                log(f"Операция остановлена: проанализировано страниц {i} из {total_pages}")
+                return {'status': 'cancelled', 'pages_analyzed': i, 'total_pages': total_pages, 'files_created': 0}
+
+            if progress_callback:
+                progress_callback(i + 1, total_pages)
+
+            done = journal.get('page', i)
+            if done is not None:
+                page_info.append((done['green'], i if done['ok'] else None))
+                continue
+
+            with stage(telemetry, 'render', unit='стр.'):
+                image = extract_page_as_image(input_pdf, i, poppler_path)
+            if image is None:
+                log(f"Не удалось обработать страницу {i+1}")
+                page_info.append((False, None))
+                journal.record('page', i, green=False, ok=False)
+                continue
+
+            avg_rgb = get_average_color_rgb(image)
+            is_green = bool(is_greenish_hue(avg_rgb, threshold))
+            page_info.append((is_green, i))
+            journal.record('page', i, green=is_green, ok=True)
+            del image
         
-        if is_green:
-            if writer:
-                output_path = os.path.join(output_dir, f"output_{file_index}.pdf")
-                with open(output_path, "wb") as f:
+            log(f"Страница {i+1}: {'зеленая' if is_green else 'обычная'}")
+
+        log("Создание файлов...")
+        segments = []
+        for is_green, page_num in page_info:
+            if page_num is None:
+                continue
+            if is_green or not segments:
+                segments.append([])
+            segments[-1].append(page_num)
+
+        for file_index, pages in enumerate(segments, 1):
+            if checkpoint(cancel_token, pause_token):
+                log(f"Операция остановлена: создано файлов {file_index - 1} из {len(segments)}")
+                return {'status': 'cancelled', 'pages_analyzed': total_pages, 'total_pages': total_pages,
+                        'files_created': file_index - 1}
+            output_path = os.path.join(output_dir, f"output_{file_index}.pdf")
+            if journal.is_done('segment', file_index) and os.path.exists(output_path):
+                continue
+            writer = PdfWriter()
+            for page_num in pages:
+                writer.add_page(reader.pages[page_num])
+            with stage(telemetry, 'write') as counters, atomic_write(output_path) as f:
+                with span('PdfWriter.write', pages=len(pages)):
                     writer.write(f)
+                counters['nbytes'] = f.tell()
+            journal.record('segment', file_index, pages=pages)
+            if file_index < len(segments):
                 log(f"Создан файл: {output_path}")
-                file_index += 1
-
-            writer = PdfWriter()
-            writer.add_page(reader.pages[page_num])
-        else:
-            if writer is None:
-                writer = PdfWriter()
-            writer.add_page(reader.pages[page_num])
-
-    if writer:
-        output_path = os.path.join(output_dir, f"output_{file_index}.pdf")
-        with open(output_path, "wb") as f:
-            writer.write(f)
-        log(f"Создан последний файл: {output_path}")
-
-    log("Разделение завершено")
-
-def get_poppler_path():
-    """
-    Определяет путь к Poppler (необходим для pdf2image).
-    :return: str | None
-    :raises RuntimeError: если Poppler не найден
-    """
-    candidates = []
-    # vendor/poppler/bin относительно корня проекта
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
-    candidates.append(os.path.join(base_path, 'vendor', 'poppler', 'bin'))
-    # vendor/poppler/bin относительно src
-    base_path2 = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-    candidates.append(os.path.join(base_path2, 'vendor', 'poppler', 'bin'))
-    # В системном PATH
-    if shutil.which('pdftoppm') or shutil.which('pdftoppm.exe'):
-        candidates.append(None)  # None = использовать системный PATH
-    # frozen exe
-    if getattr(sys, 'frozen', False):
-        exe_path = os.path.dirname(sys.executable)
-        candidates.append(os.path.join(exe_path, 'poppler', 'bin'))
-    # Проверяем все пути
-    for path in candidates:
-        if path is None:
-            return None
-        if os.path.exists(path) and any(
-            os.path.isfile(os.path.join(path, exe)) for exe in ['pdftoppm.exe', 'pdftoppm']):
-            return path
-    raise RuntimeError('Poppler не найден! Проверьте, что poppler установлен в vendor/poppler/bin или добавлен в PATH.')
+            else:
+                log(f"Создан последний файл: {output_path}")
+
+        journal.finish()
+        log("Разделение завершено")
+        return {'status': 'completed', 'pages_analyzed': total_pages, 'total_pages': total_pages,
+                'files_created': len(segments)}
+    finally:
+        # Журнал сохраняется для возобновления (в том числе после ошибки записи);
+        # после успешного завершения его удаляет finish()
+        journal.close()
 
 if __name__ == "__main__":
     logging.info("Этот модуль предназначен для использования как библиотека.")
\ No newline at end of file
@@ -1,9 +1,11 @@
+import os
+
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
                               QLineEdit, QPushButton, QFormLayout,
                               QGroupBox, QStyle)
 
-from src.pdf_organizer import organize_pdfs
-from src.core_worker import WorkerThread
+from src.core_scheduler import RESOURCE_IO
+from src.core_tracing import trace_job
 
 class OrganizerArea(QWidget):
     def __init__(self, main_window):
@@ -56,7 +58,7 @@ class OrganizerArea(QWidget):
         excel_btn.setProperty("iconOnly", "true")
         excel_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
         excel_btn.clicked.connect(
-            lambda: self.main_window.browse_file(self.excel_field, "Excel Files (*.xlsx *.xls)"))
+            lambda: self.main_window.browse_file(self.excel_field, "Excel Files (*.xlsx *.xls);;CSV (*.csv)"))
         excel_layout.addWidget(self.excel_field)
         excel_layout.addWidget(excel_btn)
         form_layout.addRow("Excel файл:", self.excel_container)
@@ -70,43 +72,47 @@ class OrganizerArea(QWidget):
         self.organize_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.organize_btn.clicked.connect(self.organize_pdf)
         layout.addWidget(self.organize_btn)
-        self.main_window.start_buttons.append(self.organize_btn)
 
         # Добавляем подсказки        self.input_field.setToolTip("Выберите папку с PDF файлами для организации")
         self.output_field.setToolTip("Выберите папку для сохранения организованных файлов")
         self.organize_btn.setToolTip("Начать процесс организации PDF файлов")
+
+        # Сохранение настроек при изменении полей
+        self.input_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.output_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.excel_field.textChanged.connect(self.main_window.schedule_settings_save)
         
     def organize_pdf(self):
         """Начать процесс организации PDF файлов"""
-        self.main_window.cleanup_worker()
-        
         if not self.check_inputs():
             return
             
         input_folder = self.input_field.text()
         output_folder = self.output_field.text()
         excel_path = self.excel_field.text()
+        trace_enabled = self.main_window.settings.get('trace_enabled', False)
         
-        def worker_function(log_callback, progress_callback):
+        def worker_function(log_callback, progress_callback, cancel_token, pause_token, telemetry):
+            # Тяжёлые зависимости (pandas, PyPDF2) загружаются при первой задаче
+            from src.pdf_organizer import organize_pdfs
             try:
-                organize_pdfs(
-                    input_folder,
-                    output_folder,
-                    excel_path,
-                    log_callback,
-                    progress_callback
-                )
+                with trace_job('organize', output_folder, trace_enabled, log_callback):
+                    return organize_pdfs(
+                        input_folder,
+                        output_folder,
+                        excel_path,
+                        log_callback,
+                        progress_callback,
+                        cancel_token=cancel_token,
+                        pause_token=pause_token,
+                        telemetry=telemetry
+                    )
             except Exception as e:
                 log_callback(f"Ошибка при организации PDF: {e}")
                 raise
-        self.main_window.worker = WorkerThread(worker_function)
-        self.main_window.worker.finished.connect(
-            lambda: self.main_window.set_worker_state(False))
-        self.main_window.worker.progress.connect(self.main_window.update_progress)
-        self.main_window.worker.log.connect(self.main_window.log_message)
-        self.main_window.worker.error.connect(self.main_window.log_message)
-        self.main_window.worker.start()
-        self.main_window.set_worker_state(True)
+        self.main_window.start_job(
+            f"Организация: {os.path.basename(input_folder)}", worker_function, RESOURCE_IO,
+            job_name='organize', output_dir=output_folder)
 
     def check_inputs(self) -> bool:
         """Проверка наличия всех необходимых входных данных"""
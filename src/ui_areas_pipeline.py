@@ -0,0 +1,148 @@
+import os
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
+                              QLineEdit, QPushButton, QFormLayout,
+                              QGroupBox, QStyle)
+
+from src.core_scheduler import RESOURCE_CPU
+from src.core_tracing import trace_job
+
+class PipelineArea(QWidget):
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        group = QGroupBox("Полная обработка скана")
+        form_layout = QFormLayout()
+
+        # Выбор входного файла
+        self.input_field = QLineEdit()
+        self.input_field.setPlaceholderText("Выберите PDF файл...")
+        self.input_field.setText(self.main_window.settings.get('pipeline_input', ''))
+        input_btn = QPushButton("Обзор")
+        input_btn.setProperty("iconOnly", "true")
+        input_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
+        input_btn.clicked.connect(
+            lambda: self.main_window.browse_file(self.input_field, "PDF Files (*.pdf)"))
+        input_layout = QHBoxLayout()
+        input_layout.addWidget(self.input_field)
+        input_layout.addWidget(input_btn)
+        form_layout.addRow("Входной файл:", input_layout)
+
+        # Выбор выходной папки
+        self.output_field = QLineEdit()
+        self.output_field.setPlaceholderText("Выберите папку для сохранения...")
+        self.output_field.setText(self.main_window.settings.get('pipeline_output', ''))
+        output_btn = QPushButton("Обзор")
+        output_btn.setProperty("iconOnly", "true")
+        output_btn.setIcon(self.style().standardIcon(QStyle.SP_DirIcon))
+        output_btn.clicked.connect(
+            lambda: self.main_window.browse_directory(self.output_field))
+        output_layout = QHBoxLayout()
+        output_layout.addWidget(self.output_field)
+        output_layout.addWidget(output_btn)
+        form_layout.addRow("Выходная папка:", output_layout)
+
+        # Выбор Excel файла
+        self.excel_field = QLineEdit()
+        self.excel_field.setPlaceholderText("Выберите Excel файл...")
+        self.excel_field.setText(self.main_window.settings.get('pipeline_excel_file', ''))
+        excel_btn = QPushButton("Обзор")
+        excel_btn.setProperty("iconOnly", "true")
+        excel_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
+        excel_btn.clicked.connect(
+            lambda: self.main_window.browse_file(self.excel_field, "Excel Files (*.xlsx *.xls);;CSV (*.csv)"))
+        excel_layout = QHBoxLayout()
+        excel_layout.addWidget(self.excel_field)
+        excel_layout.addWidget(excel_btn)
+        form_layout.addRow("Excel файл:", excel_layout)
+
+        group.setLayout(form_layout)
+        layout.addWidget(group)
+
+        # Кнопка обработки
+        self.run_btn = QPushButton("Обработать скан")
+        self.run_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
+        self.run_btn.clicked.connect(self.process_scan)
+        layout.addWidget(self.run_btn)
+
+        # Добавляем подсказки
+        self.input_field.setToolTip("Скан с зелёными листами-разделителями")
+        self.output_field.setToolTip("Папка для организованных файлов; нераспознанные документы "
+                                     "сохраняются в подпапку «Не распознано»")
+        self.run_btn.setToolTip("Разделение, переименование и организация за один проход, "
+                                "без промежуточных файлов (порог и профиль OCR — из других вкладок)")
+
+        # Сохранение настроек при изменении полей
+        self.input_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.output_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.excel_field.textChanged.connect(self.main_window.schedule_settings_save)
+
+    def process_scan(self):
+        """Начать полную обработку скана"""
+        if not self.check_inputs():
+            return
+
+        input_path = self.input_field.text()
+        output_folder = self.output_field.text()
+        excel_path = self.excel_field.text()
+        settings = self.main_window.settings
+        # Порог берётся с вкладки разделения, если она открыта (там он может быть ещё не сохранён)
+        splitter_area = self.main_window.splitter_area
+        threshold = splitter_area.threshold_spin.value() if splitter_area else settings.get('threshold', 2.3)
+        # Профиль читается из файла: бенчмарк OCR мог сохранить новый, пока окно открыто
+        ocr_profile = self.main_window.settings_manager.load_setting('ocr_profile')
+        trace_enabled = settings.get('trace_enabled', False)
+
+        def worker_function(log_callback, progress_callback, cancel_token, pause_token, telemetry):
+            # Тяжёлые зависимости загружаются при первой задаче, а не при запуске
+            from src.pdf_pipeline import process_scan
+            try:
+                with trace_job('pipeline', output_folder, trace_enabled, log_callback):
+                    return process_scan(
+                        input_path,
+                        output_folder,
+                        excel_path,
+                        threshold,
+                        ocr_profile,
+                        log_callback,
+                        progress_callback,
+                        cancel_token=cancel_token,
+                        pause_token=pause_token,
+                        telemetry=telemetry
+                    )
+            except Exception as e:
+                log_callback(f"Ошибка при обработке скана: {e}")
+                raise
+
+        self.main_window.start_job(
+            f"Обработка: {os.path.basename(input_path)}", worker_function, RESOURCE_CPU,
+            job_name='pipeline', output_dir=output_folder)
+
+    def check_inputs(self) -> bool:
+        """Проверка наличия всех необходимых входных данных"""
+        if not self.input_field.text():
+            self.main_window.log_message("Ошибка: Не выбран входной PDF файл")
+            return False
+
+        if not self.output_field.text():
+            self.main_window.log_message("Ошибка: Не выбрана выходная папка")
+            return False
+
+        if not self.excel_field.text():
+            self.main_window.log_message("Ошибка: Не выбран Excel файл")
+            return False
+
+        return True
+
+    def get_settings(self) -> dict:
+        """Получить текущие настройки для сохранения"""
+        return {
+            'pipeline_input': self.input_field.text(),
+            'pipeline_output': self.output_field.text(),
+            'pipeline_excel_file': self.excel_field.text()
+        }
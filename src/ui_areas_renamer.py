@@ -1,9 +1,11 @@
+import os
+
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout,
                             QLineEdit, QPushButton, QFormLayout,
                             QGroupBox, QStyle)
 
-from src.pdf_renamer import process_pdfs
-from src.core_worker import WorkerThread
+from src.core_scheduler import RESOURCE_CPU
+from src.core_tracing import trace_job
 
 class RenamerArea(QWidget):
     def __init__(self, main_window):
@@ -56,7 +58,7 @@ class RenamerArea(QWidget):
         excel_btn.setProperty("iconOnly", "true")
         excel_btn.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
         excel_btn.clicked.connect(
-            lambda: self.main_window.browse_file(self.excel_field, "Excel Files (*.xlsx *.xls)"))
+            lambda: self.main_window.browse_file(self.excel_field, "Excel Files (*.xlsx *.xls);;CSV (*.csv)"))
         excel_layout.addWidget(self.excel_field)
         excel_layout.addWidget(excel_btn)
         form_layout.addRow("Excel файл:", self.excel_container)
@@ -70,43 +72,50 @@ class RenamerArea(QWidget):
         self.rename_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.rename_btn.clicked.connect(self.rename_pdf)
         layout.addWidget(self.rename_btn)
-        self.main_window.start_buttons.append(self.rename_btn)
 
         # Добавляем подсказки
         self.input_field.setToolTip("Выберите папку с PDF файлами для переименования")
         self.output_field.setToolTip("Выберите папку для сохранения переименованных файлов")
         self.rename_btn.setToolTip("Начать процесс переименования PDF файлов")
 
+        # Сохранение настроек при изменении полей
+        self.input_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.output_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.excel_field.textChanged.connect(self.main_window.schedule_settings_save)
+
     def rename_pdf(self):
         """Начать процесс переименования PDF файлов"""
-        self.main_window.cleanup_worker()
-        
         if not self.check_inputs():            return
             
         input_dir = self.input_field.text()
         output_dir = self.output_field.text()
         excel_path = self.excel_field.text()
+        # Профиль читается из файла: бенчмарк OCR мог сохранить новый, пока окно открыто
+        ocr_profile = self.main_window.settings_manager.load_setting('ocr_profile')
+        trace_enabled = self.main_window.settings.get('trace_enabled', False)
         
-        def worker_function(log_callback, progress_callback):
+        def worker_function(log_callback, progress_callback, cancel_token, pause_token, telemetry):
+            # Тяжёлые зависимости (pandas, pdf2image, pytesseract) загружаются при первой задаче
+            from src.pdf_renamer import process_pdfs
             try:
-                process_pdfs(
-                    input_folder=input_dir,
-                    output_folder=output_dir,
-                    excel_path=excel_path,
-                    log_callback=log_callback,
-                    progress_callback=progress_callback
-                )
+                with trace_job('rename', output_dir, trace_enabled, log_callback):
+                    return process_pdfs(
+                        input_folder=input_dir,
+                        output_folder=output_dir,
+                        excel_path=excel_path,
+                        ocr_profile=ocr_profile,
+                        log_callback=log_callback,
+                        progress_callback=progress_callback,
+                        cancel_token=cancel_token,
+                        pause_token=pause_token,
+                        telemetry=telemetry
+                    )
             except Exception as e:
                 log_callback(f"Ошибка при переименовании PDF: {e}")
                 raise
-        self.main_window.worker = WorkerThread(worker_function)
-        self.main_window.worker.finished.connect(
-            lambda: self.main_window.set_worker_state(False))
-        self.main_window.worker.progress.connect(self.main_window.update_progress)
-        self.main_window.worker.log.connect(self.main_window.log_message)
-        self.main_window.worker.error.connect(self.main_window.log_message)
-        self.main_window.worker.start()
-        self.main_window.set_worker_state(True)
+        self.main_window.start_job(
+            f"Переименование: {os.path.basename(input_dir)}", worker_function, RESOURCE_CPU,
+            job_name='rename', output_dir=output_dir)
 
     def check_inputs(self) -> bool:
         """Проверка наличия всех необходимых входных данных"""
@@ -1,12 +1,12 @@
+import os
+
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QPushButton, QFormLayout, QDoubleSpinBox,
                               QGroupBox, QStyle)
 from PySide6.QtCore import Qt
 
-from src.pdf_splitter import split_pdf_by_green_pages, get_poppler_path
-from src.core_worker import WorkerThread
-
-from src.ui_areas_renamer import RenamerArea
-from src.ui_areas_organizer import OrganizerArea
+from src.core_scheduler import RESOURCE_CPU
+from src.core_tracing import trace_job
+from src.utils_toolchain import get_poppler_path
 
 class SplitterArea(QWidget):
     def __init__(self, main_window):
@@ -95,7 +95,6 @@ class SplitterArea(QWidget):
         self.split_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay))
         self.split_btn.clicked.connect(self.split_pdf)
         layout.addWidget(self.split_btn)
-        self.main_window.start_buttons.append(self.split_btn)
 
         # Добавляем подсказки
         self.input_field.setToolTip("Выберите PDF файл для разделения")
@@ -103,39 +102,44 @@ class SplitterArea(QWidget):
         self.threshold_spin.setToolTip("Пороговое значение для определения зеленых страниц")
         self.split_btn.setToolTip("Начать процесс разделения PDF файла")
 
+        # Сохранение настроек при изменении полей
+        self.input_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.output_field.textChanged.connect(self.main_window.schedule_settings_save)
+        self.threshold_spin.valueChanged.connect(self.main_window.schedule_settings_save)
+
     def split_pdf(self):
         """Начать процесс разделения PDF файла"""
-        self.main_window.cleanup_worker()
-        
         if not self.check_inputs():
             return
             
         input_path = self.input_field.text()
         output_dir = self.output_field.text()
         threshold = self.threshold_spin.value()
+        trace_enabled = self.main_window.settings.get('trace_enabled', False)
         
-        def worker_function(log_callback, progress_callback):
+        def worker_function(log_callback, progress_callback, cancel_token, pause_token, telemetry):
+            # Тяжёлые зависимости (PyPDF2, pdf2image, numpy) загружаются при первой задаче, а не при запуске
+            from src.pdf_splitter import split_pdf_by_green_pages
             try:
-                split_pdf_by_green_pages(
-                    input_pdf=input_path,
-                    output_dir=output_dir,
-                    threshold=threshold,
-                    poppler_path=get_poppler_path(),
-                    log_callback=log_callback,
-                    progress_callback=progress_callback
-                )
+                with trace_job('split', output_dir, trace_enabled, log_callback):
+                    return split_pdf_by_green_pages(
+                        input_pdf=input_path,
+                        output_dir=output_dir,
+                        threshold=threshold,
+                        poppler_path=get_poppler_path(),
+                        log_callback=log_callback,
+                        progress_callback=progress_callback,
+                        cancel_token=cancel_token,
+                        pause_token=pause_token,
+                        telemetry=telemetry
+                    )
             except Exception as e:
                 log_callback(f"Ошибка при разделении PDF: {e}")
                 raise
 
-        self.main_window.worker = WorkerThread(worker_function)
-        self.main_window.worker.finished.connect(
-            lambda: self.main_window.set_worker_state(False))
-        self.main_window.worker.progress.connect(self.main_window.update_progress)
-        self.main_window.worker.log.connect(self.main_window.log_message)
-        self.main_window.worker.error.connect(self.main_window.log_message)
-        self.main_window.worker.start()
-        self.main_window.set_worker_state(True)
+        self.main_window.start_job(
+            f"Разделение: {os.path.basename(input_path)}", worker_function, RESOURCE_CPU,
+            job_name='split', output_dir=output_dir)
 
     def check_inputs(self) -> bool:
         """Проверка наличия всех необходимых входных данных"""
@@ -1,22 +1,33 @@
 ﻿import os
 import sys
+import json
+import time
+from datetime import datetime
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout,
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QProgressBar,
-    QTabWidget, QStyle
+    QTabWidget, QStyle, QTableWidget, QTableWidgetItem,
+    QHeaderView, QAbstractItemView
 )
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QIcon
 
-from src.core_settings import SettingsManager
+from src.core_settings import SettingsManager, get_app_data_dir
+from src.core_scheduler import JobScheduler, RESOURCE_CPU, RESOURCE_IO, DEFAULT_LIMITS
+from src.core_logging import LogPipeline
+from src.core_telemetry import format_snapshot
+from src.core_profiling import profile_options
+from src.utils_toolchain import warm_up
 from src.ui_styles import get_stylesheet, DARK_MODE
 from src.ui_areas_splitter import SplitterArea
 from src.ui_areas_renamer import RenamerArea
 from src.ui_areas_organizer import OrganizerArea
+from src.ui_areas_pipeline import PipelineArea
 
 def get_resource_path(relative_path: str) -> str:
     """Get absolute path to resource, works for dev and for PyInstaller"""
@@ -27,12 +38,32 @@ def get_resource_path(relative_path: str) -> str:
         base_path = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     return os.path.join(base_path, relative_path)
 
+STATE_LABELS = {
+    'queued': "В очереди",
+    'running': "Выполняется",
+    'paused': "Приостановлена",
+    'completed': "Завершена",
+    'cancelled': "Остановлена",
+    'failed': "Ошибка",
+}
+
+ACTIVE_STATES = ('queued', 'running', 'paused')
+
+SETTINGS_SAVE_DELAY_MS = 1000
+
+# Вкладки: заголовок, атрибут окна, класс области. Содержимое создаётся при первом показе вкладки
+TABS = (
+    ("Разделение", 'splitter_area', SplitterArea),
+    ("Переименование", 'renamer_area', RenamerArea),
+    ("Организация", 'organizer_area', OrganizerArea),
+    ("Скан целиком", 'pipeline_area', PipelineArea),
+)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("qManager")
         self.setMinimumSize(800, 600)
-        self.worker = None
         
         # Set application icon
         icon_path = get_resource_path("resources/Icon.ico")
@@ -42,94 +73,253 @@ class MainWindow(QMainWindow):
         # Initialize settings manager
         self.settings_manager = SettingsManager()
         self.settings = self.settings_manager.load_settings()
+
+        # Settings are saved only on change, debounced
+        self.settings_timer = QTimer(self)
+        self.settings_timer.setSingleShot(True)
+        self.settings_timer.setInterval(SETTINGS_SAVE_DELAY_MS)
+        self.settings_timer.timeout.connect(self.save_settings)
+
+        # Asynchronous log pipeline (ring buffer + rotating file)
+        self.log_pipeline = LogPipeline()
+        self.logger = self.log_pipeline.logger
+
+        # Job scheduler (replaces the single worker slot)
+        self.scheduler = JobScheduler({
+            RESOURCE_CPU: self.settings.get('max_cpu_jobs') or DEFAULT_LIMITS[RESOURCE_CPU],
+            RESOURCE_IO: self.settings.get('max_io_jobs') or DEFAULT_LIMITS[RESOURCE_IO],
+        }, self)
+        self.scheduler.job_added.connect(self.add_job_row)
+        self.scheduler.job_state_changed.connect(self.update_job_state)
+        self.scheduler.job_progress.connect(self.update_progress)
+        self.scheduler.job_log.connect(self.log_job_messages)
+        self.scheduler.job_result.connect(self.show_result)
+        self.scheduler.job_telemetry.connect(self.update_telemetry)
+        self.job_status_text = {}
+        self.job_rows = {}
         
         # Create main widget and layout
         main_widget = QWidget()
         self.setCentralWidget(main_widget)
         layout = QVBoxLayout(main_widget)
-
-        # Store start buttons references
-        self.start_buttons = []
         
-        # Create tabs
+        # Create tabs (contents are built on first show)
         self.tabs = QTabWidget()
-        self.splitter_area = SplitterArea(self)
-        self.renamer_area = RenamerArea(self)
-        self.organizer_area = OrganizerArea(self)
-        
-        self.tabs.addTab(self.splitter_area, "Разделение")
-        self.tabs.addTab(self.renamer_area, "Переименование")
-        self.tabs.addTab(self.organizer_area, "Организация")
+        for title, attribute, _ in TABS:
+            setattr(self, attribute, None)
+            placeholder = QWidget()
+            QVBoxLayout(placeholder).setContentsMargins(0, 0, 0, 0)
+            self.tabs.addTab(placeholder, title)
+        self.tabs.currentChanged.connect(self.ensure_tab)
+        self.ensure_tab(self.tabs.currentIndex())
         layout.addWidget(self.tabs)
 
+        # Jobs table with per-job progress
+        self.jobs_table = QTableWidget(0, 3)
+        self.jobs_table.setHorizontalHeaderLabels(["Задача", "Статус", "Прогресс"])
+        self.jobs_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.jobs_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        self.jobs_table.verticalHeader().setVisible(False)
+        self.jobs_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.jobs_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.jobs_table.itemSelectionChanged.connect(self.update_controls)
+        layout.addWidget(self.jobs_table)
+
         # Stop button
         self.stop_btn = QPushButton("Стоп")
         self.stop_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaStop))
-        self.stop_btn.setEnabled(False)
-        self.stop_btn.setStyleSheet("background-color: #cccccc; color: #666666;")
+        self.stop_btn.setToolTip("Остановить выбранные задачи (без выбора — все)")
         self.stop_btn.clicked.connect(self.stop_worker)
-        layout.addWidget(self.stop_btn)
 
-        # Create progress bar
-        self.progress_bar = QProgressBar()
-        layout.addWidget(self.progress_bar)
+        # Pause button
+        self.pause_btn = QPushButton("Пауза")
+        self.pause_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPause))
+        self.pause_btn.setToolTip("Приостановить или возобновить выбранные задачи (без выбора — все)")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(self.pause_btn)
+        controls_layout.addWidget(self.stop_btn)
+        layout.addLayout(controls_layout)
 
         # Apply styles
         self.apply_styles()
+        self.update_controls()
+
+        # Locate poppler and Tesseract in the background; results are cached for jobs
+        # Модули обработки (pandas, PyPDF2, OCR) импортирует сама задача в рабочем потоке
+        warm_up(self.log_message)
+
+    def ensure_tab(self, index):
+        """Создаёт содержимое вкладки при первом показе"""
+        if not 0 <= index < len(TABS):
+            return
+        _, attribute, area_class = TABS[index]
+        if getattr(self, attribute) is not None:
+            return
+        area = area_class(self)
+        setattr(self, attribute, area)
+        self.tabs.widget(index).layout().addWidget(area)
+
+    def report_startup(self, started):
+        """
+        Записывает время запуска (от импорта main.py до первого цикла событий)
+        в лог и в %APPDATA%/qManager/logs/startup.jsonl для отслеживания между версиями.
+        Возвращает:
+            float: Время запуска, мс.
+        """
+        startup_ms = (time.perf_counter() - started) * 1000
+        self.log_message(f"Время запуска: {startup_ms:.0f} мс")
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'startup_ms': round(startup_ms, 1),
+            'frozen': bool(getattr(sys, 'frozen', False)),
+        }
+        try:
+            with open(os.path.join(get_app_data_dir('logs'), 'startup.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+        return startup_ms
 
     def apply_styles(self):
         """Применяет стиль к интерфейсу"""
         self.setStyleSheet(get_stylesheet(DARK_MODE))
 
-    def set_worker_state(self, running: bool):
-        """Управляет состоянием кнопок во время выполнения задачи"""
-        if running:
-            self.stop_btn.setEnabled(True)
-            self.stop_btn.setStyleSheet("background-color: #0d6efd; color: white;")
-            for btn in self.start_buttons:
-                btn.setEnabled(False)
+    def start_job(self, title, function, resource=RESOURCE_CPU, job_name='job', output_dir=None):
+        """Ставит задачу в очередь планировщика (с профилированием, если оно включено в настройках)"""
+        profile = profile_options(self.settings, job_name, output_dir)
+        return self.scheduler.submit(title, function, resource, profile)
+
+    def add_job_row(self, job_id):
+        """Добавляет строку задачи в таблицу"""
+        job = self.scheduler.jobs[job_id]
+        row = self.jobs_table.rowCount()
+        self.jobs_table.insertRow(row)
+        title_item = QTableWidgetItem(f"#{job_id} {job.title}")
+        title_item.setData(Qt.UserRole, job_id)
+        self.jobs_table.setItem(row, 0, title_item)
+        self.jobs_table.setItem(row, 1, QTableWidgetItem(STATE_LABELS[job.state]))
+        progress_bar = QProgressBar()
+        progress_bar.setValue(0)
+        self.jobs_table.setCellWidget(row, 2, progress_bar)
+        self.job_rows[job_id] = row
+        self.update_controls()
+
+    def update_job_state(self, job_id, state):
+        """Обновляет статус задачи в таблице"""
+        row = self.job_rows.get(job_id)
+        if row is not None:
+            self.jobs_table.item(row, 1).setText(STATE_LABELS.get(state, state))
+            if state not in ACTIVE_STATES and self.job_status_text.pop(job_id, None):
+                self.jobs_table.cellWidget(row, 2).setFormat("Файл %v из %m")
+        self.update_controls()
+
+    def selected_jobs(self):
+        """Возвращает выбранные задачи, а если ничего не выбрано — все активные"""
+        job_ids = {self.jobs_table.item(index.row(), 0).data(Qt.UserRole)
+                   for index in self.jobs_table.selectionModel().selectedRows()}
+        if not job_ids:
+            job_ids = set(self.scheduler.jobs)
+        return [self.scheduler.jobs[job_id] for job_id in sorted(job_ids)
+                if self.scheduler.jobs[job_id].state in ACTIVE_STATES]
+
+    def update_controls(self):
+        """Управляет состоянием кнопок паузы и остановки"""
+        jobs = self.selected_jobs()
+        active = bool(jobs)
+        paused = active and all(job.state == 'paused' for job in jobs if job.state != 'queued')
+        self.pause_btn.setText("Продолжить" if paused else "Пауза")
+        self.pause_btn.setIcon(self.style().standardIcon(QStyle.SP_MediaPlay if paused else QStyle.SP_MediaPause))
+        for btn in (self.stop_btn, self.pause_btn):
+            btn.setEnabled(active)
+            if active:
+                btn.setStyleSheet("background-color: #0d6efd; color: white;")
+            else:
                 btn.setStyleSheet("background-color: #cccccc; color: #666666;")
+
+    def stop_worker(self):
+        """Запрашивает остановку задач; потоки завершатся на ближайшей контрольной точке"""
+        for job in self.selected_jobs():
+            self.log_message(f"Остановка задачи #{job.id} {job.title}...")
+            self.scheduler.cancel(job.id)
+
+    def toggle_pause(self):
+        """Приостанавливает или возобновляет задачи"""
+        jobs = [job for job in self.selected_jobs() if job.state != 'queued']
+        if not jobs:
+            return
+        if all(job.state == 'paused' for job in jobs):
+            for job in jobs:
+                self.scheduler.resume(job.id)
+            self.log_message("Операция возобновлена.")
         else:
-            self.stop_btn.setEnabled(False)
-            self.stop_btn.setStyleSheet("background-color: #cccccc; color: #666666;")
-            for btn in self.start_buttons:
-                btn.setEnabled(True)
-                btn.setStyleSheet("background-color: #0d6efd; color: white;")
+            for job in jobs:
+                self.scheduler.pause(job.id)
+            self.log_message("Операция приостановлена.")
 
-    def cleanup_worker(self):
-        """Очищает текущий рабочий поток, если он существует"""
-        if self.worker and self.worker.isRunning():
-            self.worker.quit()
-            self.worker.wait()
-            self.worker = None
+    def show_result(self, job_id, result):
+        """Выводит сводку, возвращённую задачей"""
+        if isinstance(result, dict) and result.get('status') == 'cancelled':
+            details = ", ".join(f"{key}: {value}" for key, value in result.items()
+                                if key != 'status' and not isinstance(value, list))
+            self.log_message(f"Задача #{job_id} остановлена. Частичный результат: {details}")
+        elif isinstance(result, dict) and result.get('status') == 'failed':
+            self.log_message(f"Задача #{job_id} завершилась с ошибкой: {result.get('error')}")
 
-    def stop_worker(self):
-        """Останавливает текущий рабочий поток"""
-        if self.worker and self.worker.isRunning():
-            print("Остановка текущей операции...")
-            self.worker.terminate()
-            self.worker.wait()
-            self.worker = None
-            print("Операция остановлена.")
-        self.set_worker_state(False)
+    def closeEvent(self, event):
+        """Корректно останавливает выполняющиеся задачи и сохраняет настройки при закрытии окна"""
+        self.scheduler.cancel_all(wait=True)
+        self.settings_timer.stop()
+        self.save_settings()
+        self.log_pipeline.stop()
+        super().closeEvent(event)
 
     def log_message(self, message: str):
-        """Логирует сообщение и сохраняет текущие настройки"""
-        print(message)
-        
-        # Обновляем настройки из всех областей
-        self.settings.update(self.splitter_area.get_settings())
-        self.settings.update(self.renamer_area.get_settings())
-        self.settings.update(self.organizer_area.get_settings())
-        
-        # Сохраняем обновленные настройки
+        """Передаёт сообщение в конвейер логирования"""
+        self.logger.info(message)
+
+    def log_job_messages(self, job_id, messages):
+        """Передаёт пакет сообщений задачи в конвейер логирования"""
+        title = self.scheduler.jobs[job_id].title
+        for message in messages:
+            self.logger.info(f"[{title}] {message}")
+
+    def schedule_settings_save(self):
+        """Откладывает сохранение настроек до окончания серии изменений"""
+        self.settings_timer.start()
+
+    def save_settings(self):
+        """Собирает настройки из всех областей и сохраняет их, если они изменились"""
+        # Unbuilt tabs keep the values loaded from the settings file
+        for _, attribute, _ in TABS:
+            area = getattr(self, attribute)
+            if area is not None:
+                self.settings.update(area.get_settings())
         self.settings_manager.save_settings(self.settings)
 
-    def update_progress(self, current, total):
-        """Обновляет прогресс-бар"""
-        self.progress_bar.setMaximum(total)
-        self.progress_bar.setValue(current)
-        self.progress_bar.setFormat("Файл %v из %m")
+    def update_progress(self, job_id, current, total):
+        """Обновляет прогресс задачи"""
+        row = self.job_rows.get(job_id)
+        if row is None:
+            return
+        progress_bar = self.jobs_table.cellWidget(row, 2)
+        progress_bar.setMaximum(total)
+        progress_bar.setValue(current)
+        status = self.job_status_text.get(job_id)
+        progress_bar.setFormat(f"Файл %v из %m · {status}" if status else "Файл %v из %m")
+
+    def update_telemetry(self, job_id, snapshot):
+        """Показывает скорость этапов, ETA и узкое место задачи"""
+        row = self.job_rows.get(job_id)
+        if row is None:
+            return
+        # В строке таблицы — только ETA и узкое место, скорости этапов — во всплывающей подсказке
+        status = format_snapshot({**snapshot, 'stages': {}})
+        self.job_status_text[job_id] = status
+        progress_bar = self.jobs_table.cellWidget(row, 2)
+        progress_bar.setFormat(f"Файл %v из %m · {status}" if status else "Файл %v из %m")
+        progress_bar.setToolTip(format_snapshot(snapshot).replace(" · ", "\n"))
 
     def browse_file(self, input_field, file_filter="All Files (*)"):
         file_path, _ = QFileDialog.getOpenFileName(self, "Выберите файл", "", file_filter)
@@ -0,0 +1,60 @@
+"""
+Компактная запись контейнера из реестра.
+Запись хранит шесть полей в __slots__ (без словаря на каждый объект), а повторяющиеся строки —
+судно, дата, коносамент, заказ, компания — интернируются и разделяются между всеми записями.
+Доступ как у словаря сохраняется: record["order"], record.get("bill"), dict(record).
+"""
+import sys
+from collections.abc import Mapping
+
+# Поля записи в порядке, в котором их возвращает DataManager
+FIELDS = ('vessel', 'date', 'bill', 'order', 'container', 'company')
+_FIELD_SET = frozenset(FIELDS)
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class ContainerRecord(Mapping):
+    __slots__ = FIELDS
+
+    def __init__(self, vessel, date, bill, order, container, company):
+        """
+        Создаёт запись контейнера; номер контейнера уникален и не интернируется.
+        Аргументы:
+            vessel (str): Судно / номер ТС.
+            date (str): Дата прибытия.
+            bill (str): Коносамент / CMR.
+            order (str): Номер заказа.
+            container (str): Полный номер контейнера.
+            company (str): Компания.
+        """
+        self.vessel = _intern(vessel)
+        self.date = _intern(date)
+        self.bill = _intern(bill)
+        self.order = _intern(order)
+        self.container = container
+        self.company = _intern(company)
+
+    @classmethod
+    def from_mapping(cls, data):
+        """
+        Создаёт запись из словаря с полями FIELDS.
+        """
+        return cls(*(data[field] for field in FIELDS))
+
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __reduce__(self):
+        return (self.__class__, tuple(getattr(self, field) for field in FIELDS))
+
+    def __repr__(self):
+        return f"ContainerRecord({dict(self)!r})"
@@ -0,0 +1,182 @@
+"""
+Накопительный реестр контейнеров в SQLite.
+Ежедневные выгрузки Excel добавляются в один файл базы: новые контейнеры вставляются,
+существующие обновляются, если запись не старше уже сохранённой (по дате прибытия).
+Поиск по полному номеру, последним 7 цифрам, заказу и коносаменту идёт по индексам,
+без загрузки реестра в память.
+"""
+import sqlite3
+import threading
+from collections.abc import Mapping
+from datetime import datetime
+
+from src.core_tracing import span
+from src.utils_container_record import ContainerRecord, FIELDS
+
+_COLUMNS = ', '.join(f'"{field}"' for field in FIELDS)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS containers (
+    container TEXT PRIMARY KEY,
+    suffix TEXT NOT NULL,
+    vessel TEXT,
+    date TEXT,
+    date_key TEXT,
+    bill TEXT,
+    "order" TEXT,
+    company TEXT,
+    source TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS containers_suffix ON containers (suffix);
+CREATE INDEX IF NOT EXISTS containers_order ON containers ("order");
+CREATE INDEX IF NOT EXISTS containers_bill ON containers (bill);
+CREATE TABLE IF NOT EXISTS sources (
+    sha256 TEXT PRIMARY KEY,
+    path TEXT,
+    size INTEGER,
+    mtime_ns INTEGER,
+    records INTEGER,
+    loaded_at TEXT
+);
+"""
+
+# Запись заменяется, только если новая не старше сохранённой; запись без даты считается новее
+_UPSERT = """
+INSERT INTO containers (container, suffix, vessel, date, date_key, bill, "order", company, source, updated_at)
+VALUES (:container, :suffix, :vessel, :date, :date_key, :bill, :order, :company, :source, :updated_at)
+ON CONFLICT (container) DO UPDATE SET
+    suffix = excluded.suffix, vessel = excluded.vessel, date = excluded.date, date_key = excluded.date_key,
+    bill = excluded.bill, "order" = excluded."order", company = excluded.company,
+    source = excluded.source, updated_at = excluded.updated_at
+WHERE excluded.date_key IS NULL OR containers.date_key IS NULL OR excluded.date_key >= containers.date_key
+"""
+
+class SuffixIndex(Mapping):
+    def __init__(self, registry):
+        """
+        Индекс «последние 7 символов номера → контейнеры» поверх базы реестра (по запросу, без загрузки в память).
+        Аргументы:
+            registry (ContainerRegistry): Реестр.
+        """
+        self._registry = registry
+
+    def __getitem__(self, suffix):
+        containers = self._registry.containers_by_suffix(suffix)
+        if not containers:
+            raise KeyError(suffix)
+        return tuple(containers)
+
+    def __iter__(self):
+        return iter([row[0] for row in self._registry._query("SELECT DISTINCT suffix FROM containers")])
+
+    def __len__(self):
+        return self._registry._query("SELECT COUNT(DISTINCT suffix) FROM containers")[0][0]
+
+class ContainerRegistry(Mapping):
+    def __init__(self, db_path):
+        """
+        Открывает (или создаёт) базу реестра. Реестр ведёт себя как словарь
+        «полный номер контейнера → запись», но читает записи из базы по запросу.
+        Аргументы:
+            db_path (str): Путь к файлу базы SQLite.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # Соединение используется только под блокировкой, поэтому допускается из разных потоков
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+        self.suffix_index = SuffixIndex(self)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def __getitem__(self, container):
+        rows = self._query(f"SELECT {_COLUMNS} FROM containers WHERE container = ?", (container,))
+        if not rows:
+            raise KeyError(container)
+        return ContainerRecord(*rows[0])
+
+    def __contains__(self, container):
+        return bool(self._query("SELECT 1 FROM containers WHERE container = ?", (container,)))
+
+    def __iter__(self):
+        return iter([row[0] for row in self._query("SELECT container FROM containers")])
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM containers")[0][0]
+
+    def containers_by_suffix(self, suffix):
+        """
+        Возвращает полные номера контейнеров, оканчивающихся на suffix (последние 7 цифр).
+        """
+        return [row[0] for row in self._query("SELECT container FROM containers WHERE suffix = ?", (suffix,))]
+
+    def containers_by_unit(self, unit):
+        """
+        Возвращает контейнеры unit: по заказу для GRAND-TRADE, по коносаменту для остальных компаний.
+        """
+        return [row[0] for row in self._query(
+            """SELECT container FROM containers WHERE "order" = ? AND company = 'GRAND-TRADE'
+               UNION ALL
+               SELECT container FROM containers WHERE bill = ? AND company <> 'GRAND-TRADE'""",
+            (unit, unit))]
+
+    def has_source(self, sha256):
+        """
+        Проверяет, загружалась ли уже книга с таким хэшем содержимого.
+        """
+        return bool(self._query("SELECT 1 FROM sources WHERE sha256 = ?", (sha256,)))
+
+    def upsert(self, records, parse_date, source=None):
+        """
+        Добавляет записи контейнеров: новые вставляются, существующие заменяются,
+        если новая запись не старше сохранённой (даты сравниваются после parse_date).
+        Аргументы:
+            records (iterable): Записи контейнеров (ContainerRecord или словари с полями FIELDS).
+            parse_date (callable): Разбор строки даты в datetime или None.
+            source (dict, optional): Отпечаток книги (см. utils_registry_cache.workbook_fingerprint);
+                запоминается, чтобы та же книга не загружалась повторно.
+        Возвращает:
+            dict: {'inserted', 'updated', 'kept'} — вставлено, обновлено и оставлено без изменений
+                (в реестре запись новее).
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        source_path = source['path'] if source else None
+        parameters = []
+        # Даты в выгрузке сильно повторяются — каждая строка даты разбирается один раз
+        date_keys = {}
+        for record in records:
+            date_key = date_keys.get(record['date'], False)
+            if date_key is False:
+                date = parse_date(record['date'])
+                date_key = date_keys[record['date']] = date.isoformat() if date else None
+            parameters.append({
+                **record,
+                'suffix': record['container'][-7:],
+                'date_key': date_key,
+                'source': source_path,
+                'updated_at': now,
+            })
+        with self._lock, span('ContainerRegistry.upsert', records=len(parameters)):
+            connection = self._connection
+            with connection:
+                before = connection.execute("SELECT COUNT(*) FROM containers").fetchone()[0]
+                changes = connection.total_changes
+                connection.executemany(_UPSERT, parameters)
+                changed = connection.total_changes - changes
+                inserted = connection.execute("SELECT COUNT(*) FROM containers").fetchone()[0] - before
+                if source:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO sources (sha256, path, size, mtime_ns, records, loaded_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (source['sha256'], source_path, source['size'], source['mtime_ns'], len(parameters), now))
+        return {'inserted': inserted, 'updated': changed - inserted, 'kept': len(parameters) - changed}
@@ -1,6 +1,203 @@
-from datetime import datetime
+import os
+import re
+import time as timer
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date, time
+from itertools import repeat
+from types import MappingProxyType
 import pandas as pd
 
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # без calamine потоковое чтение идёт через openpyxl
+    CalamineWorkbook = None
+
+from src.core_tracing import traced
+from src.utils_registry_cache import RegistryCache, workbook_fingerprint
+from src.utils_container_registry import ContainerRegistry
+from src.utils_container_record import ContainerRecord, FIELDS
+from src.utils_registry_sources import source_for_path, source_extensions, is_remote_source, open_remote_source
+
+# Форматы, которые openpyxl читает построчно в режиме read-only
+STREAMING_EXTENSIONS = ('.xlsx', '.xlsm')
+# Книги, которые берутся из папки-источника реестра
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm', '.xls', '.xlsb', '.ods')
+# Разделитель книги и листа в источнике: «registry.xlsx::Январь»
+SHEET_SEPARATOR = '::'
+_NON_DIGITS = re.compile(r'\D')
+
+def split_registry_source(source):
+    """
+    Разбирает источник реестра на книгу и лист.
+    Аргументы:
+        source (str | tuple): «книга», «книга::лист» или кортеж (книга, лист).
+    Возвращает:
+        tuple: (путь, имя листа или None).
+    """
+    if isinstance(source, tuple):
+        return source
+    path, separator, sheet = source.partition(SHEET_SEPARATOR)
+    return path, (sheet or None) if separator else None
+
+def is_multi_source(excel_path):
+    """
+    Проверяет, задан ли реестр несколькими источниками: списком, папкой книг или листом книги.
+    """
+    return isinstance(excel_path, list) or SHEET_SEPARATOR in excel_path or os.path.isdir(excel_path)
+
+def expand_registry_sources(excel_path):
+    """
+    Раскрывает источники реестра в список листов в детерминированном порядке: источники в заданном порядке,
+    книги папки — по имени файла.
+    Аргументы:
+        excel_path (str | list): Книга, папка книг, «книга::лист» или список таких источников.
+    Возвращает:
+        list: Кортежи (путь к книге, имя листа или None — все листы книги).
+    """
+    entries = []
+    for source in (excel_path if isinstance(excel_path, list) else [excel_path]):
+        path, sheet = split_registry_source(source)
+        if os.path.isdir(path):
+            extensions = EXCEL_EXTENSIONS + source_extensions()
+            names = sorted(name for name in os.listdir(path)
+                           if name.lower().endswith(extensions) and not name.startswith('~$'))
+            entries.extend((os.path.join(path, name), None) for name in names)
+        else:
+            entries.append((path, sheet))
+    return entries
+
+def registry_exists(excel_path):
+    """
+    Проверяет, что заданы источники реестра и все книги (папки) существуют; доступность удалённых
+    источников проверяется при загрузке.
+    """
+    if not excel_path:
+        return False
+    sources = excel_path if isinstance(excel_path, list) else [excel_path]
+    return all(is_remote_source(path) or os.path.exists(path)
+               for path in (split_registry_source(source)[0] for source in sources))
+
+def registry_size(excel_path):
+    """
+    Суммарный размер локальных книг реестра в байтах (для телеметрии; удалённые источники не учитываются).
+    """
+    if not isinstance(excel_path, list) and not is_multi_source(excel_path):
+        return 0 if is_remote_source(excel_path) else os.path.getsize(excel_path)
+    return sum(os.path.getsize(path) for path in dict.fromkeys(path for path, _ in expand_registry_sources(excel_path))
+               if not is_remote_source(path))
+
+def registry_key(excel_path):
+    """
+    Описание источников реестра для параметров журнала задачи (абсолютные пути или адреса).
+    """
+    if isinstance(excel_path, list):
+        return [registry_key(source if isinstance(source, str) else SHEET_SEPARATOR.join(source))
+                for source in excel_path]
+    return excel_path if is_remote_source(excel_path) else os.path.abspath(excel_path)
+
+def _cell_text(value):
+    """
+    Приводит значение ячейки к строке так же, как загрузка через pandas: целые числа без «.0»,
+    даты — «ГГГГ-ММ-ДД ЧЧ:ММ:СС», пустые ячейки — пустая строка.
+    Аргументы:
+        value: Значение ячейки (openpyxl или calamine).
+    Возвращает:
+        str: Строка без пробелов по краям.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:
+            return ''
+        if value.is_integer():
+            return str(int(value))
+    elif isinstance(value, datetime):
+        return str(value)
+    elif isinstance(value, date):
+        return str(datetime.combine(value, time()))
+    return str(value).strip()
+
+def _iter_calamine_rows(excel_path, sheet=None):
+    """
+    Строки листа (по умолчанию первого) через calamine (нативный разбор xlsx/xls/xlsb/ods).
+    """
+    workbook = CalamineWorkbook.from_path(excel_path)
+    worksheet = workbook.get_sheet_by_name(sheet) if sheet is not None else workbook.get_sheet_by_index(0)
+    yield from worksheet.iter_rows()
+
+def _iter_openpyxl_rows(excel_path, sheet=None):
+    """
+    Строки листа (по умолчанию первого) через openpyxl в режиме read-only: лист читается потоком,
+    в памяти одновременно находится одна строка.
+    """
+    import openpyxl
+    workbook = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet is not None else workbook.worksheets[0]
+        yield from worksheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+def _list_sheets(excel_path, engine):
+    """
+    Имена листов книги (читается только список листов, без разбора данных).
+    """
+    source = source_for_path(excel_path)
+    if source is not None:
+        return source.sheet_names()
+    engine = DataManager(registry_path='')._select_engine(excel_path, engine)
+    if engine == 'calamine':
+        return CalamineWorkbook.from_path(excel_path).sheet_names
+    if engine == 'openpyxl':
+        import openpyxl
+        workbook = openpyxl.load_workbook(excel_path, read_only=True)
+        try:
+            return workbook.sheetnames
+        finally:
+            workbook.close()
+    with pd.ExcelFile(excel_path) as excel_file:
+        return excel_file.sheet_names
+
+def _load_sheet_task(excel_path, sheet, explicit, engine, use_cache):
+    """
+    Разбирает один лист книги (выполняется в дочернем процессе).
+    Записи возвращаются по столбцам, сообщения журнала — списком для вывода в основном процессе.
+    Лист, выбранный не явно (все листы книги), без нужных столбцов пропускается.
+    """
+    manager = DataManager(registry_path='')
+    messages = []
+    manager._log = messages.append
+    started = timer.perf_counter()
+    result = {'path': excel_path, 'sheet': sheet}
+    try:
+        containers_data, valid_containers, total_rows, cached = manager._read_sheet(excel_path, sheet, engine,
+                                                                                  use_cache)
+    except ValueError as e:
+        if explicit:
+            raise
+        result.update(status='skipped', error=str(e), elapsed_s=timer.perf_counter() - started)
+        return result
+    records = containers_data.values()
+    result.update(status='ok', valid=valid_containers, rows=total_rows, cached=cached, messages=messages,
+                  columns=[[getattr(record, field) for record in records] for field in FIELDS],
+                  elapsed_s=timer.perf_counter() - started)
+    return result
+
+class _InlineExecutor:
+    """
+    Выполнение задач загрузки в текущем процессе (один источник или один рабочий процесс).
+    """
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @staticmethod
+    def map(function, *iterables):
+        return map(function, *iterables)
+
 class DataManager:
     EXCEL_COLUMN_MAPPINGS = {
         'container': ['Номер конт / тс'],
@@ -9,13 +206,41 @@ class DataManager:
         'date': ['Факт дата прибытия порт/свх (поставка)'],
         'bill': ['Коносамент / CMR (поставка)']
     }
+    # Значения для пустых ячеек
+    DEFAULT_VALUES = {
+        'order': "UNKNOWN_ORDER",
+        'vessel': "UNKNOWN_VESSEL",
+        'date': "UNKNOWN_DATE",
+        'bill': "UNKNOWN_BILL",
+    }
+    # Способ чтения Excel: 'auto', 'calamine', 'openpyxl' (потоковое чтение) или 'pandas'
+    EXCEL_ENGINE = 'auto'
+    # Кэш разобранного реестра (см. utils_registry_cache); версия увеличивается при изменении разбора
+    USE_CACHE = True
+    CACHE_VERSION = 1
+    # Файл накопительного реестра SQLite (см. utils_container_registry); None — реестр в памяти
+    REGISTRY_PATH = None
+    # Процессов для разбора нескольких книг и листов; 0 — по числу ядер
+    LOAD_WORKERS = 0
     
-    def __init__(self):
+    def __init__(self, registry_path=None):
         """
         Инициализация менеджера данных: создаёт структуры для хранения контейнеров и их распределения по юнитам.
+        Аргументы:
+            registry_path (str, optional): Файл накопительного реестра SQLite; по умолчанию REGISTRY_PATH,
+                пустая строка — без реестра. С реестром загруженные книги добавляются к ранее загруженным,
+                а данные читаются из базы.
         """
-        self.latest_container_data = {}
-        self.containers_by_unit = {}
+        if registry_path is None:
+            registry_path = self.REGISTRY_PATH
+        # Отчёт о последней загрузке по источникам (см. load_excel_sources)
+        self.load_report = []
+        self.registry = ContainerRegistry(registry_path) if registry_path else None
+        self.latest_container_data = self.registry if self.registry is not None else {}
+        # Производные индексы (см. process_data): неизменяемые, общие для всех этапов
+        self.containers_by_suffix = MappingProxyType({})
+        self.containers_by_unit = MappingProxyType({})
+        self.unit_by_container = MappingProxyType({})
 
     def _log(self, message):
         """
@@ -42,7 +267,8 @@ class DataManager:
 
     def _parse_date(self, date_str):
         """
-        Пытается распарсить строку с датой в одном из нескольких форматов.
+        Пытается распарсить строку с датой в одном из нескольких форматов; допускается время после даты
+        («01.02.2024 10:30», «2024-02-01 00:00:00»).
         Аргументы:
             date_str (str): Строка с датой.
         Возвращает:
@@ -51,14 +277,17 @@ class DataManager:
         formats = [
             "%d.%m.%Y",
             "%Y-%m-%d",
+            "%d-%m-%Y",
             "%d/%m/%Y",
             "%m/%d/%Y"
         ]
+        text = str(date_str).strip()
         for fmt in formats:
-            try:
-                return datetime.strptime(str(date_str).strip(), fmt)
-            except ValueError:
-                continue
+            for time_format in ("", " %H:%M:%S", " %H:%M"):
+                try:
+                    return datetime.strptime(text, fmt + time_format)
+                except ValueError:
+                    continue
         return None
 
     def _extract_container_number(self, container_str):
@@ -76,113 +305,440 @@ class DataManager:
             return digits[-7:]
         return None
 
-    def load_excel_data(self, excel_path):
+    def _resolve_columns(self, columns):
+        """
+        Находит обязательные столбцы по EXCEL_COLUMN_MAPPINGS.
+        Аргументы:
+            columns (list): Названия столбцов из заголовка листа.
+        Возвращает:
+            dict: Ключ (container, order, ...) → индекс столбца.
+        Исключения:
+            ValueError: Если не найден хотя бы один обязательный столбец.
+        """
+        column_indices = {}
+        for key, possible_names in self.EXCEL_COLUMN_MAPPINGS.items():
+            idx = self._find_column_index(columns, possible_names)
+            if idx is None:
+                self._log(f"ОШИБКА: Не найден столбец для {key}. Возможные имена: {possible_names}")
+                raise ValueError(f"Не найден столбец для {key}. Возможные имена: {possible_names}")
+            column_indices[key] = idx
+            self._log(f"Найден столбец {key}: {columns[idx]}")
+        return column_indices
+
+    @staticmethod
+    def _text_column(series, default=None):
+        """
+        Приводит столбец к строкам так же, как _cell_text для каждой ячейки.
+        Аргументы:
+            series (pd.Series): Столбец листа.
+            default (str, optional): Значение для пустых ячеек и пустых строк.
+        Возвращает:
+            pd.Series: Строки (пустые ячейки — default или NaN).
+        """
+        if series.dtype.kind == 'f':
+            # Целые числа в столбце с пустыми ячейками pandas хранит как float — убираем «.0»
+            text = series.map(lambda value: str(int(value)) if value.is_integer() else str(value), na_action='ignore')
+        else:
+            text = series.map(str, na_action='ignore').str.strip()
+        if default is None:
+            return text
+        return text.where(text.notna() & (text != ''), default)
+
+    def _select_engine(self, excel_path, engine=None):
+        """
+        Выбирает способ чтения: calamine, если установлен; иначе потоковое чтение openpyxl для xlsx/xlsm;
+        для остальных форматов — pandas.
+        Аргументы:
+            excel_path (str): Путь к Excel-файлу.
+            engine (str, optional): Явно заданный способ; по умолчанию EXCEL_ENGINE.
+        Возвращает:
+            str: 'calamine', 'openpyxl' или 'pandas'.
+        Исключения:
+            ValueError: Если задан calamine, но он не установлен, или способ неизвестен.
+        """
+        engine = engine or self.EXCEL_ENGINE
+        if engine == 'auto':
+            if CalamineWorkbook is not None:
+                return 'calamine'
+            if os.path.splitext(excel_path)[1].lower() in STREAMING_EXTENSIONS:
+                return 'openpyxl'
+            return 'pandas'
+        if engine == 'calamine' and CalamineWorkbook is None:
+            raise ValueError("Пакет python-calamine не установлен")
+        if engine not in ('calamine', 'openpyxl', 'pandas'):
+            raise ValueError(f"Неизвестный способ чтения Excel: {engine}")
+        return engine
+
+    def _load_frame(self, excel_path, sheet=None):
+        """
+        Загружает реестр через pandas: читаются только нужные столбцы, обработка — по столбцам целиком.
+        Аргументы:
+            excel_path (str): Путь к Excel-файлу.
+            sheet (str, optional): Имя листа; по умолчанию первый лист.
+        Возвращает:
+            tuple: (данные по контейнерам, число строк с валидным номером контейнера, число непустых строк).
+        """
+        sheet_name = sheet if sheet is not None else 0
+        with pd.ExcelFile(excel_path) as excel_file:
+            # Сначала только заголовок — по нему определяются нужные столбцы
+            columns = pd.read_excel(excel_file, sheet_name=sheet_name, nrows=0).columns.tolist()
+            self._log(f"Колонки в файле: {columns}")
+            column_indices = self._resolve_columns(columns)
+
+            usecols = sorted(set(column_indices.values()))
+            df = pd.read_excel(excel_file, sheet_name=sheet_name, usecols=usecols)
+            total_rows = int(df.notna().any(axis=1).sum())
+            self._log(f"Прочитано строк: {total_rows}")
+            # Столбцы результата идут в порядке usecols — обращаемся к ним по позиции
+            column = {key: df.iloc[:, usecols.index(idx)] for key, idx in column_indices.items()}
+
+        # Номер контейнера должен содержать не меньше 7 цифр; ключ unit — последние 7
+        containers = self._text_column(column['container'])
+        digits = containers.str.replace(r'\D', '', regex=True)
+        valid = (digits.str.len() >= 7).fillna(False).astype(bool)
+
+        records = pd.DataFrame({
+            "vessel": self._text_column(column['vessel'], self.DEFAULT_VALUES['vessel']),
+            "date": self._text_column(column['date'], self.DEFAULT_VALUES['date']),
+            "bill": self._text_column(column['bill'], self.DEFAULT_VALUES['bill']),
+            "order": self._text_column(column['order'], self.DEFAULT_VALUES['order']),
+            "container": containers,
+        })[valid]
+        records["company"] = "GRAND-TRADE"
+        # При повторах номера контейнера побеждает последняя строка
+        values = zip(*(records[field].tolist() for field in FIELDS))
+        return ({record.container: record for record in (ContainerRecord(*row) for row in values)},
+                len(records), total_rows)
+
+    def _load_rows(self, rows):
+        """
+        Загружает реестр построчно: из каждой строки берутся только нужные ячейки,
+        реестр пополняется по мере чтения (память не зависит от числа строк листа).
+        Аргументы:
+            rows (iterator): Строки листа (первая — заголовок).
+        Возвращает:
+            tuple: (данные по контейнерам, число строк с валидным номером контейнера, число непустых строк).
+        Исключения:
+            ValueError: Если лист пуст или не найден обязательный столбец.
+        """
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("Лист Excel пуст")
+        columns = list(header)
+        self._log(f"Колонки в файле: {columns}")
+        column_indices = self._resolve_columns(columns)
+        container_index = column_indices['container']
+        fields = [(column_indices[key], self.DEFAULT_VALUES[key]) for key in ('vessel', 'date', 'bill', 'order')]
+
+        containers_data = {}
+        total_rows = 0
+        valid_containers = 0
+        for row in rows:
+            if not any(value is not None and value != '' for value in row):
+                continue
+            total_rows += 1
+            container_full = _cell_text(row[container_index]) if container_index < len(row) else ''
+            # Номер контейнера должен содержать не меньше 7 цифр; ключ unit — последние 7
+            if len(_NON_DIGITS.sub('', container_full)) < 7:
+                continue
+            vessel, date, bill, order = [(_cell_text(row[index]) if index < len(row) else '') or default
+                                         for index, default in fields]
+            # При повторах номера контейнера побеждает последняя строка
+            containers_data[container_full] = ContainerRecord(vessel, date, bill, order, container_full, "GRAND-TRADE")
+            valid_containers += 1
+        self._log(f"Прочитано строк: {total_rows}")
+        return containers_data, valid_containers, total_rows
+
+    def _read_sheet(self, excel_path, sheet=None, engine=None, use_cache=None, fingerprint=None):
         """
-        Загружает и обрабатывает данные контейнеров из Excel-файла. Извлекаются только необходимые столбцы.
+        Читает записи одного листа книги; если книга не менялась, записи берутся из кэша.
         Аргументы:
             excel_path (str): Путь к Excel-файлу.
+            sheet (str, optional): Имя листа; по умолчанию первый лист.
+            engine (str, optional): Способ чтения (см. EXCEL_ENGINE).
+            use_cache (bool, optional): Использовать кэш разобранного реестра; по умолчанию USE_CACHE.
+            fingerprint (dict, optional): Уже вычисленный отпечаток книги.
+        Возвращает:
+            tuple: (данные по контейнерам, число строк с валидным номером контейнера,
+                число прочитанных непустых строк (0, если записи взяты из кэша), взяты ли из кэша).
+        Исключения:
+            ValueError: Если лист пуст или не найден хотя бы один обязательный столбец.
+        """
+        use_cache = self.USE_CACHE if use_cache is None else use_cache
+        cache = RegistryCache(version=self.CACHE_VERSION) if use_cache else None
+        if use_cache and fingerprint is None:
+            # Отпечаток снимается до чтения: если книга изменится во время разбора, кэш не совпадёт
+            fingerprint = workbook_fingerprint(excel_path)
+        containers_data = cache.load(fingerprint, sheet) if use_cache else None
+        if containers_data is not None:
+            self._log("Реестр загружен из кэша (файл не изменился)")
+            return containers_data, len(containers_data), 0, True
+        source = source_for_path(excel_path)
+        engine = source.name if source is not None else self._select_engine(excel_path, engine)
+        self._log(f"Способ чтения: {engine}")
+        if source is not None:
+            containers_data, valid_containers, total_rows = self._load_rows(iter(source.iter_rows(sheet)))
+        elif engine == 'pandas':
+            containers_data, valid_containers, total_rows = self._load_frame(excel_path, sheet)
+        elif engine == 'calamine':
+            containers_data, valid_containers, total_rows = self._load_rows(_iter_calamine_rows(excel_path, sheet))
+        else:
+            containers_data, valid_containers, total_rows = self._load_rows(_iter_openpyxl_rows(excel_path, sheet))
+        if use_cache:
+            try:
+                cache.store(fingerprint, containers_data, sheet)
+            except OSError as e:
+                self._log(f"Не удалось сохранить кэш реестра: {e}")
+        return containers_data, valid_containers, total_rows, False
+
+    def _fetch_remote(self, sources):
+        """
+        Заменяет адреса удалённых источников (см. utils_registry_sources) путями к их локальным снимкам;
+        снимки обновляются условными запросами. Локальные источники возвращаются без изменений.
+        Аргументы:
+            sources (str | tuple | list): Источник реестра или список источников.
+        Возвращает:
+            str | tuple | list: Те же источники, адреса заменены снимками.
+        """
+        if isinstance(sources, list):
+            return [self._fetch_remote(source) for source in sources]
+        path, sheet = split_registry_source(sources)
+        if not is_remote_source(path):
+            return sources
+        snapshot = open_remote_source(path).fetch(self._log)
+        return snapshot if sheet is None else (snapshot, sheet)
+
+    def _merge_records(self, target, records):
+        """
+        Добавляет записи к target по правилу разрешения конфликтов: при совпадении номера контейнера
+        побеждает запись с более поздней датой прибытия; при равных или нераспознанных датах —
+        добавляемая (то есть из источника, идущего позже). Так же работает накопительный реестр SQLite.
+        Аргументы:
+            target (dict): Записи по номеру контейнера; дополняется на месте.
+            records (iterable): Добавляемые записи (ContainerRecord).
+        Возвращает:
+            tuple: (число конфликтов, из них заменено записей).
+        """
+        dates = {}
+
+        def parsed(value):
+            if value not in dates:
+                dates[value] = self._parse_date(value)
+            return dates[value]
+
+        conflicts = replaced = 0
+        for record in records:
+            existing = target.get(record.container)
+            if existing is not None:
+                conflicts += 1
+                new_date, old_date = parsed(record.date), parsed(existing.date)
+                if new_date is not None and old_date is not None and new_date < old_date:
+                    continue
+                replaced += 1
+            target[record.container] = record
+        return conflicts, replaced
+
+    def _store_loaded(self, containers_data, fingerprint=None):
+        """
+        Сохраняет загруженные записи: в накопительный реестр SQLite или вместо данных в памяти.
+        """
+        if self.registry is not None:
+            counts = self.registry.upsert(containers_data.values(), self._parse_date, fingerprint)
+            self._log(f"Реестр {self.registry.db_path}: добавлено {counts['inserted']}, "
+                      f"обновлено {counts['updated']}, оставлено более новых записей {counts['kept']}")
+        else:
+            # Сохраняем последние данные по контейнерам (ключ — полный номер контейнера)
+            self.latest_container_data.clear()
+            self.latest_container_data.update(containers_data)
+
+    @traced('load_excel_data')
+    def load_excel_data(self, excel_path, engine=None, use_cache=None, workers=None):
+        """
+        Загружает и обрабатывает данные контейнеров из Excel-файла. Читаются только необходимые столбцы.
+        Большие xlsx читаются потоком (calamine, если установлен, иначе openpyxl read-only),
+        остальные форматы — через pandas. Пустые ячейки заказа, судна, даты и коносамента
+        заменяются на UNKNOWN_ORDER, UNKNOWN_VESSEL, UNKNOWN_DATE и UNKNOWN_BILL.
+        Если книга не менялась с прошлой загрузки, записи берутся из кэша без разбора файла.
+        Папка книг, лист книги («книга::лист») или список источников загружаются через load_excel_sources.
+        CSV-выгрузки и таблицы по адресу http(s):// читаются через utils_registry_sources.
+        Аргументы:
+            excel_path (str | list): Путь к Excel-файлу (первый лист), CSV-файлу, адрес таблицы
+                или источники реестра.
+            engine (str, optional): Способ чтения (см. EXCEL_ENGINE).
+            use_cache (bool, optional): Использовать кэш разобранного реестра; по умолчанию USE_CACHE.
+            workers (int, optional): Процессов для нескольких источников (см. LOAD_WORKERS).
         Исключения:
             ValueError: Если не найден хотя бы один обязательный столбец.
             Exception: Критические ошибки при обработке файла.
         """
+        if is_multi_source(excel_path):
+            return self.load_excel_sources(excel_path, engine, use_cache, workers)
         self._log(f"Загрузка Excel файла: {excel_path}")
         
         try:
-            with pd.ExcelFile(excel_path) as excel_file:
-                df = pd.read_excel(excel_file)
-                self._log(f"Прочитано строк: {len(df)}")
-                self._log(f"Колонки в файле: {df.columns.tolist()}")
-
-                columns = df.columns.tolist()
-                column_indices = {}
-                
-                for key, possible_names in self.EXCEL_COLUMN_MAPPINGS.items():
-                    idx = self._find_column_index(columns, possible_names)
-                    if idx is None:
-                        self._log(f"ОШИБКА: Не найден столбец для {key}. Возможные имена: {possible_names}")
-                        raise ValueError(f"Не найден столбец для {key}. Возможные имена: {possible_names}")
-                    column_indices[key] = idx
-                    self._log(f"Найден столбец {key}: {columns[idx]}")
-
-                processed_rows = 0
-                valid_containers = 0
-                containers_data = {}
-                
-                for idx, row in df.iterrows():
-                    try:
-                        container_full = str(row[columns[column_indices['container']]]).strip()
-                        if not container_full or pd.isna(container_full):
-                            continue
-
-                        # Извлекаем последние 7 цифр номера контейнера
-                        digits = ''.join(c for c in container_full if c.isdigit())
-                        if len(digits) < 7:
-                            continue
-                            
-                        container_suffix = digits[-7:]
-                        
-                        order = str(row[columns[column_indices['order']]]).strip()
-                        order = order if order and not pd.isna(order) else "UNKNOWN_ORDER"
-                        
-                        vessel = str(row[columns[column_indices['vessel']]]).strip()
-                        vessel = vessel if vessel and not pd.isna(vessel) else "UNKNOWN_VESSEL"
-                        
-                        date = str(row[columns[column_indices['date']]]).strip()
-                        date = date if date and not pd.isna(date) else "UNKNOWN_DATE"
-                        
-                        bill = str(row[columns[column_indices['bill']]]).strip()
-                        bill = bill if bill and not pd.isna(bill) else "UNKNOWN_BILL"
-
-                        data_row = {
-                            "vessel": vessel,
-                            "date": date,
-                            "bill": bill,
-                            "order": order,
-                            "container": container_full,
-                            "company": "GRAND-TRADE"
-                        }
-
-                        if container_suffix not in containers_data:
-                            containers_data[container_suffix] = []
-                        containers_data[container_suffix].append(data_row)
-                        valid_containers += 1
-                        processed_rows += 1
-
-                    except Exception as e:
-                        self._log(f"Ошибка при обработке строки {idx + 1}: {str(e)}")
-
-                # Сохраняем последние данные по контейнерам (ключ — полный номер контейнера)
-                self.latest_container_data.clear()
-                for container_suffix, container_list in containers_data.items():
-                    for data_row in container_list:
-                        self.latest_container_data[data_row["container"]] = data_row
-
-                self._log(f"\nИтоги обработки:")
-                self._log(f"Всего обработано строк: {processed_rows}")
-                self._log(f"Найдено валидных контейнеров: {valid_containers}")
-                self._log(f"Уникальных контейнеров: {len(self.latest_container_data)}")
+            excel_path = self._fetch_remote(excel_path)
+            use_cache = self.USE_CACHE if use_cache is None else use_cache
+            fingerprint = workbook_fingerprint(excel_path) if use_cache or self.registry is not None else None
+            if self.registry is not None and self.registry.has_source(fingerprint['sha256']):
+                self._log(f"Книга уже загружена в реестр {self.registry.db_path}; "
+                          f"контейнеров в реестре: {len(self.registry)}")
+                self.process_data()
+                return
+            containers_data, valid_containers, total_rows, cached = self._read_sheet(
+                excel_path, None, engine, use_cache, fingerprint)
+            self._store_loaded(containers_data, fingerprint)
+
+            self._log(f"\nИтоги обработки:")
+            if not cached:
+                self._log(f"Всего обработано строк: {total_rows}")
+                self._log(f"Отброшено строк без валидного номера контейнера: {total_rows - valid_containers}")
+            self._log(f"Найдено валидных контейнеров: {valid_containers}")
+            self._log(f"Уникальных контейнеров: {len(self.latest_container_data)}")
+            self.process_data()
+
+        except Exception as e:
+            self._log(f"Критическая ошибка при обработке файла: {str(e)}")
+            raise
+
+    @traced('load_excel_sources')
+    def load_excel_sources(self, sources, engine=None, use_cache=None, workers=None):
+        """
+        Загружает реестр из нескольких книг и листов и объединяет их в один. Листы разбираются параллельно
+        в дочерних процессах, а объединяются в основном процессе в порядке источников (см. _merge_records),
+        поэтому результат не зависит от того, какой лист разобран раньше. Время разбора каждого листа
+        выводится в журнал и сохраняется в load_report.
+        Аргументы:
+            sources (str | list): Папка книг (все книги по имени файла), книга (все листы с нужными столбцами),
+                «книга::лист», кортеж (книга, лист), CSV-файл, адрес таблицы или список таких источников.
+            engine (str, optional): Способ чтения (см. EXCEL_ENGINE).
+            use_cache (bool, optional): Использовать кэш разобранного реестра; по умолчанию USE_CACHE.
+            workers (int, optional): Число процессов; по умолчанию LOAD_WORKERS (0 — по числу ядер).
+        Исключения:
+            ValueError: Если книги не найдены, ни один лист не содержит нужных столбцов
+                или в явно указанном листе их нет.
+            Exception: Критические ошибки при обработке файлов.
+        """
+        self._log(f"Загрузка реестра из источников: {sources}")
+        started = timer.perf_counter()
+        try:
+            # Настройки класса передаются явно: дочерние процессы их не наследуют
+            use_cache = self.USE_CACHE if use_cache is None else use_cache
+            engine = engine or self.EXCEL_ENGINE
+            entries = expand_registry_sources(self._fetch_remote(sources))
+            if not entries:
+                raise ValueError(f"Не найдено книг Excel: {sources}")
+            fingerprints = {}
+            if self.registry is not None:
+                for path in dict.fromkeys(path for path, _ in entries):
+                    fingerprints[path] = workbook_fingerprint(path)
+                    if self.registry.has_source(fingerprints[path]['sha256']):
+                        self._log(f"Книга уже загружена в реестр: {path}")
+                        del fingerprints[path]
+                entries = [(path, sheet) for path, sheet in entries if path in fingerprints]
+
+            # Список листов читается в текущем процессе: по нему видно, нужен ли пул
+            sheet_names = {path: _list_sheets(path, engine) for path, sheet in entries if sheet is None}
+            tasks = []
+            for path, sheet in entries:
+                if sheet is None:
+                    tasks.extend((path, name, False) for name in sheet_names[path])
+                else:
+                    tasks.append((path, sheet, True))
+
+            workers = workers if workers is not None else self.LOAD_WORKERS
+            workers = min(workers or os.cpu_count() or 1, len(tasks))
+            if workers > 1:
+                # spawn: дочерние процессы не наследуют потоки и блокировки интерфейса
+                executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                # Один лист быстрее разобрать здесь, чем запускать процесс и передавать записи
+                executor = _InlineExecutor()
+            with executor:
+                self._log(f"Книг: {len(dict.fromkeys(path for path, _ in entries))}, листов: {len(tasks)}, "
+                          f"процессов: {workers if isinstance(executor, ProcessPoolExecutor) else 1}")
+                results = list(executor.map(_load_sheet_task, *zip(*tasks), repeat(engine), repeat(use_cache))) \
+                    if tasks else []
+
+            self.load_report = []
+            merged = {}
+            by_workbook = {}
+            conflicts = replaced = valid_containers = total_rows = rejected = 0
+            for result in results:
+                name = f"{os.path.basename(result['path'])} [{result['sheet']}]"
+                report = {key: result[key] for key in ('path', 'sheet', 'status', 'elapsed_s')}
+                self.load_report.append(report)
+                if result['status'] != 'ok':
+                    self._log(f"{name}: лист пропущен ({result['error']})")
+                    continue
+                for message in result['messages']:
+                    self._log(message)
+                records = [ContainerRecord(*values) for values in zip(*result['columns'])]
+                report.update(containers=result['valid'], cached=result['cached'])
+                valid_containers += result['valid']
+                if not result['cached']:
+                    total_rows += result['rows']
+                    rejected += result['rows'] - result['valid']
+                target = by_workbook.setdefault(result['path'], {}) if self.registry is not None else merged
+                source_conflicts, source_replaced = self._merge_records(target, records)
+                conflicts += source_conflicts
+                replaced += source_replaced
+                self._log(f"{name}: контейнеров {result['valid']}, {result['elapsed_s']:.2f} с"
+                          f"{' (из кэша)' if result['cached'] else ''}")
+            if results and not any(result['status'] == 'ok' for result in results):
+                raise ValueError("Ни один лист не содержит обязательных столбцов")
+
+            if self.registry is not None:
+                for path, containers_data in by_workbook.items():
+                    self._store_loaded(containers_data, fingerprints[path])
+            else:
+                self._store_loaded(merged)
+
+            self._log(f"\nИтоги обработки:")
+            self._log(f"Всего обработано строк: {total_rows}")
+            self._log(f"Отброшено строк без валидного номера контейнера: {rejected}")
+            self._log(f"Найдено валидных контейнеров: {valid_containers}")
+            self._log(f"Совпадений номеров между источниками: {conflicts}, заменено записей: {replaced}")
+            self._log(f"Уникальных контейнеров: {len(self.latest_container_data)}")
+            self._log(f"Время загрузки: {timer.perf_counter() - started:.2f} с")
+            self.process_data()
 
         except Exception as e:
             self._log(f"Критическая ошибка при обработке файла: {str(e)}")
             raise
 
+    def _unit_of(self, row):
+        """
+        Ключ unit записи (ContainerRecord): заказ для GRAND-TRADE, иначе коносамент.
+        """
+        if row.company == "GRAND-TRADE":
+            return row.order or self.DEFAULT_VALUES['order']
+        return row.bill or self.DEFAULT_VALUES['bill']
+
     def process_data(self):
         """
-        Организует контейнеры по юнитам (заказ или коносамент) для дальнейшей обработки.
+        Строит за один проход производные индексы: последние 7 символов номера → контейнеры,
+        unit (заказ или коносамент) → контейнеры, контейнер → unit. Вызывается после загрузки данных;
+        индексы неизменяемы и используются всеми этапами без перестроения.
+        С реестром SQLite индексы — запросы к базе.
         """
-        self.containers_by_unit = {}
+        if self.registry is not None:
+            self.containers_by_suffix = self.registry.suffix_index
+            self.containers_by_unit = MappingProxyType({})
+            self.unit_by_container = MappingProxyType({})
+            return
+        containers_by_suffix = {}
+        containers_by_unit = {}
+        unit_by_container = {}
         for container, row in self.latest_container_data.items():
-            try:
-                company = row["company"]
-                unit = row["order"] if company == "GRAND-TRADE" else row["bill"]
-                if not unit:
-                    continue
-                if unit not in self.containers_by_unit:
-                    self.containers_by_unit[unit] = []
-                if container not in self.containers_by_unit[unit]:
-                    self.containers_by_unit[unit].append(container)
-            except Exception as e:
-                self._log(f"Ошибка при обработке контейнера {container}: {e}")
+            unit = self._unit_of(row)
+            containers_by_suffix.setdefault(container[-7:], []).append(container)
+            containers_by_unit.setdefault(unit, set()).add(container)
+            unit_by_container[container] = unit
+        self.containers_by_suffix = MappingProxyType(
+            {suffix: tuple(containers) for suffix, containers in containers_by_suffix.items()})
+        self.containers_by_unit = MappingProxyType(
+            {unit: frozenset(containers) for unit, containers in containers_by_unit.items()})
+        self.unit_by_container = MappingProxyType(unit_by_container)
 
     def get_container_data(self, container):
         """
@@ -190,16 +746,31 @@ class DataManager:
         Аргументы:
             container (str): Полный номер контейнера.
         Возвращает:
-            dict или None: Словарь с данными по контейнеру или None, если не найден.
+            ContainerRecord или None: Данные по контейнеру (доступ как у словаря) или None, если не найден.
         """
         return self.latest_container_data.get(container)
 
+    def get_unit(self, container):
+        """
+        Получить ключ unit контейнера (заказ для GRAND-TRADE, иначе коносамент).
+        Аргументы:
+            container (str): Полный номер контейнера.
+        Возвращает:
+            str или None: Ключ unit или None, если контейнер не найден.
+        """
+        if self.registry is not None:
+            row = self.registry.get(container)
+            return self._unit_of(row) if row is not None else None
+        return self.unit_by_container.get(container)
+
     def get_containers_by_unit(self, unit):
         """
-        Получить список контейнеров, связанных с юнитом (заказом или коносаментом).
+        Получить контейнеры, связанные с юнитом (заказом или коносаментом).
         Аргументы:
             unit (str): Идентификатор юнита (заказ или коносамент).
         Возвращает:
-            list: Список номеров контейнеров для юнита или пустой список, если не найдено.
+            frozenset: Номера контейнеров юнита или пустое множество, если не найдено.
         """
-        return self.containers_by_unit.get(unit, [])
+        if self.registry is not None:
+            return frozenset(self.registry.containers_by_unit(unit))
+        return self.containers_by_unit.get(unit, frozenset())
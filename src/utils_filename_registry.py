@@ -0,0 +1,173 @@
+"""
+Реестр имён файлов на время одного запуска.
+Каждая целевая папка читается один раз, дальше занятые имена отслеживаются в памяти,
+поэтому уникальное имя выдаётся без повторных проверок os.path.exists (важно для сетевых папок).
+Имя закрепляется на диске созданием пустого файла с флагом O_EXCL, что защищает
+от гонок с другими процессами, пишущими в ту же папку.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+from src.core_journal import atomic_write
+from src.core_tracing import span
+
+class FilenameRegistry:
+    def __init__(self, journal=None):
+        """
+        Инициализация реестра: папки загружаются лениво при первом обращении.
+        Аргументы:
+            journal (JobJournal, optional): Журнал задачи. Закреплённые имена записываются в него,
+                а пустые файлы, оставшиеся от прерванного запуска, удаляются.
+        """
+        self._directories = {}
+        self._lock = threading.Lock()
+        self.journal = journal
+        if journal is not None:
+            for path in journal.pending_reservations():
+                try:
+                    if os.path.getsize(path) == 0:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _key(name):
+        # На Windows имена файлов нечувствительны к регистру
+        return os.path.normcase(name)
+
+    def _entry(self, directory):
+        """
+        Возвращает состояние папки, при первом обращении читает её содержимое.
+        Аргументы:
+            directory (str): Путь к папке.
+        Возвращает:
+            dict: {'taken': set занятых имён, 'counters': dict следующих индексов по базовому имени}.
+        """
+        dir_key = os.path.normcase(os.path.abspath(directory))
+        entry = self._directories.get(dir_key)
+        if entry is None:
+            try:
+                taken = {self._key(name) for name in os.listdir(directory)}
+            except FileNotFoundError:
+                taken = set()
+            entry = {'taken': taken, 'counters': {}}
+            self._directories[dir_key] = entry
+        return entry
+
+    def _next_name(self, entry, original_name):
+        """
+        Подбирает свободное имя, добавляя индекс " (N)" к дубликатам, и помечает его занятым.
+        """
+        taken = entry['taken']
+        if self._key(original_name) not in taken:
+            taken.add(self._key(original_name))
+            return original_name
+
+        name, ext = os.path.splitext(original_name)
+        counter = entry['counters'].get(self._key(original_name), 2)
+        new_name = f"{name} ({counter}){ext}"
+        while self._key(new_name) in taken:
+            counter += 1
+            new_name = f"{name} ({counter}){ext}"
+        entry['counters'][self._key(original_name)] = counter + 1
+        taken.add(self._key(new_name))
+        return new_name
+
+    def allocate(self, directory, original_name):
+        """
+        Выдаёт уникальное имя в папке без создания файла.
+        Аргументы:
+            directory (str): Целевая папка.
+            original_name (str): Желаемое имя файла.
+        Возвращает:
+            str: Уникальное имя (исходное или с индексом " (N)").
+        """
+        with self._lock:
+            return self._next_name(self._entry(directory), original_name)
+
+    def reserve(self, directory, original_name):
+        """
+        Выдаёт уникальное имя и закрепляет его на диске пустым файлом (O_EXCL).
+        Если имя успел занять другой процесс, берётся следующее.
+        Аргументы:
+            directory (str): Целевая папка.
+            original_name (str): Желаемое имя файла.
+        Возвращает:
+            str: Закреплённое имя файла.
+        """
+        with self._lock:
+            entry = self._entry(directory)
+            while True:
+                new_name = self._next_name(entry, original_name)
+                try:
+                    fd = os.open(os.path.join(directory, new_name), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except FileExistsError:
+                    continue
+                os.close(fd)
+                if self.journal is not None:
+                    self.journal.record('reserved', os.path.join(directory, new_name))
+                return new_name
+
+    def release(self, directory, name):
+        """
+        Удаляет закреплённый пустой файл, если запись не удалась. Имя остаётся занятым до конца запуска.
+        Аргументы:
+            directory (str): Папка.
+            name (str): Имя, полученное из reserve.
+        """
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+    def move_into(self, src_path, directory, original_name):
+        """
+        Перемещает файл в папку под уникальным именем, не перезаписывая чужие файлы.
+        Аргументы:
+            src_path (str): Исходный файл.
+            directory (str): Целевая папка.
+            original_name (str): Желаемое имя файла.
+        Возвращает:
+            str: Имя, под которым файл сохранён.
+        """
+        new_name = self.reserve(directory, original_name)
+        try:
+            with span('os.replace', path=src_path):
+                os.replace(src_path, os.path.join(directory, new_name))
+        except Exception:
+            self.release(directory, new_name)
+            raise
+        self.commit(directory, new_name)
+        return new_name
+
+    @contextmanager
+    def write_atomic(self, directory, original_name):
+        """
+        Закрепляет уникальное имя и открывает временный файл, который после записи
+        атомарно заменяет закреплённый. Недописанные файлы в папке не остаются.
+        Аргументы:
+            directory (str): Целевая папка.
+            original_name (str): Желаемое имя файла.
+        Возвращает:
+            tuple: (имя файла, бинарный файловый объект для записи).
+        """
+        new_name = self.reserve(directory, original_name)
+        try:
+            with atomic_write(os.path.join(directory, new_name)) as f:
+                yield new_name, f
+        except BaseException:
+            self.release(directory, new_name)
+            raise
+        self.commit(directory, new_name)
+
+    def commit(self, directory, name):
+        """
+        Отмечает в журнале, что закреплённый файл записан полностью (для записи вне write_atomic,
+        например в дочернем процессе).
+        Аргументы:
+            directory (str): Папка.
+            name (str): Имя, полученное из reserve.
+        """
+        if self.journal is not None:
+            self.journal.record('committed', os.path.join(directory, name))
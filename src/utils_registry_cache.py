@@ -0,0 +1,105 @@
+"""
+Кэш разобранного реестра Excel в %APPDATA%/qManager/cache/registry.
+Записи контейнеров хранятся по столбцам (список ключей и список значений каждого поля) в двоичном
+формате pickle (одинаковые строки записываются один раз), поэтому загрузка занимает миллисекунды
+против секунд разбора xlsx.
+Кэш действителен, пока совпадает отпечаток книги: путь, размер, время изменения и хэш содержимого.
+"""
+import os
+import pickle
+import hashlib
+
+from src.core_settings import get_app_data_dir
+from src.core_journal import atomic_write
+from src.core_tracing import span
+from src.utils_container_record import ContainerRecord, FIELDS
+
+# Формат файла кэша; увеличивается при изменении структуры
+CACHE_FORMAT = 2
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def workbook_fingerprint(excel_path):
+    """
+    Вычисляет отпечаток книги Excel.
+    Аргументы:
+        excel_path (str): Путь к файлу.
+    Возвращает:
+        dict: {'path', 'size', 'mtime_ns', 'sha256'}.
+    """
+    stat = os.stat(excel_path)
+    digest = hashlib.sha256()
+    with span('registry_cache.hash', path=excel_path):
+        with open(excel_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return {
+        'path': os.path.normcase(os.path.abspath(excel_path)),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest.hexdigest(),
+    }
+
+class RegistryCache:
+    def __init__(self, cache_dir=None, version=None):
+        """
+        Инициализация кэша реестров.
+        Аргументы:
+            cache_dir (str, optional): Папка кэша; по умолчанию %APPDATA%/qManager/cache/registry.
+            version (str, optional): Версия разбора реестра; кэш другой версии считается устаревшим.
+        """
+        self.cache_dir = cache_dir or get_app_data_dir('cache', 'registry')
+        self.version = version
+
+    def path_for(self, excel_path, sheet=None):
+        """
+        Возвращает путь к файлу кэша листа книги (один файл на лист, перезаписывается при изменении книги).
+        """
+        key = os.path.normcase(os.path.abspath(excel_path))
+        if sheet is not None:
+            key = f"{key}::{sheet}"
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.pickle')
+
+    def load(self, fingerprint, sheet=None):
+        """
+        Загружает записи контейнеров, если отпечаток и версия совпадают.
+        Аргументы:
+            fingerprint (dict): Отпечаток книги (см. workbook_fingerprint).
+            sheet (str, optional): Имя листа; None — первый лист.
+        Возвращает:
+            dict | None: Записи по номеру контейнера или None, если кэша нет, он устарел или повреждён.
+        """
+        path = self.path_for(fingerprint['path'], sheet)
+        try:
+            with span('registry_cache.load', path=path):
+                with open(path, 'rb') as f:
+                    payload = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError, AttributeError):
+            return None
+        if (not isinstance(payload, dict) or payload.get('format') != CACHE_FORMAT
+                or payload.get('version') != self.version or payload.get('fingerprint') != fingerprint
+                or payload.get('sheet') != sheet):
+            return None
+        columns = payload['columns']
+        values = zip(*(columns[field] for field in FIELDS))
+        return dict(zip(payload['keys'], (ContainerRecord(*row) for row in values)))
+
+    def store(self, fingerprint, records, sheet=None):
+        """
+        Сохраняет записи контейнеров по столбцам (запись атомарная).
+        Аргументы:
+            fingerprint (dict): Отпечаток книги, по которой получены записи.
+            records (dict): Записи по номеру контейнера (ContainerRecord или словари с полями FIELDS).
+            sheet (str, optional): Имя листа; None — первый лист.
+        """
+        payload = {
+            'format': CACHE_FORMAT,
+            'version': self.version,
+            'fingerprint': fingerprint,
+            'sheet': sheet,
+            'keys': list(records),
+            'columns': {field: [record[field] for record in records.values()] for field in FIELDS},
+        }
+        path = self.path_for(fingerprint['path'], sheet)
+        with span('registry_cache.store', path=path):
+            with atomic_write(path) as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
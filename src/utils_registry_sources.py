@@ -0,0 +1,374 @@
+"""
+Источники реестра помимо книг Excel.
+Табличные источники подключаются по расширению файла (см. register_source): класс источника перечисляет
+листы и выдаёт строки листа (первая — заголовок), а DataManager разбирает строки так же, как лист Excel.
+Встроен источник CSV-выгрузок.
+Удалённые источники подключаются по схеме адреса (см. REMOTE_SOURCES). Встроен HTTP/HTTPS, в том числе
+экспорт Google Sheets (…/export?format=csv или format=xlsx): таблица скачивается в локальный снимок
+в %APPDATA%/qManager/cache/sources и дальше загружается как обычный файл. Повторная загрузка отправляет
+условный запрос (ETag / If-Modified-Since) по уже открытому соединению: если таблица не менялась,
+сервер отвечает 304 и используется снимок.
+"""
+import os
+import csv
+import json
+import codecs
+import hashlib
+import threading
+import http.client
+from abc import ABC, abstractmethod
+from datetime import datetime
+from urllib.parse import urlsplit, urljoin
+
+from src.core_settings import get_app_data_dir
+from src.core_journal import atomic_write
+from src.core_tracing import span
+
+class RegistrySource(ABC):
+    """
+    Табличный источник реестра. Подкласс задаёт расширения файлов и реализует sheet_names и iter_rows;
+    регистрируется через register_source при импорте модуля (дочерние процессы загрузки импортируют
+    модули заново, поэтому регистрация во время работы в них не видна).
+    """
+    # Расширения файлов (в нижнем регистре), которые читает источник
+    extensions = ()
+    # Название способа чтения для журнала
+    name = None
+
+    def __init__(self, path):
+        self.path = path
+
+    @abstractmethod
+    def sheet_names(self):
+        """
+        Возвращает имена листов источника в порядке загрузки.
+        """
+
+    @abstractmethod
+    def iter_rows(self, sheet=None):
+        """
+        Выдаёт строки листа (по умолчанию первого) — последовательности значений ячеек; первая строка — заголовок.
+        """
+
+# Табличные источники по порядку регистрации
+SOURCE_TYPES = []
+
+def register_source(source_class):
+    """
+    Регистрирует класс табличного источника (можно использовать как декоратор).
+    Аргументы:
+        source_class (type): Подкласс RegistrySource.
+    Возвращает:
+        type: Тот же класс.
+    """
+    SOURCE_TYPES.append(source_class)
+    return source_class
+
+def source_extensions():
+    """
+    Расширения файлов всех зарегистрированных табличных источников.
+    """
+    return tuple(extension for source_class in SOURCE_TYPES for extension in source_class.extensions)
+
+def source_for_path(path):
+    """
+    Находит табличный источник для файла по расширению.
+    Аргументы:
+        path (str): Путь к файлу.
+    Возвращает:
+        RegistrySource или None: Источник или None, если файл читается как книга Excel.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for source_class in SOURCE_TYPES:
+        if extension in source_class.extensions:
+            return source_class(path)
+    return None
+
+@register_source
+class CsvSource(RegistrySource):
+    extensions = ('.csv', '.tsv')
+    name = 'csv'
+    # Выгрузки бывают в UTF-8 (с BOM или без) и в кодировке Windows
+    ENCODINGS = ('utf-8-sig', 'cp1251')
+    DELIMITERS = ';,\t'
+    SAMPLE_SIZE = 64 * 1024
+
+    def _dialect(self):
+        """
+        Определяет кодировку и разделитель по началу файла.
+        Возвращает:
+            tuple: (кодировка, разделитель).
+        Исключения:
+            ValueError: Если файл не удалось декодировать ни в одной из ENCODINGS.
+        """
+        with open(self.path, 'rb') as f:
+            sample = f.read(self.SAMPLE_SIZE)
+        for encoding in self.ENCODINGS:
+            try:
+                # Начало файла может оборваться посреди символа — декодер не требует завершённости
+                text = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError(f"Не удалось определить кодировку файла: {self.path}")
+        if len(sample) == self.SAMPLE_SIZE and '\n' in text:
+            text = text[:text.rindex('\n')]
+        try:
+            delimiter = csv.Sniffer().sniff(text, delimiters=self.DELIMITERS).delimiter
+        except csv.Error:
+            delimiter = '\t' if self.path.lower().endswith('.tsv') else ','
+        return encoding, delimiter
+
+    def sheet_names(self):
+        return [os.path.splitext(os.path.basename(self.path))[0]]
+
+    def iter_rows(self, sheet=None):
+        encoding, delimiter = self._dialect()
+        with open(self.path, newline='', encoding=encoding) as f:
+            yield from csv.reader(f, delimiter=delimiter)
+
+class ConnectionPool:
+    def __init__(self, timeout=30):
+        """
+        Постоянные соединения HTTP/1.1 по (схема, хост, порт): повторные запросы к тому же серверу
+        идут без нового рукопожатия TCP и TLS. Соединение выдаётся одному потоку на время запроса
+        и возвращается в пул после полного чтения ответа.
+        Аргументы:
+            timeout (float): Таймаут соединения и чтения, с.
+        """
+        self.timeout = timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _acquire(self, scheme, netloc):
+        with self._lock:
+            connections = self._idle.get((scheme, netloc))
+            if connections:
+                return connections.pop(), True
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection_class(netloc, timeout=self.timeout), False
+
+    def release(self, response):
+        """
+        Возвращает соединение прочитанного ответа в пул (или закрывает, если сервер его не сохраняет).
+        """
+        connection, key = response.pool_key
+        if response.will_close or not response.isclosed():
+            connection.close()
+            return
+        with self._lock:
+            self._idle.setdefault(key, []).append(connection)
+
+    def request(self, method, url, headers):
+        """
+        Отправляет запрос по свободному соединению пула. Если сервер успел закрыть простаивающее
+        соединение, запрос повторяется по новому.
+        Аргументы:
+            method (str): Метод HTTP.
+            url (str): Адрес.
+            headers (dict): Заголовки запроса.
+        Возвращает:
+            http.client.HTTPResponse: Ответ; после чтения тела его нужно передать в release.
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        target = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        while True:
+            connection, reused = self._acquire(scheme, parts.netloc)
+            try:
+                connection.request(method, target, headers=headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError,
+                    http.client.CannotSendRequest):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            response.pool_key = (connection, (scheme, parts.netloc))
+            return response
+
+    def close(self):
+        """
+        Закрывает все простаивающие соединения.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+# Общий пул соединений удалённых источников
+CONNECTION_POOL = ConnectionPool()
+
+class HttpSource:
+    # Расширение снимка по типу содержимого ответа
+    CONTENT_TYPES = {
+        'text/csv': '.csv',
+        'text/tab-separated-values': '.tsv',
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': '.xlsx',
+        'application/vnd.ms-excel.sheet.macroenabled.12': '.xlsm',
+        'application/vnd.ms-excel': '.xls',
+        'application/vnd.oasis.opendocument.spreadsheet': '.ods',
+    }
+    MAX_REDIRECTS = 5
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, url, cache_dir=None, pool=None):
+        """
+        Таблица, доступная по HTTP/HTTPS, с локальным снимком.
+        Аргументы:
+            url (str): Адрес таблицы.
+            cache_dir (str, optional): Папка снимков; по умолчанию %APPDATA%/qManager/cache/sources.
+            pool (ConnectionPool, optional): Пул соединений; по умолчанию общий CONNECTION_POOL.
+        """
+        self.url = url
+        self.cache_dir = cache_dir or get_app_data_dir('cache', 'sources')
+        self.pool = pool or CONNECTION_POOL
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        self.meta_path = os.path.join(self.cache_dir, key + '.json')
+        self._key = key
+        # Результат последнего fetch: 'downloaded', 'not_modified' или 'offline'
+        self.status = None
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != self.url or not os.path.exists(os.path.join(self.cache_dir, meta.get('file', ''))):
+            return None
+        return meta
+
+    def _extension(self, url, response):
+        """
+        Определяет формат снимка: по расширению в адресе, затем по Content-Type ответа.
+        """
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        if extension in self.CONTENT_TYPES.values():
+            return extension
+        content_type = (response.getheader('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type in self.CONTENT_TYPES:
+            return self.CONTENT_TYPES[content_type]
+        return '.csv' if content_type.startswith('text/') else '.xlsx'
+
+    def _open(self, headers):
+        """
+        Выполняет GET с переходом по перенаправлениям.
+        Возвращает:
+            tuple: (ответ, итоговый адрес).
+        """
+        url = self.url
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = self.pool.request('GET', url, headers)
+            if response.status not in (301, 302, 303, 307, 308):
+                return response, url
+            location = response.getheader('Location')
+            response.read()
+            self.pool.release(response)
+            if not location:
+                raise ValueError(f"Перенаправление без адреса: {url}")
+            url = urljoin(url, location)
+        raise ValueError(f"Слишком много перенаправлений: {self.url}")
+
+    def fetch(self, log=None):
+        """
+        Обновляет локальный снимок таблицы. Если снимок есть, запрос условный: при ответе 304
+        таблица не скачивается. Если сервер недоступен или отвечает ошибкой 5xx, используется
+        прежний снимок.
+        Аргументы:
+            log (callable, optional): Функция вывода сообщений.
+        Возвращает:
+            str: Путь к снимку.
+        Исключения:
+            ValueError: Если сервер вернул ошибку, а снимка ещё нет.
+            OSError: Если сервер недоступен, а снимка ещё нет.
+        """
+        log = log or (lambda message: None)
+        meta = self._read_meta()
+        headers = {'User-Agent': 'qManager', 'Accept-Encoding': 'identity'}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        snapshot = os.path.join(self.cache_dir, meta['file']) if meta else None
+
+        with span('HttpSource.fetch', url=self.url):
+            try:
+                response, final_url = self._open(headers)
+            except (OSError, http.client.HTTPException) as e:
+                if snapshot is None:
+                    raise
+                self.status = 'offline'
+                log(f"Источник {self.url} недоступен ({e}); используется снимок от {meta['fetched_at']}")
+                return snapshot
+            try:
+                if response.status == 304 and snapshot is not None:
+                    response.read()
+                    self.status = 'not_modified'
+                    log(f"Источник {self.url} не изменился (304); используется снимок")
+                    return snapshot
+                if response.status != 200:
+                    response.read()
+                    if response.status >= 500 and snapshot is not None:
+                        self.status = 'offline'
+                        log(f"Источник {self.url} ответил {response.status} {response.reason}; "
+                            f"используется снимок от {meta['fetched_at']}")
+                        return snapshot
+                    raise ValueError(f"Не удалось загрузить {self.url}: HTTP {response.status} {response.reason}")
+
+                file_name = self._key + self._extension(final_url, response)
+                path = os.path.join(self.cache_dir, file_name)
+                size = 0
+                with atomic_write(path) as f:
+                    for chunk in iter(lambda: response.read(self.CHUNK_SIZE), b''):
+                        f.write(chunk)
+                        size += len(chunk)
+            finally:
+                self.pool.release(response)
+
+        if snapshot is not None and snapshot != path:
+            try:
+                os.remove(snapshot)
+            except OSError:
+                pass
+        meta = {
+            'url': self.url,
+            'file': file_name,
+            'etag': response.getheader('ETag'),
+            'last_modified': response.getheader('Last-Modified'),
+            'size': size,
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with atomic_write(self.meta_path) as f:
+            f.write(json.dumps(meta, ensure_ascii=False, indent=2).encode('utf-8'))
+        self.status = 'downloaded'
+        log(f"Источник {self.url} загружен: {size} байт")
+        return path
+
+# Удалённые источники по схеме адреса
+REMOTE_SOURCES = {
+    'http': HttpSource,
+    'https': HttpSource,
+}
+
+def is_remote_source(source):
+    """
+    Проверяет, задан ли источник адресом удалённого источника (http://, https://).
+    """
+    return isinstance(source, str) and urlsplit(source).scheme.lower() in REMOTE_SOURCES
+
+def open_remote_source(url):
+    """
+    Создаёт удалённый источник по схеме адреса.
+    Аргументы:
+        url (str): Адрес.
+    Возвращает:
+        HttpSource: Источник с методом fetch, возвращающим путь к локальному снимку.
+    """
+    return REMOTE_SOURCES[urlsplit(url).scheme.lower()](url)
@@ -0,0 +1,169 @@
+"""
+Поиск внешних программ (poppler, Tesseract) с кэшированием на время работы процесса.
+Поиск выполняется один раз: либо при первом обращении, либо заранее в фоновом потоке
+(warm_up), чтобы не задерживать запуск интерфейса и первую задачу.
+Модуль не импортирует тяжёлые зависимости (pandas, PyPDF2, pdf2image, pytesseract).
+"""
+import os
+import sys
+import shutil
+import threading
+
+# В vendor лежит сборка poppler для Windows; на Linux используется pdftoppm из системы
+POPPLER_EXECUTABLE = 'pdftoppm.exe' if os.name == 'nt' else 'pdftoppm'
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def find_poppler_path():
+    """
+    Определяет путь к Poppler (необходим для pdf2image).
+    Возвращает:
+        str | None: Папка с pdftoppm или None, если используется системный PATH.
+    Исключения:
+        RuntimeError: Если Poppler не найден.
+    """
+    candidates = []
+    # vendor/poppler/bin относительно корня проекта
+    candidates.append(os.path.abspath(os.path.join(_SRC_DIR, '..', '..', 'vendor', 'poppler', 'bin')))
+    # vendor/poppler/bin относительно src
+    candidates.append(os.path.abspath(os.path.join(_SRC_DIR, '..', 'vendor', 'poppler', 'bin')))
+    # В системном PATH
+    if shutil.which('pdftoppm') or shutil.which('pdftoppm.exe'):
+        candidates.append(None)  # None = использовать системный PATH
+    # frozen exe
+    if getattr(sys, 'frozen', False):
+        candidates.append(os.path.join(os.path.dirname(sys.executable), 'poppler', 'bin'))
+    # Проверяем все пути
+    for path in candidates:
+        if path is None:
+            return None
+        if os.path.exists(path) and os.path.isfile(os.path.join(path, POPPLER_EXECUTABLE)):
+            return path
+    raise RuntimeError('Poppler не найден! Проверьте, что poppler установлен в vendor/poppler/bin или добавлен в PATH.')
+
+def find_tesseract():
+    """
+    Ищет Tesseract: сначала поставляемый vendor/Tesseract-OCR (Windows, проверяются DLL и языковые данные),
+    затем исполняемый файл в системном PATH (в том числе на Linux-серверах).
+    Возвращает:
+        str: Путь к исполняемому файлу Tesseract.
+    Исключения:
+        RuntimeError: Если не найдены необходимые файлы или языковые данные.
+    """
+    if os.name == 'nt':
+        candidates = []
+        # 1. vendor/Tesseract-OCR относительно src
+        candidates.append(os.path.abspath(os.path.join(_SRC_DIR, '..', 'vendor', 'Tesseract-OCR')))
+        # 2. vendor/Tesseract-OCR относительно корня проекта
+        candidates.append(os.path.abspath(os.path.join(_SRC_DIR, '..', '..', 'vendor', 'Tesseract-OCR')))
+        # 3. frozen exe
+        if getattr(sys, 'frozen', False):
+            candidates.append(os.path.join(os.path.dirname(sys.executable), 'Tesseract-OCR'))
+        # Проверяем кандидатов
+        for tesseract_dir in candidates:
+            if os.path.exists(tesseract_dir) and os.path.isfile(os.path.join(tesseract_dir, 'tesseract.exe')):
+                # Добавляем путь к Tesseract в PATH
+                if tesseract_dir not in os.environ['PATH']:
+                    os.environ['PATH'] = tesseract_dir + os.pathsep + os.environ['PATH']
+                # Проверяем наличие необходимых файлов
+                required_files = [
+                    'tesseract.exe',
+                    'libtesseract-5.dll',
+                    'libpng16-16.dll',
+                    'zlib1.dll',
+                    'libleptonica-6.dll'
+                ]
+                missing_files = [file for file in required_files if not os.path.exists(os.path.join(tesseract_dir, file))]
+                if missing_files:
+                    raise RuntimeError(f"Отсутствуют необходимые файлы Tesseract: {', '.join(missing_files)}")
+                tessdata_dir = os.path.join(tesseract_dir, 'tessdata')
+                if not os.path.exists(os.path.join(tessdata_dir, 'eng.traineddata')):
+                    raise RuntimeError("Отсутствуют языковые данные для английского языка")
+                return os.path.join(tesseract_dir, 'tesseract.exe')
+    # 4. В системном PATH
+    system_tesseract = shutil.which('tesseract')
+    if system_tesseract:
+        return system_tesseract
+    raise RuntimeError('Tesseract не найден! Проверьте, что он установлен в vendor/Tesseract-OCR или добавлен в PATH.')
+
+class _CachedLookup:
+    def __init__(self, finder):
+        """
+        Однократный потокобезопасный вызов finder с запоминанием результата или ошибки.
+        Аргументы:
+            finder (callable): Функция поиска.
+        """
+        self._finder = finder
+        self._lock = threading.Lock()
+        self._done = False
+        self._value = None
+        self._error = None
+
+    def get(self):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    try:
+                        self._value = self._finder()
+                    except RuntimeError as e:
+                        self._error = e
+                    self._done = True
+        if self._error is not None:
+            raise RuntimeError(str(self._error))
+        return self._value
+
+    def reset(self):
+        with self._lock:
+            self._done = False
+            self._value = None
+            self._error = None
+
+_poppler = _CachedLookup(find_poppler_path)
+_tesseract = _CachedLookup(find_tesseract)
+
+def get_poppler_path():
+    """
+    Путь к Poppler из кэша (поиск выполняется один раз).
+    Возвращает:
+        str | None: Папка с pdftoppm или None, если используется системный PATH.
+    Исключения:
+        RuntimeError: Если Poppler не найден.
+    """
+    return _poppler.get()
+
+def get_tesseract_path():
+    """
+    Путь к Tesseract из кэша (поиск выполняется один раз).
+    Возвращает:
+        str: Путь к исполняемому файлу Tesseract.
+    Исключения:
+        RuntimeError: Если Tesseract не найден.
+    """
+    return _tesseract.get()
+
+def refresh():
+    """
+    Сбрасывает кэш: следующий запрос повторит поиск (например, после установки программы).
+    """
+    _poppler.reset()
+    _tesseract.reset()
+
+def warm_up(log_callback=None):
+    """
+    Запускает поиск внешних программ в фоновом потоке.
+    Аргументы:
+        log_callback (callable, optional): Получает сообщение о ненайденной программе.
+    Возвращает:
+        threading.Thread: Запущенный поток.
+    """
+    def run():
+        for name, lookup in (("Poppler", _poppler), ("Tesseract", _tesseract)):
+            try:
+                lookup.get()
+            except RuntimeError as e:
+                if log_callback:
+                    log_callback(f"{name}: {e}")
+
+    thread = threading.Thread(target=run, name='toolchain-warm-up', daemon=True)
+    thread.start()
+    return thread
@@ -1,9 +1,12 @@
 import os
 import sys
 import subprocess
+import multiprocessing
 from pathlib import Path
 
 if __name__ == '__main__':
+    # Дочерние процессы загрузки реестра в собранном exe запускаются через этот же файл
+    multiprocessing.freeze_support()
     # Получаем абсолютный путь к директории проекта
     PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
     